@@ -0,0 +1,67 @@
+"""
+Benchmark the cache-only path of parallel_processing.
+
+Builds a synthetic transit cache with the same shape as a warmed-up
+transit_cache.db (a handful of origins x ~1,750 stations) and times the
+per-pair check_transit_cache loop against bulk_check_transit_cache.
+
+Run from the repository root:
+    python -m benchmarks.cache_lookup --rows 7000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import transit_cache as tc
+
+
+def build_cache(db_path: str, rows: int, origins: int = 4) -> list:
+    """Fill a fresh cache DB with `rows` entries and return the (origin, destination) pairs."""
+    tc.create_cache_db(db_path)
+    stations_per_origin = rows // origins
+    pairs = [
+        (f"Origin{o} Station, Tokyo", f"Station{s} Station, Tokyo")
+        for o in range(origins)
+        for s in range(stations_per_origin)
+    ]
+    conn = tc.connect(db_path)
+    conn.executemany(
+        'INSERT INTO transit_cache (origin, destination, depart_time, transit_time) VALUES (?, ?, NULL, ?)',
+        [(o, d, f"{random.randint(5, 120)} 分") for o, d in pairs]
+    )
+    conn.commit()
+    conn.close()
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=7000, help="Number of cached rows")
+    parser.add_argument("--misses", type=int, default=500, help="Extra uncached pairs in the query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "transit_cache.db")
+        pairs = build_cache(db_path, args.rows)
+        query = pairs + [("Origin0 Station, Tokyo", f"Missing{i} Station, Tokyo") for i in range(args.misses)]
+        random.shuffle(query)
+
+        start = time.perf_counter()
+        per_pair_hits = sum(1 for o, d in query if tc.check_transit_cache(o, d, None, db_path=db_path))
+        per_pair = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits, misses = tc.bulk_check_transit_cache(query, None, db_path=db_path)
+        bulk = time.perf_counter() - start
+
+    assert per_pair_hits == len(hits) and len(misses) == args.misses
+    print(f"pairs: {len(query)} ({len(hits)} hits, {len(misses)} misses)")
+    print(f"per-pair check_transit_cache: {per_pair * 1000:10.1f} ms")
+    print(f"bulk_check_transit_cache:     {bulk * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+End-to-end benchmark of webui.process_commute_circles on synthetic data.
+
+For every size (number of station pairs per query, split between the two
+origins) it generates a throwaway working directory with the same files the app
+reads: Dataset/tokyo_rent.db with rent listings, a fully warmed
+transit_cache.db and geocoding_cache.csv, so nothing touches the network. Each
+run happens in a fresh interpreter, timing every stage of the pipeline
+(see metrics.StageTimer). The median per stage over --repeat runs is reported as
+JSON and compared against a stored baseline.
+
+Run from the repository root:
+    python -m benchmarks.commute_circles                      # 1k, 10k, 100k pairs
+    python -m benchmarks.commute_circles --sizes 1000 10000 --repeat 5
+    python -m benchmarks.commute_circles --save-baseline      # after an intended change
+    python -m benchmarks.commute_circles --output results.json
+
+Exits with status 1 when a stage is slower than the baseline by more than
+--tolerance (relative) and --min-delta (absolute seconds).
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, 'benchmarks', 'baselines', 'commute_circles.json')
+
+PREFECTURES = ['Tokyo', 'Kanagawa', 'Chiba', 'Saitama']
+# Roughly the Kanto plain
+LATITUDE_RANGE = (35.45, 35.95)
+LONGITUDE_RANGE = (139.35, 140.05)
+COMMUTE_LIMIT = 30
+
+
+def synthetic_station(i: int) -> str:
+    return f"Synth{i:06d}"
+
+
+def formatted(i: int) -> str:
+    return f"{synthetic_station(i)} Station, {PREFECTURES[i % len(PREFECTURES)]}"
+
+
+def generate(workdir: str, pairs: int, listings_per_station: int = 5, seed: int = 0) -> dict:
+    """
+    Write a synthetic rent DB, transit cache and geocoding cache into `workdir`.
+
+    Stations 0 and 1 are the two query origins; every station is cached from both,
+    with durations that grow with straight-line distance.
+
+    Returns:
+        dict: Query arguments for process_commute_circles
+    """
+    rng = random.Random(seed)
+    n_stations = max(2, pairs // 2)
+    coords = [(rng.uniform(*LATITUDE_RANGE), rng.uniform(*LONGITUDE_RANGE)) for _ in range(n_stations)]
+    # Keep the two origins near the middle so their circles overlap
+    coords[0] = (35.69, 139.70)
+    coords[1] = (35.70, 139.77)
+
+    os.makedirs(os.path.join(workdir, 'Dataset'), exist_ok=True)
+    conn = sqlite3.connect(os.path.join(workdir, 'Dataset', 'tokyo_rent.db'))
+    conn.execute('''
+        CREATE TABLE properties (
+            id INTEGER PRIMARY KEY, room_type TEXT, station TEXT, prefecture TEXT,
+            cost REAL, size REAL, cost_per_square REAL, year INTEGER, floor INTEGER, minute INTEGER
+        )
+    ''')
+    rows = []
+    for i in range(n_stations):
+        base = rng.lognormvariate(math.log(3200), 0.25)
+        for _ in range(listings_per_station):
+            size = rng.uniform(15, 60)
+            cost_per_square = base * rng.uniform(0.8, 1.25)
+            rows.append((rng.choice(['1K', '1R', '1LDK', '2LDK']), synthetic_station(i), PREFECTURES[i % len(PREFECTURES)],
+                         round(cost_per_square * size), round(size, 1), cost_per_square,
+                         rng.randint(1975, 2024), rng.randint(1, 15), rng.randint(1, 20)))
+    conn.executemany('''
+        INSERT INTO properties (room_type, station, prefecture, cost, size, cost_per_square, year, floor, minute)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    # Precomputed rent stats, as ingest_properties builds them
+    sys.path.insert(0, REPO_ROOT)
+    import rent_stats
+    with conn:
+        rent_stats.rebuild_station_stats(conn)
+    conn.close()
+
+    with open(os.path.join(workdir, 'geocoding_cache.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['address', 'latitude', 'longitude'])
+        for i, (lat, lon) in enumerate(coords):
+            writer.writerow([formatted(i), lat, lon])
+
+    import transit_cache as tc
+    from pruning import haversine_km
+
+    cache_path = os.path.join(workdir, 'transit_cache.db')
+    tc.create_cache_db(cache_path)
+    now = time.time()
+    cache_rows = []
+    for origin in (0, 1):
+        origin_coords = {'latitude': coords[origin][0], 'longitude': coords[origin][1]}
+        for i, (lat, lon) in enumerate(coords):
+            km = haversine_km(origin_coords, {'latitude': lat, 'longitude': lon})
+            minutes = max(2, int(km * 1.8 + 4 + rng.uniform(-3, 6)))
+            hours, rest = divmod(minutes, 60)
+            text = f"{hours} 時間 {rest} 分" if hours else f"{rest} 分"
+            cache_rows.append((formatted(origin), formatted(i), text, minutes, now, tc.freshness_ttl(None, minutes)))
+    conn = tc.connect(cache_path)
+    conn.executemany('''
+        INSERT INTO transit_cache (origin, destination, depart_time, transit_time, duration, fetched_at, ttl)
+        VALUES (?, ?, NULL, ?, ?, ?, ?)
+    ''', cache_rows)
+    conn.commit()
+    conn.close()
+
+    return {
+        'company_station': synthetic_station(0),
+        'hangout_station': synthetic_station(1),
+        'company_time': COMMUTE_LIMIT,
+        'hangout_time': COMMUTE_LIMIT,
+        'selected_prefectures': [],
+    }
+
+
+def run_once(workdir: str, query: dict) -> dict:
+    """Time one process_commute_circles call inside `workdir` (called in a fresh interpreter)."""
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    start = time.perf_counter()
+    import webui
+    import_seconds = time.perf_counter() - start
+
+    timings = {}
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            start = time.perf_counter()
+            result = webui.process_commute_circles(**query, timings=timings)
+            timings['total'] = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    timings['import'] = import_seconds
+    timings['overlap_stations'] = len(result['stations'])
+    return timings
+
+
+def measure(size: int, repeat: int, seed: int) -> dict:
+    """Median stage timings for one size, each run in its own interpreter."""
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        query = generate(workdir, size, seed=seed)
+        print(f"[{size} pairs] generated data in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+        runs = []
+        for attempt in range(repeat):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.commute_circles', '--run-once', workdir, json.dumps(query)],
+                cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+            print(f"[{size} pairs] run {attempt + 1}/{repeat}: {runs[-1]['total']:.2f} s", file=sys.stderr)
+
+    overlap = runs[0].pop('overlap_stations')
+    for run in runs[1:]:
+        run.pop('overlap_stations')
+    stages = {stage: statistics.median(run[stage] for run in runs) for stage in runs[0]}
+    return {'pairs': size, 'overlap_stations': overlap, 'runs': repeat, 'stages': stages}
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float) -> list:
+    """Stages slower than the baseline beyond both thresholds, as printable lines."""
+    regressions = []
+    for size, result in results['sizes'].items():
+        base = baseline.get('sizes', {}).get(size)
+        if not base:
+            continue
+        for stage, seconds in result['stages'].items():
+            before = base['stages'].get(stage)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > min_delta:
+                regressions.append(f"{size} pairs / {stage}: {before:.3f} s -> {seconds:.3f} s "
+                                   f"(+{(seconds / before - 1) if before else float('inf'):.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Station pairs per query")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (median is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data")
+    parser.add_argument("--output", help="Write the results JSON here as well as to stdout")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown per stage")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore slowdowns smaller than this (seconds)")
+    parser.add_argument("--run-once", nargs=2, metavar=("WORKDIR", "QUERY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_once:
+        print(json.dumps(run_once(args.run_once[0], json.loads(args.run_once[1]))))
+        return
+
+    results = {
+        'benchmark': 'commute_circles',
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'sizes': {str(size): measure(size, args.repeat, args.seed) for size in args.sizes},
+    }
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.tolerance, args.min_delta)
+    if regressions:
+        print("Regressions against the baseline:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print("No stage regressed against the baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the live-fetch path of parallel_processing without Chrome or internet.
+
+Runs a cold sweep (every pair fetched) and a warm sweep (every pair cached)
+against either the local stub maps server over HTTP or the in-process fake
+backend, on a throwaway cache DB. Use it to compare pooling, caching and
+concurrency changes on a plain Linux box.
+
+Run from the repository root:
+    python -m benchmarks.fetch_pipeline --pairs 500 --latency 0.2
+    python -m benchmarks.fetch_pipeline --backend fake --workers 20 --failure-rate 0.05
+    python -m benchmarks.fetch_pipeline --adaptive --languages en ja zh de ko
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import transit_cache as tc
+from stub_maps_server import DEFAULT_LANGUAGES, DURATION_FORMATS, start_stub_server
+from transit_backends import FakeBackend, HTTPBackend, set_default_backend
+
+
+def station_pairs(count: int, origins: int = 2) -> list:
+    """`count` synthetic (origin, destination) pairs spread over a few origins."""
+    return [(f"Origin{i % origins} Station, Tokyo", f"Station{i} Station, Tokyo") for i in range(count)]
+
+
+def timed_sweep(gt, pairs, transit_function, workers, concurrency, quiet=True):
+    """Run one parallel_processing sweep; returns (seconds, results)."""
+    out = io.StringIO() if quiet else None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out) if quiet else contextlib.nullcontext():
+        results = gt.parallel_processing(pairs, transit_function, num_workers=workers, concurrency=concurrency)
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["stub", "fake"], default="stub",
+                        help="stub: HTTP against stub_maps_server; fake: in-process")
+    parser.add_argument("--pairs", type=int, default=500, help="Number of pairs to fetch")
+    parser.add_argument("--workers", type=int, default=10, help="Concurrent fetches (fixed)")
+    parser.add_argument("--adaptive", action="store_true", help="Use the AIMD controller instead of --workers")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per fetch")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Stub only: +/- latency jitter")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of fetches that fail")
+    parser.add_argument("--languages", nargs="+", default=list(DEFAULT_LANGUAGES), choices=sorted(DURATION_FORMATS))
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and failure draws")
+    parser.add_argument("--verbose", action="store_true", help="Show the per-pair pipeline output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Point the cache at a scratch DB before get_transit_time creates it on import
+        tc.DB_PATH = os.path.join(tmp, "transit_cache.db")
+        import get_transit_time as gt
+        from concurrency import AdaptiveConcurrency
+
+        server = None
+        if args.backend == "stub":
+            server = start_stub_server(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                                       languages=args.languages, seed=args.seed)
+            backend = HTTPBackend(server.base_url)
+        else:
+            backend = FakeBackend(latency=args.latency, failure_rate=args.failure_rate,
+                                  languages=args.languages, seed=args.seed)
+
+        # Through the default backend, so the sweep sizes this backend instead of a Chrome pool
+        set_default_backend(backend)
+        transit_function = gt.get_transit_time
+
+        concurrency = AdaptiveConcurrency(floor=2, ceiling=max(2, args.workers * 2)) if args.adaptive else None
+        pairs = station_pairs(args.pairs)
+        try:
+            cold, cold_results = timed_sweep(gt, pairs, transit_function, args.workers, concurrency, not args.verbose)
+            warm, warm_results = timed_sweep(gt, pairs, transit_function, args.workers, concurrency, not args.verbose)
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+            tc.close_cache_writer()
+
+    fetched = sum(1 for result in cold_results if result[3])
+    print(f"backend: {args.backend}, pairs: {len(pairs)}, latency: {args.latency}s, "
+          f"failure rate: {args.failure_rate:.0%}, languages: {', '.join(args.languages)}")
+    print(f"concurrency: {'adaptive, final limit ' + str(concurrency.stats()['limit']) if concurrency else args.workers}")
+    print(f"cold sweep: {cold:8.2f} s  {len(pairs) / cold:8.1f} pairs/s  ({fetched} fetched, {len(pairs) - fetched} failed)")
+    print(f"warm sweep: {warm:8.2f} s  {len(pairs) / warm:8.1f} pairs/s  "
+          f"({sum(1 for result in warm_results if result[3])} cache hits)")
+    if server:
+        print(f"stub requests: {server.requests} ({server.failures} failed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark rent_analytics.RentColumns against per-station sorting in Python.
+
+Times loading properties into columnar arrays, grouped stats for every
+station and for a typical overlap-sized subset, next to the sorted()-per-station
+loop the apps used before. Runs on the bundled rent DB (if it has been built)
+and on a synthetic DB, and checks every station's quantiles against
+numpy.quantile.
+
+Run from the repository root:
+    python -m benchmarks.rent_analytics
+    python -m benchmarks.rent_analytics --rows 1000000 --stations 3000 --subset 60
+"""
+
+import argparse
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from rent_analytics import RENT_DB_PATH, RentColumns
+
+
+def build_synthetic(db_path: str, rows: int, stations: int, seed: int = 0) -> None:
+    """Write a properties table with `rows` priced listings spread over `stations` stations."""
+    rng = np.random.default_rng(seed)
+    station_ids = rng.zipf(1.3, rows) % stations
+    base = np.exp(rng.normal(math.log(3200), 0.25, stations))
+    costs = base[station_ids] * rng.uniform(0.8, 1.25, rows)
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE properties (id INTEGER PRIMARY KEY, station TEXT, cost_per_square REAL)')
+    conn.executemany('INSERT INTO properties (station, cost_per_square) VALUES (?, ?)',
+                     zip((f"Synth{i:05d}" for i in station_ids.tolist()), costs.tolist()))
+    conn.commit()
+    conn.close()
+
+
+def python_stats(db_path: str, stations=None) -> dict:
+    """The previous approach: fetch rows, group in a dict, sorted() and index arithmetic per station."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT station, cost_per_square FROM properties '
+                        'WHERE station IS NOT NULL AND cost_per_square IS NOT NULL').fetchall()
+    conn.close()
+    wanted = set(stations) if stations is not None else None
+    grouped = {}
+    for station, cost in rows:
+        if wanted is None or station in wanted:
+            grouped.setdefault(station, []).append(cost)
+    stats = {}
+    for station, costs in grouped.items():
+        sorted_costs = sorted(costs)
+        n = len(sorted_costs)
+        median = sorted_costs[n//2] if n % 2 == 1 else (sorted_costs[(n//2)-1] + sorted_costs[n//2])/2
+        stats[station] = (n, median, sorted_costs[int(n*0.25)], sorted_costs[int(n*0.75)])
+    return stats
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def max_quantile_error(columns: RentColumns) -> float:
+    """Largest difference between RentColumns.quantiles and numpy.quantile over every station."""
+    frame = columns.quantiles((0.25, 0.5, 0.75))
+    worst = 0.0
+    for group, station in enumerate(columns.names):
+        values = columns.values[columns.offsets[group]:columns.offsets[group + 1]]
+        expected = np.quantile(values, (0.25, 0.5, 0.75))
+        worst = max(worst, float(np.abs(frame.loc[station].to_numpy() - expected).max()))
+    return worst
+
+
+def report(label: str, db_path: str, subset_size: int, seed: int) -> None:
+    load, columns = timed(RentColumns.from_db, db_path)
+    every, frame = timed(columns.stats)
+    subset = random.Random(seed).sample(list(columns.names), min(subset_size, len(columns.names)))
+    some, _ = timed(columns.stats, subset)
+    python_every, _ = timed(python_stats, db_path)
+    python_some, _ = timed(python_stats, db_path, subset)
+
+    print(f"{label}: {len(columns):,} priced rows, {len(frame):,} stations")
+    print(f"  load into arrays        {load:8.3f} s")
+    print(f"  stats, all stations     {every:8.3f} s   (python loop incl. fetch: {python_every:8.3f} s)")
+    print(f"  stats, {len(subset):>4} stations    {some:8.4f} s   (python loop incl. fetch: {python_some:8.3f} s)")
+    print(f"  max |error| vs numpy.quantile: {max_quantile_error(columns):.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=RENT_DB_PATH, help="Rent DB built by ingest_properties.py")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic listings")
+    parser.add_argument("--stations", type=int, default=3000, help="Synthetic stations")
+    parser.add_argument("--subset", type=int, default=60, help="Stations per subset query (a typical overlap)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data and the subset")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        report(args.db, args.db, args.subset, args.seed)
+    else:
+        print(f"{args.db} not found; run python ingest_properties.py to include it")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'synthetic_rent.db')
+        start = time.perf_counter()
+        build_synthetic(db_path, args.rows, args.stations, args.seed)
+        print(f"(generated {args.rows:,} synthetic rows in {time.perf_counter() - start:.1f} s)")
+        report('synthetic', db_path, args.subset, args.seed)
+
+
+if __name__ == "__main__":
+    main()
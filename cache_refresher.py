@@ -0,0 +1,60 @@
+"""
+Low-priority background refresh of stale transit cache entries.
+
+Queries always get whatever is cached, however old. This thread refetches the
+oldest entries past their freshness TTL (see transit_cache.freshness_ttl) at a
+bounded rate and backs off while foreground fetches are running, so keeping the
+cache fresh never competes with a user waiting on a result.
+"""
+
+import logging
+import threading
+from typing import Callable, Optional
+
+import transit_cache as tc
+
+
+class CacheRefresher:
+    """Background thread refreshing at most `max_per_minute` stale cache entries."""
+
+    def __init__(self, fetch: Callable[[str, str, Optional[int]], object],
+                 busy: Optional[Callable[[], bool]] = None,
+                 max_per_minute: float = 6,
+                 db_path: Optional[str] = None):
+        """
+        Args:
+            fetch (Callable): Called as fetch(origin, destination, depart_time); must bypass the cache
+            busy (Optional[Callable]): Returns True while foreground work is running; refreshes wait
+            max_per_minute (float): Upper bound on refresh fetches per minute
+            db_path (Optional[str]): Cache database path
+        """
+        self.fetch = fetch
+        self.busy = busy or (lambda: False)
+        self.interval = 60.0 / max_per_minute
+        self.db_path = db_path
+        self.refreshed = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="transit-cache-refresher", daemon=True)
+
+    def start(self) -> "CacheRefresher":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.busy():
+                continue
+            try:
+                stale = tc.select_stale_entries(limit=1, db_path=self.db_path)
+                if not stale:
+                    continue
+                origin, destination, depart_time = stale[0]
+                self.fetch(origin, destination, depart_time)
+                self.refreshed += 1
+            except Exception as e:
+                logging.error(f"Background cache refresh failed: {str(e)}")
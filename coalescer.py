@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class RequestCoalescer:
+    """
+    Share one in-flight call between concurrent callers asking for the same key.
+
+    The first caller for a key (the leader) runs the function; anyone asking for
+    the same key while it's still running waits on the leader's result instead of
+    starting a duplicate call. Keys are forgotten as soon as the call finishes, so
+    this is not a cache — it only collapses overlapping requests.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def run(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call fn(*args, **kwargs) unless a call for `key` is already running.
+
+        Args:
+            key (Hashable): Identity of the request
+            fn (Callable): Function to run if this caller becomes the leader
+
+        Returns:
+            Any: The leader's return value (its exception is re-raised to every waiter)
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def inflight_count(self) -> int:
+        """Number of calls currently running."""
+        with self._lock:
+            return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters since startup: calls actually made and calls saved by coalescing."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+            }
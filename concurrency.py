@@ -0,0 +1,201 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+DEFAULT_FLOOR = 2
+DEFAULT_CEILING = 16
+
+# Rough resident size of one headless Chrome with a Maps page loaded
+CHROME_MEMORY_MB = 350
+# Back off when less than this much memory is left for new Chrome processes
+MIN_AVAILABLE_MB = 1024
+
+# A failed live fetch that took at least this long is treated as a timeout
+# (get_transit_time waits 5 s for the duration element, plus page load)
+TIMEOUT_SECONDS = 5.0
+
+
+def available_memory_mb() -> Optional[float]:
+    """MemAvailable from /proc/meminfo in MB, or None where it can't be read (non-Linux hosts)."""
+    try:
+        with open('/proc/meminfo', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def host_ceiling(ceiling: int = DEFAULT_CEILING, chrome_memory_mb: float = CHROME_MEMORY_MB) -> int:
+    """
+    Cap a concurrency ceiling to what this host can run: a couple of Chrome
+    processes per CPU, and no more drivers than fit in the available memory.
+    """
+    ceiling = min(ceiling, 2 * (os.cpu_count() or 1))
+    memory = available_memory_mb()
+    if memory is not None:
+        ceiling = min(ceiling, int((memory - MIN_AVAILABLE_MB) // chrome_memory_mb))
+    return max(1, ceiling)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on concurrent live fetches.
+
+    Workers wrap every fetch in slot(); at most `limit` run at once. After each
+    window of completed fetches the limit is adjusted, TCP-style:
+
+    - multiplicative decrease (limit * `decrease_factor`, not below `floor`) when
+      the window's timeout rate exceeds `max_timeout_rate`, its mean latency
+      exceeds `latency_tolerance` times the best window seen so far, or available
+      memory drops under `min_available_mb`;
+    - additive increase (+1, not above `ceiling`) otherwise.
+
+    The limit therefore climbs while Maps answers quickly and halves as soon as
+    fetches start timing out, throttling, or the host runs short of memory for
+    Chrome.
+    """
+
+    def __init__(self, floor: int = DEFAULT_FLOOR, ceiling: int = DEFAULT_CEILING,
+                 initial: Optional[int] = None,
+                 max_timeout_rate: float = 0.2,
+                 latency_tolerance: float = 2.0,
+                 decrease_factor: float = 0.5,
+                 min_available_mb: float = MIN_AVAILABLE_MB,
+                 timeout_seconds: float = TIMEOUT_SECONDS,
+                 memory: Callable[[], Optional[float]] = available_memory_mb,
+                 on_decrease: Optional[Callable[[int], None]] = None):
+        if floor < 1 or ceiling < floor:
+            raise ValueError("AdaptiveConcurrency needs 1 <= floor <= ceiling")
+        self.floor = floor
+        self.ceiling = ceiling
+        self.limit = max(floor, min(ceiling, initial or floor))
+        self.max_timeout_rate = max_timeout_rate
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.min_available_mb = min_available_mb
+        self.timeout_seconds = timeout_seconds
+        self.memory = memory
+        self.on_decrease = on_decrease
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._window_done = 0
+        self._window_timeouts = 0
+        self._window_latency = 0.0
+        self._best_latency: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+
+    def acquire(self) -> None:
+        """Block until fewer than `limit` fetches are running, then take a slot."""
+        with self._cond:
+            while self._inflight >= self.limit:
+                self._cond.wait()
+            self._inflight += 1
+
+    def release(self, latency: float, ok: bool = True) -> None:
+        """
+        Give back a slot and record how the fetch went.
+
+        Args:
+            latency (float): Seconds the fetch took
+            ok (bool): False if the fetch failed; slow failures count as timeouts
+        """
+        decreased_to = None
+        with self._cond:
+            self._inflight -= 1
+            self._window_done += 1
+            self._window_latency += latency
+            if not ok and latency >= self.timeout_seconds:
+                self._window_timeouts += 1
+            if self._window_done >= self.limit:
+                decreased_to = self._adjust()
+            self._cond.notify_all()
+        if decreased_to is not None and self.on_decrease:
+            self.on_decrease(decreased_to)
+
+    @contextmanager
+    def slot(self):
+        """
+        Context manager around acquire()/release(). Set the yielded dict's 'ok'
+        to False when the fetch failed without raising.
+        """
+        self.acquire()
+        outcome = {'ok': True}
+        start = time.monotonic()
+        try:
+            yield outcome
+        except BaseException:
+            outcome['ok'] = False
+            raise
+        finally:
+            self.release(time.monotonic() - start, outcome['ok'])
+
+    def _adjust(self) -> Optional[int]:
+        # Called with the lock held once per window; returns the new limit after a decrease
+        mean_latency = self._window_latency / self._window_done
+        timeout_rate = self._window_timeouts / self._window_done
+        self._window_done = self._window_timeouts = 0
+        self._window_latency = 0.0
+
+        reason = None
+        memory = self.memory() if self.memory else None
+        if memory is not None and memory < self.min_available_mb:
+            reason = f"{memory:.0f} MB available"
+        elif timeout_rate > self.max_timeout_rate:
+            reason = f"{timeout_rate:.0%} timeouts"
+        elif self._best_latency is not None and mean_latency > self._best_latency * self.latency_tolerance:
+            reason = f"latency {mean_latency:.1f}s vs best {self._best_latency:.1f}s"
+
+        if timeout_rate <= self.max_timeout_rate:
+            # Only clean windows define the latency baseline
+            if self._best_latency is None or mean_latency < self._best_latency:
+                self._best_latency = mean_latency
+
+        if reason:
+            new_limit = max(self.floor, int(self.limit * self.decrease_factor))
+            if new_limit < self.limit:
+                logging.info(f"Concurrency {self.limit} -> {new_limit} ({reason})")
+                self.limit = new_limit
+                self.decreases += 1
+                return new_limit
+        elif self.limit < self.ceiling:
+            self.limit += 1
+            self.increases += 1
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        """Current limit, running fetches and how often the limit moved."""
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'inflight': self._inflight,
+                'increases': self.increases,
+                'decreases': self.decreases,
+                'best_latency': self._best_latency,
+            }
+
+
+_shared_controller: Optional[AdaptiveConcurrency] = None
+_shared_controller_lock = threading.Lock()
+
+
+def get_shared_controller(floor: int = DEFAULT_FLOOR, ceiling: int = DEFAULT_CEILING,
+                          on_decrease: Optional[Callable[[int], None]] = None) -> AdaptiveConcurrency:
+    """
+    Get the process-wide controller, creating it on first use.
+
+    It is shared by every sweep in the process, so concurrent UI sessions stay
+    within one Chrome budget instead of each starting their own workers. The
+    ceiling is capped by host_ceiling(); arguments only apply on creation.
+    """
+    global _shared_controller
+    with _shared_controller_lock:
+        if _shared_controller is None:
+            ceiling = max(floor, host_ceiling(ceiling))
+            _shared_controller = AdaptiveConcurrency(floor=floor, ceiling=ceiling, on_decrease=on_decrease)
+        return _shared_controller
@@ -0,0 +1,26 @@
+"""
+Change detection for SQLite files, for in-process caches built from them.
+
+Standard library only, so lightweight modules such as station_resolver can use
+it without pulling in numpy or pandas.
+"""
+
+import os
+
+
+def db_signature(db_path: str) -> tuple:
+    """
+    (mtime, size) of a SQLite DB and of its WAL, to tell when it has changed.
+
+    An empty WAL is ignored: every reader of a WAL-mode DB creates one, and it
+    disappears again when the last connection closes.
+    """
+    signature = []
+    for path in (db_path, f'{db_path}-wal'):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            signature.append(None)
+            continue
+        signature.append((stat.st_mtime_ns, stat.st_size) if stat.st_size else None)
+    return tuple(signature)
@@ -10,6 +10,7 @@ import time
 from functools import lru_cache # we should save/load cache from local disk instead of RAM
 from typing import List, Optional
 import pytz
+from station_resolver import get_resolver
 '''
 this version of code use google api for getting transit time in tokyo, which is not supported due to licensing restrictions
 but i'm arachiving this code for use with other cities in the future
@@ -55,37 +56,16 @@ def format_station_name(base_name: str) -> str:
     """
     Formats a station name based on data in the 'property' table.
 
+    Lookups go through the shared in-memory StationResolver, which loads the
+    station -> prefecture mapping once and reloads it when the rent DB changes.
+
     Args:
         base_name (str): The base name of the station.
 
     Returns:
         str: The formatted station name in the format "Station Station, Prefecture".
     """
-    # Establish a connection to your database
-    connection = sqlite3.connect("Dataset/tokyo_rent.db")  # Replace with your database path
-    cursor = connection.cursor()
-    try:
-        # Query the database for the station and prefecture
-        cursor.execute('PRAGMA journal_mode=WAL')
-        cursor.execute(
-            "SELECT station, prefecture FROM properties WHERE station = ?",
-            (base_name,)
-        )
-        result = cursor.fetchone()
-
-        # Check if the query returned a result
-        if result:
-            station, prefecture = result
-            return f"{station} Station, {prefecture}"
-        else:
-            print(f"Station not found in the database: {base_name}")  # Add this line for debugging
-            return f"Station not found: {base_name}"
-    except sqlite3.Error as e:
-        print(f"An error occurred while querying the database: {e}")  # Add this line for debugging
-        return f"Database error: {e}"
-    finally:
-        # Ensure the connection is closed
-        connection.close()
+    return get_resolver().format(base_name)
 
 def get_departure_time() -> datetime:
     """Get departure time at 8 AM Tokyo time"""
@@ -0,0 +1,224 @@
+import atexit
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_PAGES = 50
+
+
+@lru_cache(maxsize=1)
+def get_driver_path() -> str:
+    """
+    Resolve the chromedriver binary path once per process.
+
+    ChromeDriverManager().install() hits the network and the filesystem to check
+    versions, so calling it for every fetch is as slow as the page load itself.
+
+    Returns:
+        str: Path to the chromedriver binary
+    """
+    return ChromeDriverManager().install()
+
+
+def build_chrome_options() -> webdriver.ChromeOptions:
+    """Headless Chrome options used for every pooled driver."""
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--no-sandbox")  # Bypass OS security model
+    chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
+    chrome_options.add_argument("--disable-gpu")  # Disable GPU acceleration
+    chrome_options.add_argument("--window-size=1920x1080")  # Set window size
+    chrome_options.add_argument("--disable-extensions")  # Disable extensions
+    return chrome_options
+
+
+class DriverPool:
+    """
+    Fixed-size pool of headless Chrome drivers shared by fetch workers.
+
+    Drivers are created lazily up to `size`, health-checked before being handed
+    out, and recycled (quit and replaced) after `max_pages` page loads so a long
+    sweep doesn't accumulate Chrome memory leaks.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_pages: int = DEFAULT_MAX_PAGES):
+        if size < 1:
+            raise ValueError("DriverPool size must be at least 1")
+        self.size = size
+        self.max_pages = max_pages
+        self._idle: "queue.LifoQueue[webdriver.Chrome]" = queue.LifoQueue()
+        self._slots = threading.Semaphore(size)
+        self._pages: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create_driver(self) -> webdriver.Chrome:
+        service = Service(get_driver_path())
+        driver = webdriver.Chrome(service=service, options=build_chrome_options())
+        with self._lock:
+            self._pages[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver: webdriver.Chrome) -> None:
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error quitting driver: {str(e)}")
+
+    @staticmethod
+    def _is_healthy(driver: webdriver.Chrome) -> bool:
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> webdriver.Chrome:
+        """
+        Borrow a driver, blocking until one is free.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for a free slot, None waits forever
+
+        Returns:
+            webdriver.Chrome: A healthy driver owned by the caller until release()
+        """
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a Chrome driver")
+        try:
+            while True:
+                try:
+                    driver = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._create_driver()
+                if self._is_healthy(driver):
+                    return driver
+                logging.warning("Discarding unhealthy Chrome driver")
+                self._discard(driver)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, driver: webdriver.Chrome, broken: bool = False) -> None:
+        """
+        Return a borrowed driver to the pool.
+
+        Args:
+            driver (webdriver.Chrome): Driver obtained from acquire()
+            broken (bool): Quit the driver instead of reusing it
+        """
+        try:
+            with self._lock:
+                pages = self._pages.get(id(driver), 0) + 1
+                self._pages[id(driver)] = pages
+            if broken or self._closed or pages >= self.max_pages:
+                self._discard(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def borrow(self, timeout: Optional[float] = None):
+        """Context manager around acquire()/release(); the driver is discarded if the block raises."""
+        driver = self.acquire(timeout=timeout)
+        broken = False
+        try:
+            yield driver
+        except BaseException:
+            broken = not self._is_healthy(driver)
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def resize(self, size: int) -> None:
+        """Grow the pool to at least `size` drivers. Shrinking is not supported."""
+        with self._lock:
+            extra = size - self.size
+            if extra <= 0:
+                return
+            self.size = size
+        for _ in range(extra):
+            self._slots.release()
+
+    def trim(self, keep: int) -> int:
+        """
+        Quit idle drivers until at most `keep` are left, e.g. to free memory after
+        the fetch concurrency was lowered. The pool can still grow back later.
+
+        Returns:
+            int: Number of drivers quit
+        """
+        quit_count = 0
+        while self._idle.qsize() > keep:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+            quit_count += 1
+        return quit_count
+
+    def close(self) -> None:
+        """Quit all idle drivers. Borrowed drivers are quit when they are released."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+
+_shared_pool: Optional[DriverPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool(size: Optional[int] = None) -> DriverPool:
+    """
+    Get the process-wide driver pool, creating it on first use.
+
+    Args:
+        size (Optional[int]): Minimum pool size; the shared pool grows to fit it
+
+    Returns:
+        DriverPool: The shared pool
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None or _shared_pool._closed:
+            _shared_pool = DriverPool(size=size or DEFAULT_POOL_SIZE)
+        elif size:
+            _shared_pool.resize(size)
+        return _shared_pool
+
+
+def trim_shared_pool(keep: int) -> int:
+    """DriverPool.trim on the shared pool, if one has been created; returns the number of drivers quit."""
+    with _shared_pool_lock:
+        pool = _shared_pool
+    return pool.trim(keep) if pool is not None else 0
+
+
+def close_shared_pool() -> None:
+    """Shut down the shared pool, quitting every idle Chrome process."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            _shared_pool.close()
+            _shared_pool = None
+
+
+atexit.register(close_shared_pool)
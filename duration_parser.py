@@ -0,0 +1,65 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+# Unit keywords in the languages Google Maps answers in. A unit matches if it
+# contains any keyword, so plurals and abbreviations ("hrs", "mins") are covered.
+DAY_KEYWORDS = ('day', '日', '天', '일')
+HOUR_KEYWORDS = ('hr', 'hour', 'h', '時間', '小時', '小时', 'stunden', 'heure', 'ora', '시간')
+MINUTE_KEYWORDS = ('min', 'm', '分', '分钟', 'minuti', 'minuten', '분')
+
+_TOKEN_RE = re.compile(r'(\d+)\s*([^\d\s]*)')
+_DAY_RE = re.compile('|'.join(map(re.escape, DAY_KEYWORDS)), re.IGNORECASE)
+_HOUR_RE = re.compile('|'.join(map(re.escape, HOUR_KEYWORDS)), re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def parse_duration(transit_time: Optional[str]) -> Optional[int]:
+    """
+    Convert a scraped transit time like "1 hr 5 min" or "4 小時 30 分" to minutes.
+
+    Numbers without a recognised unit count as minutes. Results are memoized,
+    since a cache holds only a few hundred distinct duration strings.
+
+    >>> parse_duration("27 分")
+    27
+    >>> parse_duration("4 小時 30 分")
+    270
+    >>> parse_duration("1 hr 5 min")
+    65
+    >>> parse_duration("2 Stunden 3 Minuten")
+    123
+    >>> parse_duration("1 시간 10 분")
+    70
+    >>> parse_duration("1 day 2 hr")
+    1560
+    >>> parse_duration("45")
+    45
+    >>> parse_duration("No route") is None
+    True
+
+    Args:
+        transit_time (Optional[str]): Text of the Google Maps duration element
+
+    Returns:
+        Optional[int]: Total minutes, or None if nothing could be parsed
+    """
+    if not transit_time:
+        return None
+
+    total_minutes = 0
+    for number, unit in _TOKEN_RE.findall(transit_time):
+        if unit and _DAY_RE.search(unit):
+            total_minutes += int(number) * 24 * 60
+        elif unit and _HOUR_RE.search(unit):
+            total_minutes += int(number) * 60
+        else:
+            total_minutes += int(number)
+
+    return total_minutes if total_minutes > 0 else None
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod(verbose=False)
@@ -0,0 +1,54 @@
+"""
+Order live fetches nearest-first so the reachable set fills in early.
+
+Uncached pairs are grouped into distance rings around their origin using the
+local geocoding cache. parallel_processing fetches the rings nearest-first,
+queueing the next ring while the current one drains, and stops once completed
+rings stop producing anything within the commute limit.
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pruning import haversine_km
+
+DEFAULT_RING_KM = 5.0
+
+Pair = Tuple[str, str]
+Coordinates = Callable[[str], Optional[Dict[str, float]]]
+
+
+def distance_rings(pairs: List[Pair], coordinates: Coordinates,
+                   ring_km: float = DEFAULT_RING_KM) -> Tuple[List[List[Pair]], List[Pair]]:
+    """
+    Group (origin, destination) pairs into concentric distance rings.
+
+    Args:
+        pairs (List[Tuple[str, str]]): Pairs to schedule
+        coordinates (Callable): Cached-coordinate lookup, returns None for unknown addresses
+        ring_km (float): Width of each ring in km
+
+    Returns:
+        Tuple[List[List[Tuple[str, str]]], List[Tuple[str, str]]]:
+            Non-empty rings from nearest to farthest (each sorted nearest-first),
+            and the pairs whose distance is unknown
+    """
+    rings: Dict[int, List[Tuple[float, Pair]]] = defaultdict(list)
+    unplaced = []
+    for pair in pairs:
+        origin_coords = coordinates(pair[0])
+        destination_coords = coordinates(pair[1])
+        if not origin_coords or not destination_coords:
+            unplaced.append(pair)
+            continue
+        distance = haversine_km(origin_coords, destination_coords)
+        rings[int(distance // ring_km)].append((distance, pair))
+
+    ordered = [[pair for _, pair in sorted(rings[index])] for index in sorted(rings)]
+    return ordered, unplaced
+
+
+def ring_exhausted(durations: List[Optional[int]], max_duration: float) -> bool:
+    """True if a ring produced parsed durations and every one of them is over the limit."""
+    parsed = [duration for duration in durations if duration is not None]
+    return bool(parsed) and all(duration > max_duration for duration in parsed)
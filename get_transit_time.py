@@ -1,205 +1,424 @@
 import logging
-from typing import Optional, Tuple, List, Callable
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from urllib.parse import quote
-from datetime import datetime
-import sqlite3
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-def create_cache_db():
-    conn = sqlite3.connect('transit_cache.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS transit_cache (
-        uuid INTEGER PRIMARY KEY AUTOINCREMENT,       
-        origin TEXT,
-        destination TEXT,
-        depart_time TEXT,  
-        transit_time TEXT,
-        duration INTEGER
-    )
-''') # use TEXT to handle None values for other applactions
-
-    conn.commit()
-    conn.close()
+from typing import TYPE_CHECKING, Optional, Tuple, List, Callable, Dict, Iterator, Any
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from cache_refresher import CacheRefresher
+from coalescer import RequestCoalescer
+from concurrency import AdaptiveConcurrency, get_shared_controller
+from duration_parser import parse_duration
+from fetch_scheduler import DEFAULT_RING_KM, distance_rings, ring_exhausted
+from metrics import CACHE_LOOKUPS, FETCHES, FETCH_SECONDS, FETCH_CONCURRENCY
+from transit_backends import ChromeBackend, FetchTimeout, TransitBackend, get_default_backend
+from transit_cache import (create_cache_db, check_transit_cache, bulk_check_transit_cache, bulk_check_nearest_bucket,
+                           check_transit_failure, bulk_check_transit_failures, get_cache_writer)
+
+if TYPE_CHECKING:
+    # driver_pool imports selenium; only ChromeBackend loads it at runtime
+    from driver_pool import DriverPool
 
 create_cache_db()
 
-def check_transit_cache(origin: str, destination: str, depart_time: Optional[int]) -> Optional[str]:
+_fetch_coalescer = RequestCoalescer()
+
+# Prefixes of the error strings direction_API_demo.format_station_name returns in place of an address
+INVALID_LOCATION_PREFIXES = ("Station not found:", "Database error:")
+
+def get_transit_time(origin: str, destination: str, depart_time: Optional[int] = None,
+                     pool: Optional['DriverPool'] = None,
+                     refresh: bool = False,
+                     backend: Optional[TransitBackend] = None) -> Tuple[str, Optional[str], Optional[int], str]:
+    # First check the cache (unless we are deliberately refetching a stale entry)
+    if not refresh:
+        cached_result = check_transit_cache(origin, destination, depart_time)
+        if cached_result:
+            return origin, destination, depart_time, cached_result
+
+    # Don't pay the browser timeout again for a pair that recently failed
+    if check_transit_failure(origin, destination, depart_time):
+        return origin, destination, depart_time, None
+
+    # Concurrent callers asking for the same pair share one live fetch
+    return _fetch_coalescer.run((origin, destination, depart_time),
+                                _fetch_transit_time, origin, destination, depart_time, pool, refresh, backend)
+
+def get_coalescing_stats() -> Dict[str, int]:
     """
-    Check if transit time exists in cache.
-    
+    Live fetch counters for this process.
+
+    Returns:
+        Dict[str, int]: 'calls' (live fetches started), 'coalesced' (fetches saved by
+            joining one already in flight) and 'inflight' (fetches running right now)
+    """
+    return _fetch_coalescer.stats()
+
+def start_background_refresh(max_per_minute: float = 6) -> CacheRefresher:
+    """
+    Start refreshing stale cache entries in the background.
+
+    Refreshes share the driver pool with foreground fetches, so they pause while
+    any live fetch is in flight.
+
     Args:
-        origin (str): Starting location
-        destination (str): Ending location
-        depart_time (Optional[int]): Departure time
-        
+        max_per_minute (float): Upper bound on refresh fetches per minute
+
     Returns:
-        Optional[str]: Cached transit time if found, None otherwise
+        CacheRefresher: The running refresher (call stop() to end it)
     """
-    conn = sqlite3.connect('transit_cache.db')
-    cursor = conn.cursor()
-    try:
-        # Convert depart_time to string to match DB schema
-        depart_time_str = str(depart_time) if depart_time is not None else None
-        
-        cursor.execute('''
-            SELECT transit_time FROM transit_cache
-            WHERE origin = ? 
-            AND destination = ? 
-            AND (depart_time = ? OR (depart_time IS NULL AND ? IS NULL))
-            AND transit_time IS NOT NULL
-        ''', (origin, destination, depart_time_str, depart_time_str))
-        
-        result = cursor.fetchone()
-        return result[0] if result else None
-    finally:
-        conn.close()
+    return CacheRefresher(
+        fetch=lambda origin, destination, depart_time: get_transit_time(origin, destination, depart_time, refresh=True),
+        busy=lambda: _fetch_coalescer.inflight_count() > 0,
+        max_per_minute=max_per_minute,
+    ).start()
+
+def get_fetch_concurrency() -> AdaptiveConcurrency:
+    """
+    Process-wide adaptive limit on live fetches, shared by every sweep.
+
+    When it backs off, the default backend releases idle resources beyond the
+    new limit (ChromeBackend quits idle drivers so the memory is given back).
+    """
+    return get_shared_controller(on_decrease=lambda limit: get_default_backend().trim(limit))
+
+def _fetch_transit_time(origin: str, destination: str, depart_time: Optional[int],
+                        pool: Optional['DriverPool'], refresh: bool = False,
+                        backend: Optional[TransitBackend] = None) -> Tuple[str, Optional[str], Optional[int], str]:
+    # Another caller may have finished this pair between our cache check and now
+    if not refresh:
+        cached_result = check_transit_cache(origin, destination, depart_time)
+        if cached_result:
+            return origin, destination, depart_time, cached_result
+
+    # format_station_name returns an error message instead of an address for unknown stations
+    if origin.startswith(INVALID_LOCATION_PREFIXES) or destination.startswith(INVALID_LOCATION_PREFIXES):
+        get_cache_writer().put_failure(origin, destination, depart_time, 'station_not_found')
+        FETCHES.inc(outcome='station_not_found')
+        return origin, destination, depart_time, None
+
+    # An explicit pool means Chrome on that pool; otherwise whatever backend is configured
+    if backend is None:
+        backend = ChromeBackend(pool) if pool is not None else get_default_backend()
 
-def get_transit_time(origin: str, destination: str, depart_time: Optional[int] = None) -> Tuple[str, Optional[str], Optional[int], str]:
-    # Convert depart_time to string to match DB schema
-    depart_time_str = str(depart_time) if depart_time is not None else None
-    
-    # First check the cache
-    cached_result = check_transit_cache(origin, destination, depart_time)
-    if cached_result:
-        return origin, destination, depart_time, cached_result
-
-    # Initialize database connection for storing new results
-    conn = sqlite3.connect('transit_cache.db')
-    cursor = conn.cursor()
-    
     try:
-        # Construct URL with encoded parameters
-        base_url = "https://www.google.com/maps/dir/"
-        url = f"{base_url}{quote(origin)}/{quote(destination)}/data=!4m2!4m1!3e3"
-    
-        # Add departure time parameter if specified
-        if depart_time is not None:
-            # Convert departure time to Unix timestamp for today
-            today = datetime.now().replace(hour=depart_time, minute=0, second=0, microsecond=0)
-            timestamp = int(today.timestamp())
-            url = f"{base_url}{quote(origin)}/{quote(destination)}/data=!4m2!4m1!3e3!5m1!2b1!3b1!6e0!7e2!8j{timestamp}"
-
-        # Add more Chrome options to match the working version
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.add_argument("--headless")  # Run in headless mode
-        chrome_options.add_argument("--no-sandbox")  # Bypass OS security model
-        chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-        chrome_options.add_argument("--disable-gpu")  # Disable GPU acceleration
-        chrome_options.add_argument("--window-size=1920x1080")  # Set window size
-        chrome_options.add_argument("--disable-extensions")  # Disable extensions
-
-        # Set up the driver
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        with FETCH_SECONDS.time():
+            transit_time = backend.fetch(origin, destination, depart_time)
         
-        # Navigate to the URL
-        driver.get(url)
-        
-        # Wait for the transit time element to be present
-        wait = WebDriverWait(driver, 5)
-        transit_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".Fk3sm.fontHeadlineSmall")))
-        
-        if transit_element:
-            transit_time = transit_element.text.strip()
-            
-            # Now cursor and conn are defined
-            cursor.execute('''
-                INSERT INTO transit_cache (origin, destination, depart_time, transit_time)
-                VALUES (?, ?, ?, ?)
-            ''', (origin, destination, depart_time_str, transit_time))
-            conn.commit()
+        duration = parse_duration(transit_time)
+        if duration is not None:
+            # Hand the result to the single cache writer instead of committing per row
+            get_cache_writer().put(origin, destination, depart_time, transit_time, duration)
+            FETCHES.inc(outcome='success')
             
-            driver.quit()
             return origin, destination, depart_time, transit_time
         else:
-            driver.quit()
+            get_cache_writer().put_failure(origin, destination, depart_time, 'parse_error')
+            FETCHES.inc(outcome='parse_error')
             return origin, destination, depart_time, None
         
+    except FetchTimeout:
+        logging.warning(f"Timed out waiting for transit time: {origin} → {destination}")
+        get_cache_writer().put_failure(origin, destination, depart_time, 'timeout')
+        FETCHES.inc(outcome='timeout')
+        return origin, destination, depart_time, None
     except Exception as e:
         logging.error(f"Unexpected error: {str(e)}")
+        get_cache_writer().put_failure(origin, destination, depart_time, 'error')
+        FETCHES.inc(outcome='error')
         return origin, destination, depart_time, None
+
+def _fetch_result(future: Future, location: Tuple[str, str],
+                  depart_time: Optional[int]) -> Tuple[str, Optional[str], Optional[int], str]:
+    """Result of a finished fetch, logged; a fetch that raised counts as failed."""
+    origin, destination = location
+    try:
+        result = future.result()
+    except Exception as e:
+        logging.error(f"Error processing {origin} to {destination}: {str(e)}")
+        return (origin, destination, depart_time, None)
+
+    # Extract transit time from the result
+    transit_time = result[3]
+
+    if transit_time:
+        logging.debug(f"✅LIVE FETCH: {origin} → {destination} = {transit_time}")
+    else:
+        logging.debug(f"❌ FETCH FAILED: {origin} → {destination}")
+    return result
+
+def _iter_batch(executor: ThreadPoolExecutor, batch: List[Tuple[str, str]],
+                transit_function: Callable[[str, str, Optional[int]], Tuple[str, Optional[str], Optional[int], str]],
+                depart_time: Optional[int]) -> Iterator[Tuple[str, Optional[str], Optional[int], str]]:
+    """Fetch one batch of pairs on the executor, yielding results as they complete."""
+    future_to_location = {
+        executor.submit(transit_function, origin, destination, depart_time): (origin, destination)
+        for origin, destination in batch
+    }
+    
+    try:
+        for future in as_completed(future_to_location):
+            yield _fetch_result(future, future_to_location[future], depart_time)
     finally:
-        cursor.close()
-        conn.close()
+        # On Ctrl-C or when the consumer stops iterating, drop the fetches that haven't started
+        for future in future_to_location:
+            future.cancel()
 
-def parallel_processing(locations: List[Tuple[str, str]], 
-                       transit_function: Callable[[str, str, Optional[int]], Tuple[str, Optional[str], Optional[int], str]] = get_transit_time, 
-                       num_workers: int = 5,
-                       depart_time: Optional[int] = None) -> List[Tuple[str, Optional[str], Optional[int], str]]:
+def _iter_rings(executor: ThreadPoolExecutor, rings: List[List[Tuple[str, str]]],
+                transit_function: Callable[[str, str, Optional[int]], Tuple[str, Optional[str], Optional[int], str]],
+                depart_time: Optional[int], max_duration: float, patience: int,
+                not_checked: List[Tuple[str, str]]) -> Iterator[Tuple[str, Optional[str], Optional[int], str]]:
     """
-    Process multiple transit requests in parallel with cache checking.
+    Fetch distance rings nearest-first, yielding results as they complete.
 
-    Args:
-        locations (List[Tuple[str, str]]): List of tuples containing (origin, destination).
-        transit_function (Callable): The function to call for each origin-destination pair.
-        num_workers (int): Number of concurrent workers.
-        depart_time (Optional[int]): Optional departure time for transit checks.
+    The next ring is queued while the current one drains, so workers never wait
+    on a ring's slowest fetch. Rings are judged in order, each once all of its
+    fetches are done; after `patience` consecutive rings with nothing within
+    `max_duration`, queued fetches that haven't started are cancelled and no
+    further rings are submitted. Those pairs are appended to `not_checked`
+    before the result that triggered the cutoff is yielded.
+    """
+    pending: Dict[Future, Tuple[int, Tuple[str, str]]] = {}
+    remaining = [len(ring) for ring in rings]
+    durations: List[List[Optional[int]]] = [[] for _ in rings]
+    submitted = decided = misses = 0
+    stopped = False
 
-    Returns:
-        List[Tuple[Optional[str], str]]: List of results from the transit function.
+    def submit_next():
+        nonlocal submitted
+        for origin, destination in rings[submitted]:
+            future = executor.submit(transit_function, origin, destination, depart_time)
+            pending[future] = (submitted, (origin, destination))
+        submitted += 1
+
+    try:
+        # One ring fetching, the next one queued behind it
+        while submitted < min(2, len(rings)):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, location = pending.pop(future)
+                result = _fetch_result(future, location, depart_time)
+                durations[index].append(parse_duration(result[3]))
+                remaining[index] -= 1
+                while not stopped and decided < submitted and remaining[decided] == 0:
+                    misses = misses + 1 if ring_exhausted(durations[decided], max_duration) else 0
+                    decided += 1
+                    if misses >= patience:
+                        stopped = True
+                        for queued, (_, queued_location) in list(pending.items()):
+                            if queued.cancel():
+                                del pending[queued]
+                                not_checked.append(queued_location)
+                        not_checked.extend(pair for ring in rings[submitted:] for pair in ring)
+                    elif submitted < len(rings):
+                        submit_next()
+                yield result
+    finally:
+        # On Ctrl-C or when the consumer stops iterating, drop the fetches that haven't started
+        for future in pending:
+            future.cancel()
+
+def iter_parallel_processing(locations: List[Tuple[str, str]], 
+                             transit_function: Callable[[str, str, Optional[int]], Tuple[str, Optional[str], Optional[int], str]] = get_transit_time, 
+                             num_workers: int = 5,
+                             depart_time: Optional[int] = None,
+                             coordinates: Optional[Callable[[str], Optional[Dict[str, float]]]] = None,
+                             max_duration: Optional[int] = None,
+                             ring_km: float = DEFAULT_RING_KM,
+                             patience: int = 2,
+                             max_fallback_hours: Optional[int] = 0,
+                             concurrency: Optional[AdaptiveConcurrency] = None,
+                             progress_interval: float = 5.0) -> Iterator[Tuple[Tuple[str, Optional[str], Optional[int], str], Dict[str, Any]]]:
     """
-    results = []
-    uncached_locations = []
+    Streaming version of parallel_processing: yield each result as soon as it's known.
+
+    Cache hits are yielded first, then live fetches in completion order. Every
+    result comes with a progress dict:
+        done (int): results yielded so far
+        total (int): results expected (shrinks if early termination skips pairs)
+        skipped (int): farther pairs left unchecked by early termination
+        cache_hits (int): results served from the cache, including known failures
+        fallback_hits (int): cache hits served from a different departure bucket
+        known_failures (int): pairs skipped because a recent fetch failed
+        hit_rate (float): cache_hits / total
+        elapsed (float): seconds since the call started
+        eta (Optional[float]): estimated seconds left, None until the first live fetch finishes
+
+    Arguments are the same as parallel_processing.
+    """
+    start = time.monotonic()
+    coalesced_before = get_coalescing_stats()["coalesced"]
+    progress = {"done": 0, "total": len(locations), "skipped": 0, "cache_hits": 0, "fallback_hits": 0,
+                "known_failures": 0, "hit_rate": 0.0, "elapsed": 0.0, "eta": None}
+    fetch_start = None
+    fetched = 0
+    failed = 0
+    not_checked: List[Tuple[str, str]] = []
+    last_report = start
+
+    def advance(result, cached=False):
+        nonlocal fetched, failed, last_report
+        now = time.monotonic()
+        progress["done"] += 1
+        if cached:
+            progress["cache_hits"] += 1
+        else:
+            fetched += 1
+            failed += result[3] is None
+            if concurrency is not None:
+                FETCH_CONCURRENCY.set(concurrency.limit)
+        progress["elapsed"] = now - start
+        progress["hit_rate"] = progress["cache_hits"] / progress["total"] if progress["total"] else 0.0
+        if fetched:
+            remaining = progress["total"] - progress["done"]
+            progress["eta"] = (now - fetch_start) / fetched * remaining
+        elif progress["done"] == progress["total"]:
+            progress["eta"] = 0.0
+        # One sampled line instead of one per pair; set logging to DEBUG for per-pair detail
+        if now - last_report >= progress_interval and progress["done"] < progress["total"]:
+            last_report = now
+            eta = f", ~{progress['eta']:.0f}s left" if progress["eta"] else ""
+            print(f"📈 {progress['done']}/{progress['total']} pairs | {progress['cache_hits']} cached | "
+                  f"{fetched} fetched ({failed} failed){eta}")
+        return result, dict(progress)
 
     print("\nProcessing transit requests...")
     print("-" * 50)
 
-    # First batch process all cache checks
+    # First resolve all cache checks in one bulk lookup
+    if max_fallback_hours == 0:
+        cached_results, uncached_locations = bulk_check_transit_cache(locations, depart_time)
+        cached_buckets = {}
+    else:
+        nearest = bulk_check_nearest_bucket(locations, depart_time, max_fallback_hours)
+        cached_results = {pair: transit_time for pair, (transit_time, _) in nearest.items()}
+        cached_buckets = {pair: bucket for pair, (_, bucket) in nearest.items() if bucket != depart_time}
+        uncached_locations = [pair for pair in locations if pair not in cached_results]
+    known_failures = bulk_check_transit_failures(uncached_locations, depart_time)
+    uncached_locations = [pair for pair in uncached_locations if pair not in known_failures]
+    CACHE_LOOKUPS.inc(len(cached_results) - len(cached_buckets), result='hit')
+    CACHE_LOOKUPS.inc(len(cached_buckets), result='fallback_hit')
+    CACHE_LOOKUPS.inc(len(known_failures), result='known_failure')
+    CACHE_LOOKUPS.inc(len(uncached_locations), result='miss')
+    print(f"{len(cached_results)} cached ({len(cached_buckets)} from other departure buckets), "
+          f"{len(known_failures)} known failures, {len(uncached_locations)} to fetch")
     for origin, destination in locations:
-        cached_result = check_transit_cache(origin, destination, depart_time)
-        if cached_result:
-            print(f"💪 CACHE HIT: {origin} → {destination} = {cached_result}")
-            results.append((origin, destination, depart_time, cached_result))
-        else:
-            print(f"😅 CACHE MISS: {origin} → {destination} (will fetch live)")
-            uncached_locations.append((origin, destination))
+        cached_result = cached_results.get((origin, destination))
+        if (origin, destination) in cached_buckets:
+            bucket = cached_buckets[(origin, destination)]
+            logging.debug(f"💪 CACHE HIT: {origin} → {destination} = {cached_result} "
+                          f"(from {'leave now' if bucket is None else f'{bucket:02d}:00'} bucket)")
+            progress["fallback_hits"] += 1
+            yield advance((origin, destination, depart_time, cached_result), cached=True)
+        elif cached_result:
+            logging.debug(f"💪 CACHE HIT: {origin} → {destination} = {cached_result}")
+            yield advance((origin, destination, depart_time, cached_result), cached=True)
+        elif (origin, destination) in known_failures:
+            logging.debug(f"🚫 KNOWN FAILURE: {origin} → {destination} ({known_failures[(origin, destination)]}, skipping)")
+            progress["known_failures"] += 1
+            yield advance((origin, destination, depart_time, None), cached=True)
 
     # Then process only uncached requests in parallel
     if uncached_locations:
         print(f"\nFetching {len(uncached_locations)} uncached results in parallel...")
         print("-" * 50)
+
+        if concurrency is not None:
+            # Start a worker per slot the controller could ever allow; it decides how many actually fetch
+            num_workers = concurrency.ceiling
+            limited_function = transit_function
+
+            def transit_function(origin, destination, depart_time):
+                with concurrency.slot() as outcome:
+                    result = limited_function(origin, destination, depart_time)
+                    outcome['ok'] = result[3] is not None
+                    return result
+
+        # Let the default backend make room for every worker (ChromeBackend grows the driver pool)
+        get_default_backend().reserve(num_workers)
+        fetch_start = time.monotonic()
         
-        with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            future_to_location = {
-                executor.submit(transit_function, origin, destination, depart_time): (origin, destination)
-                for origin, destination in uncached_locations
-            }
-            
-            for future in as_completed(future_to_location):
-                origin, destination = future_to_location[future]
-                try:
-                    result = future.result()
-                    
-                    # Extract transit time from the result
-                    transit_time = result[3]
-                    
-                    if transit_time:
-                        print(f"✅LIVE FETCH: {origin} → {destination} = {transit_time}")
-                    else:
-                        print(f"❌ FETCH FAILED: {origin} → {destination}")
-                    
-                    results.append(result)
-                except Exception as e:
-                    error_msg = f"Error: {str(e)}"
-                    print(f"✗ ERROR: {origin} → {destination} ({error_msg})")
-                    logging.error(f"Error processing {origin} to {destination}: {str(e)}")
-                    results.append((origin, destination, depart_time, None))
+        try:
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                if coordinates is not None and max_duration is not None:
+                    rings, unplaced = distance_rings(uncached_locations, coordinates, ring_km)
+                    for result in _iter_rings(executor, rings, transit_function, depart_time,
+                                              max_duration, patience, not_checked):
+                        if len(not_checked) > progress["skipped"]:
+                            progress["skipped"] = len(not_checked)
+                            progress["total"] = len(locations) - len(not_checked)
+                            print(f"\n🛑 Nothing within {max_duration} min in the last {patience} rings, "
+                                  f"skipping {len(not_checked)} farther pairs")
+                            for origin, destination in not_checked:
+                                logging.debug(f"⏭️ NOT CHECKED: {origin} → {destination}")
+                        yield advance(result)
+                    for result in _iter_batch(executor, unplaced, transit_function, depart_time):
+                        yield advance(result)
+                else:
+                    for result in _iter_batch(executor, uncached_locations, transit_function, depart_time):
+                        yield advance(result)
+        finally:
+            # Make the fetched rows visible to the reachability queries that follow
+            get_cache_writer().flush()
 
     print("\nProcessing complete!")
     print(f"Total requests: {len(locations)}")
-    print(f"Cache hits: {len(locations) - len(uncached_locations)}")
-    print(f"Live fetches: {len(uncached_locations)}")
+    print(f"Cache hits: {len(cached_results)} ({len(cached_buckets)} from other departure buckets)")
+    print(f"Known failures skipped: {len(known_failures)}")
+    print(f"Live fetches: {fetched} ({failed} failed)")
+    print(f"Skipped beyond reach: {len(not_checked)}")
+    print(f"Fetches shared with concurrent requests: {get_coalescing_stats()['coalesced'] - coalesced_before}")
+    if concurrency is not None:
+        print(f"Concurrent fetch limit: {concurrency.stats()['limit']} (floor {concurrency.floor}, ceiling {concurrency.ceiling})")
     print("-" * 50)
 
-    return results
+def parallel_processing(locations: List[Tuple[str, str]], 
+                       transit_function: Callable[[str, str, Optional[int]], Tuple[str, Optional[str], Optional[int], str]] = get_transit_time, 
+                       num_workers: int = 5,
+                       depart_time: Optional[int] = None,
+                       coordinates: Optional[Callable[[str], Optional[Dict[str, float]]]] = None,
+                       max_duration: Optional[int] = None,
+                       ring_km: float = DEFAULT_RING_KM,
+                       patience: int = 2,
+                       max_fallback_hours: Optional[int] = 0,
+                       concurrency: Optional[AdaptiveConcurrency] = None,
+                       progress_interval: float = 5.0) -> List[Tuple[str, Optional[str], Optional[int], str]]:
+    """
+    Process multiple transit requests in parallel with cache checking.
+
+    When both `coordinates` and `max_duration` are given, uncached pairs are fetched
+    nearest-first in rings of `ring_km`, the next ring queued while the current one
+    drains, and fetching stops after `patience` consecutive completed rings return
+    only durations above `max_duration`; progress["skipped"] counts the pairs left
+    unchecked. Pairs without
+    cached coordinates are always fetched, after the rings.
+
+    Args:
+        locations (List[Tuple[str, str]]): List of tuples containing (origin, destination).
+        transit_function (Callable): The function to call for each origin-destination pair.
+        num_workers (int): Number of concurrent workers. Ignored when `concurrency` is given.
+        depart_time (Optional[int]): Optional departure time for transit checks.
+        coordinates (Optional[Callable]): Cached-coordinate lookup used to order fetches.
+        max_duration (Optional[int]): Commute limit in minutes used for early termination.
+        ring_km (float): Width of each distance ring in km.
+        patience (int): Consecutive out-of-reach rings before the remaining rings are skipped.
+        max_fallback_hours (Optional[int]): Serve pairs missing from the `depart_time` bucket
+            from the nearest cached bucket up to this many hours away (None for any bucket,
+            including "leave now"). 0 only accepts exact hits.
+        concurrency (Optional[AdaptiveConcurrency]): Adjust the number of concurrent live
+            fetches between its floor and ceiling from observed latency, timeouts and free
+            memory instead of running `num_workers` at once (see get_fetch_concurrency).
+        progress_interval (float): Seconds between sampled progress lines. Per-pair
+            lines are logged at DEBUG level.
+
+    Returns:
+        List[Tuple[Optional[str], str]]: List of results from the transit function,
+            excluding pairs skipped by early termination.
+    """
+    return [result for result, _ in iter_parallel_processing(
+        locations, transit_function, num_workers, depart_time,
+        coordinates=coordinates, max_duration=max_duration, ring_km=ring_km, patience=patience,
+        max_fallback_hours=max_fallback_hours, concurrency=concurrency,
+        progress_interval=progress_interval)]
 
 
 # Example usage
@@ -0,0 +1,168 @@
+"""
+Build or update Dataset/tokyo_rent.db from a properties CSV export.
+
+Loads every row in one transaction, derives cost_per_square (cost / size), and
+indexes the columns the apps filter on, so station and prefecture lookups are
+index seeks instead of table scans. Rows are upserted by id: re-running with a
+newer export appends new listings and updates changed ones. Rent statistics
+(rent_stats.station_rent_stats) are refreshed for the stations whose listings
+were added, changed or moved.
+
+Usage:
+    python ingest_properties.py
+    python ingest_properties.py --csv new_listings.csv --db Dataset/tokyo_rent.db
+"""
+
+import argparse
+import csv
+import sqlite3
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import rent_stats
+
+CSV_PATH = 'Dataset/properties.csv'
+RENT_DB_PATH = 'Dataset/tokyo_rent.db'
+
+# (column, SQLite type) in CSV order; cost_per_square is derived
+COLUMNS = [
+    ('id', 'INTEGER PRIMARY KEY'),
+    ('room_type', 'TEXT'),
+    ('category', 'TEXT'),
+    ('street', 'TEXT'),
+    ('city', 'TEXT'),
+    ('prefecture', 'TEXT'),
+    ('cost', 'REAL'),
+    ('size', 'REAL'),
+    ('deposit', 'REAL'),
+    ('key_money', 'REAL'),
+    ('floor', 'INTEGER'),
+    ('year', 'INTEGER'),
+    ('station', 'TEXT'),
+    ('minute', 'INTEGER'),
+    ('created_at', 'TEXT'),
+]
+DERIVED_COLUMNS = [('cost_per_square', 'REAL')]
+
+INDEXES = {
+    # "WHERE station = ?" / "station IN (...)": covers the prefecture and rent lookups too
+    'idx_properties_station': '(station, prefecture, cost_per_square)',
+    # "WHERE prefecture IN (...)" listing stations, and SELECT DISTINCT prefecture
+    'idx_properties_prefecture': '(prefecture, station)',
+    # rent_sketch.update reads listings after its (created_at, id) watermark
+    'idx_properties_created': '(created_at, id)',
+}
+
+
+def create_properties_table(conn: sqlite3.Connection) -> None:
+    """Create the properties table and its indexes, adding derived columns to older tables."""
+    columns = COLUMNS + DERIVED_COLUMNS
+    conn.execute('CREATE TABLE IF NOT EXISTS properties ({})'.format(
+        ', '.join(f'{name} {sql_type}' for name, sql_type in columns)))
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(properties)')}
+    for name, sql_type in DERIVED_COLUMNS:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE properties ADD COLUMN {name} {sql_type}')
+    for name, columns_sql in INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON properties {columns_sql}')
+
+
+def _convert(value: str, sql_type: str):
+    if value == '':
+        return None
+    if sql_type.startswith('INTEGER'):
+        return int(float(value))
+    if sql_type == 'REAL':
+        return float(value)
+    return value
+
+
+def cost_per_square(cost: Optional[float], size: Optional[float]) -> Optional[float]:
+    """Rent per m², or None when either side is missing or the size is zero."""
+    if cost is None or not size:
+        return None
+    return cost / size
+
+
+def read_rows(csv_path: str) -> Iterator[Tuple]:
+    """Typed rows from the CSV in COLUMNS order, with cost_per_square appended."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = [name for name, _ in COLUMNS if name not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{csv_path} is missing columns: {', '.join(missing)}")
+        for record in reader:
+            row = {name: _convert(record[name].strip(), sql_type) for name, sql_type in COLUMNS}
+            yield tuple(row.values()) + (cost_per_square(row['cost'], row['size']),)
+
+
+def upsert_sql() -> str:
+    names = [name for name, _ in COLUMNS + DERIVED_COLUMNS]
+    updates = ', '.join(f'{name} = excluded.{name}' for name in names if name != 'id')
+    return (f"INSERT INTO properties ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}")
+
+
+STATION_INDEX = [name for name, _ in COLUMNS].index('station')
+
+
+def stations_of_ids(conn: sqlite3.Connection, ids: List[int]) -> Set[str]:
+    """Stations the given listing ids are currently filed under."""
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS ingest_ids (id INTEGER PRIMARY KEY)')
+    conn.execute('DELETE FROM ingest_ids')
+    conn.executemany('INSERT OR IGNORE INTO ingest_ids (id) VALUES (?)', ((row_id,) for row_id in ids))
+    stations = {row[0] for row in conn.execute(
+        'SELECT DISTINCT station FROM properties JOIN ingest_ids USING (id) WHERE station IS NOT NULL')}
+    conn.execute('DELETE FROM ingest_ids')
+    return stations
+
+
+def ingest_csv(csv_path: str = CSV_PATH, db_path: str = RENT_DB_PATH) -> Dict[str, int]:
+    """
+    Upsert every row of `csv_path` into the properties table of `db_path`.
+
+    Args:
+        csv_path (str): CSV export with the COLUMNS header
+        db_path (str): Rent database, created if missing
+
+    Returns:
+        Dict[str, int]: 'rows' read, of which 'inserted' were new ids and 'updated' existing ones,
+        and 'stations' whose rent stats were refreshed
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        # WAL once at build time, so readers never need to switch the journal mode themselves
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            create_properties_table(conn)
+            before = conn.execute('SELECT COUNT(*) FROM properties').fetchone()[0]
+            rows = list(read_rows(csv_path))
+            has_stats = rent_stats.stats_table_exists(conn)
+            # Listings that change station leave their old station's stats stale too
+            touched = stations_of_ids(conn, [row[0] for row in rows]) if has_stats else set()
+            conn.executemany(upsert_sql(), rows)
+            after = conn.execute('SELECT COUNT(*) FROM properties').fetchone()[0]
+            if has_stats:
+                touched.update(row[STATION_INDEX] for row in rows)
+                rent_stats.refresh_station_stats(conn, touched)
+                stations = len(touched)
+            else:
+                stations = rent_stats.rebuild_station_stats(conn)
+        # Refresh planner statistics so station lookups pick the indexes
+        conn.execute('ANALYZE properties')
+    finally:
+        conn.close()
+    inserted = after - before
+    return {'rows': len(rows), 'inserted': inserted, 'updated': len(rows) - inserted, 'stations': stations}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=CSV_PATH, help="Properties CSV to load")
+    parser.add_argument("--db", default=RENT_DB_PATH, help="Rent database to create or update")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = ingest_csv(args.csv, args.db)
+    print(f"{args.db}: {counts['rows']} rows from {args.csv} ({counts['inserted']} new, "
+          f"{counts['updated']} updated, rent stats for {counts['stations']} stations) in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,304 @@
+"""
+Process-wide counters and histograms, exported in the Prometheus text format.
+
+Every metric the app records is declared at the bottom of this module, so the
+list there is the full exposition. Export is opt-in:
+
+    METRICS_TEXTFILE=/var/lib/node_exporter/japanrent.prom   # rewritten every 15 s
+    METRICS_PORT=9108                                         # http://127.0.0.1:9108/metrics
+
+and call configure_from_env() at startup (webui, streamlit_app and
+prewarm_cache do). render() returns the current exposition as a string.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Seconds; spans cache reads (sub-ms) to Chrome fetches that hit the 5 s wait
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount <= 0:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Last value set per label set."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelKey, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Decorator form of time()."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(_label_key(labels))
+            return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(key, list(state[0]), state[1], state[2]) for key, state in sorted(self._values.items())]
+        samples = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                samples.append((f'{self.name}_bucket', key, cumulative, ('le', le)))
+            samples.append((f'{self.name}_sum', key, total))
+            samples.append((f'{self.name}_count', key, count))
+        return samples
+
+
+_registry: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        if metric.name in _registry:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        _registry[metric.name] = metric
+    return metric
+
+
+def counter(name: str, help: str) -> Counter:
+    return _register(Counter(name, help))
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return _register(Gauge(name, help))
+
+
+def histogram(name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, buckets))
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for sample in metric.samples():
+            name, key, value = sample[:3]
+            extra = sample[3] if len(sample) > 3 else None
+            lines.append(f'{name}{_format_labels(key, extra)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path: str) -> None:
+    """Write render() atomically, for the node_exporter textfile collector."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+def start_textfile_writer(path: str, interval: float = 15.0) -> threading.Thread:
+    """Rewrite `path` every `interval` seconds on a daemon thread."""
+    def run():
+        while True:
+            try:
+                write_textfile(path)
+            except OSError as e:
+                logging.warning(f"Could not write metrics to {path}: {str(e)}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="metrics-textfile", daemon=True)
+    thread.start()
+    return thread
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve /metrics on a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+_configured = False
+_configured_lock = threading.Lock()
+
+
+def configure_from_env() -> None:
+    """Start the exporters requested by METRICS_TEXTFILE / METRICS_PORT, once per process."""
+    global _configured
+    with _configured_lock:
+        if _configured:
+            return
+        _configured = True
+    path = os.environ.get('METRICS_TEXTFILE')
+    if path:
+        start_textfile_writer(path, float(os.environ.get('METRICS_TEXTFILE_INTERVAL', 15)))
+    port = os.environ.get('METRICS_PORT')
+    if port:
+        try:
+            start_http_server(int(port), os.environ.get('METRICS_HOST', '127.0.0.1'))
+        except OSError as e:
+            # Another worker process already serves this port
+            logging.warning(f"Metrics endpoint not started on port {port}: {str(e)}")
+
+
+class StageTimer:
+    """
+    Accumulate wall time per pipeline stage: call lap(name) at the end of each
+    stage. Laps are observed in COMMUTE_STAGE_SECONDS and, if `timings` is a
+    dict, added to it as well.
+    """
+
+    def __init__(self, timings: Optional[dict] = None):
+        self.timings = timings
+        self.last = time.perf_counter()
+
+    def lap(self, stage: str) -> float:
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        COMMUTE_STAGE_SECONDS.observe(elapsed, stage=stage)
+        if self.timings is not None:
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+        return elapsed
+
+
+# ---- Metrics recorded by the app ----
+
+CACHE_LOOKUPS = counter(
+    'transit_cache_lookups_total',
+    'Pairs looked up in transit_cache, by result (hit, fallback_hit, known_failure, miss)')
+FETCHES = counter(
+    'transit_fetches_total',
+    'Live transit fetches, by outcome (success, parse_error, timeout, error, station_not_found)')
+FETCH_SECONDS = histogram(
+    'transit_fetch_seconds',
+    'Latency of live transit fetches through the configured backend')
+FETCH_CONCURRENCY = gauge(
+    'transit_fetch_concurrency_limit',
+    'Current adaptive limit on concurrent live fetches')
+GEOCODE_LOOKUPS = counter(
+    'geocode_lookups_total',
+    'Station coordinate lookups, by result (hit, miss)')
+DB_QUERY_SECONDS = histogram(
+    'db_query_seconds',
+    'Latency of SQLite queries, by query')
+CACHE_WRITER_ROWS = counter(
+    'transit_cache_writer_rows_total',
+    'Rows committed by the cache writer, by kind (transit, failure)')
+MAP_RENDER_SECONDS = histogram(
+    'map_render_seconds',
+    'Time to build and serialize a folium map, by kind (progress, final)')
+COMMUTE_STAGE_SECONDS = histogram(
+    'commute_stage_seconds',
+    'Wall time per stage of a commute-circle query')
@@ -8,6 +8,7 @@ import csv
 import os
 import time
 from math import radians, sin, cos, sqrt, atan2, degrees, asin
+from metrics import GEOCODE_LOOKUPS
 
 class CirclePlotter:
     """Create a map with circle overlays and intersection highlighting."""
@@ -61,10 +62,21 @@ class CirclePlotter:
                 writer.writerow(["address", "latitude", "longitude"])
             writer.writerow([address, lat, lon])
 
+    @classmethod
+    def cached_coordinates(cls, address):
+        """Coordinates from the local geocoding cache only, never hitting Nominatim."""
+        if not cls._geocoding_cache:
+            cls._load_cache()
+        coords = cls._geocoding_cache.get(address)
+        GEOCODE_LOOKUPS.inc(result='hit' if coords else 'miss')
+        return coords
+
     def get_location_coordinates(self, address):
         # Check cache first
         if address in self._geocoding_cache:
+            GEOCODE_LOOKUPS.inc(result='hit')
             return self._geocoding_cache[address]
+        GEOCODE_LOOKUPS.inc(result='miss')
         
         max_retries = 3
         retry_delay = 2  # seconds between retries
@@ -0,0 +1,186 @@
+"""
+Pre-warm the transit cache for whole prefectures, e.g. overnight before a deployment.
+
+Enumerates every ordered station pair in the selected prefectures from the rent
+DB and fetches their transit times with bounded concurrency. Progress is
+checkpointed after every chunk, so an interrupted run picks up where it left
+off; pairs that are already cached are resolved by the bulk cache lookup and
+cost next to nothing.
+
+Usage:
+    python prewarm_cache.py --prefectures Tokyo Kanagawa --depart-hour 8
+    python prewarm_cache.py --prefectures Tokyo --depart-hour 8 --workers 8 --chunk-size 1000
+    python prewarm_cache.py --prefectures Tokyo --depart-hour 8 --export-matrix
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+import get_transit_time as gt
+import metrics
+import travel_matrix as tm
+from station_resolver import get_resolver
+
+RENT_DB_PATH = 'Dataset/tokyo_rent.db'
+DEFAULT_CHECKPOINT = 'prewarm_checkpoint.json'
+
+
+def list_stations(prefectures: List[str], rent_db_path: str = RENT_DB_PATH) -> List[str]:
+    """Formatted names of every station in the given prefectures, sorted for a stable pair order."""
+    conn = sqlite3.connect(rent_db_path)
+    try:
+        query = 'SELECT DISTINCT station FROM properties WHERE prefecture IN ({})'.format(
+            ','.join(['?'] * len(prefectures)))
+        stations = [row[0] for row in conn.execute(query, prefectures).fetchall()]
+    finally:
+        conn.close()
+    return sorted(set(get_resolver(rent_db_path).format_many(stations)))
+
+
+def station_pairs(stations: List[str]) -> List[Tuple[str, str]]:
+    """Every ordered (origin, destination) pair of distinct stations."""
+    return [(origin, destination) for origin in stations for destination in stations if origin != destination]
+
+
+def pairs_digest(stations: List[str]) -> str:
+    """
+    Hash of the ordered station list, which fixes the pair list and so what each chunk index means.
+
+    A checkpoint only resumes a run whose digest matches: the same number of
+    stations in a different set or order would put other pairs in each chunk.
+    """
+    return hashlib.sha1('\n'.join(stations).encode('utf-8')).hexdigest()
+
+
+def load_checkpoint(path: str, run: dict) -> Optional[dict]:
+    """Read a checkpoint, ignoring it if it belongs to a run with different parameters."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    if checkpoint.get('run') != run:
+        print(f"Ignoring {path}: it was written for a different prefecture/hour/station set")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: dict) -> None:
+    """Write the checkpoint atomically so a crash mid-write can't corrupt it."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "unknown"
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h{rest // 60:02d}m"
+
+
+def prewarm(prefectures: List[str], depart_hour: Optional[int], workers: int = 5, chunk_size: int = 500,
+            checkpoint_path: str = DEFAULT_CHECKPOINT, rent_db_path: str = RENT_DB_PATH,
+            report_interval: float = 30.0) -> dict:
+    """
+    Fetch transit times for all station pairs in `prefectures`, resuming from `checkpoint_path`.
+
+    Args:
+        prefectures (List[str]): Prefectures whose stations are paired up
+        depart_hour (Optional[int]): Departure hour to cache, None for "leave now"
+        workers (int): Concurrent fetches
+        chunk_size (int): Pairs per checkpointed chunk
+        checkpoint_path (str): JSON checkpoint file
+        rent_db_path (str): Rent database listing the stations
+        report_interval (float): Seconds between progress lines within a chunk
+
+    Returns:
+        dict: The final checkpoint (counters for the whole run)
+    """
+    stations = list_stations(prefectures, rent_db_path)
+    pairs = station_pairs(stations)
+    run = {
+        'prefectures': sorted(prefectures),
+        'depart_hour': depart_hour,
+        'stations': len(stations),
+        'stations_sha1': pairs_digest(stations),
+        'chunk_size': chunk_size,
+    }
+    checkpoint = load_checkpoint(checkpoint_path, run) or {
+        'run': run, 'next_chunk': 0, 'pairs_done': 0, 'cache_hits': 0, 'fetched': 0, 'failed': 0,
+    }
+    chunks = (len(pairs) + chunk_size - 1) // chunk_size
+    if checkpoint['next_chunk']:
+        print(f"Resuming at chunk {checkpoint['next_chunk']}/{chunks} ({checkpoint['pairs_done']} pairs done)")
+    print(f"{len(stations)} stations, {len(pairs)} pairs in {chunks} chunks")
+
+    start = time.monotonic()
+    fetched_this_run = 0
+    last_report = start
+
+    def report():
+        elapsed = time.monotonic() - start
+        rate = fetched_this_run / elapsed * 60 if elapsed else 0.0
+        remaining = len(pairs) - checkpoint['pairs_done'] - done_in_chunk
+        # Cached pairs are nearly free, so the ETA assumes every remaining pair needs a live fetch
+        eta = remaining / rate * 60 if rate else None
+        print(f"📈 {checkpoint['pairs_done'] + done_in_chunk}/{len(pairs)} pairs | "
+              f"{rate:.1f} live fetches/min | ETA {format_eta(eta)}")
+
+    for chunk_index in range(checkpoint['next_chunk'], chunks):
+        chunk = pairs[chunk_index * chunk_size:(chunk_index + 1) * chunk_size]
+        done_in_chunk = 0
+        cache_hits = 0
+        for result, progress in gt.iter_parallel_processing(chunk, gt.get_transit_time,
+                                                            num_workers=workers, depart_time=depart_hour):
+            done_in_chunk = progress['done']
+            cache_hits = progress['cache_hits']
+            if progress['done'] > progress['cache_hits']:
+                fetched_this_run += 1
+                checkpoint['fetched' if result[3] else 'failed'] += 1
+            if time.monotonic() - last_report >= report_interval:
+                last_report = time.monotonic()
+                report()
+
+        # iter_parallel_processing has flushed the cache writer, so the chunk is durable
+        checkpoint['pairs_done'] += len(chunk)
+        checkpoint['cache_hits'] += cache_hits
+        checkpoint['next_chunk'] = chunk_index + 1
+        save_checkpoint(checkpoint_path, checkpoint)
+        done_in_chunk = 0
+        report()
+
+    print(f"Done: {checkpoint['pairs_done']} pairs, {checkpoint['cache_hits']} already cached, "
+          f"{checkpoint['fetched']} fetched, {checkpoint['failed']} failed")
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefectures", nargs="+", required=True, help="Prefectures to pre-warm, e.g. Tokyo Chiba")
+    parser.add_argument("--depart-hour", type=int, default=None, help="Departure hour (0-23), omit for 'leave now'")
+    parser.add_argument("--workers", type=int, default=5, help="Concurrent fetches")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Pairs per checkpointed chunk")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file")
+    parser.add_argument("--rent-db", default=RENT_DB_PATH, help="Rent database listing the stations")
+    parser.add_argument("--export-matrix", action="store_true",
+                        help="Compile the travel-time matrix (travel_matrix.py) when done")
+    args = parser.parse_args()
+
+    gt.create_cache_db()
+    metrics.configure_from_env()
+    prewarm(args.prefectures, args.depart_hour, workers=args.workers, chunk_size=args.chunk_size,
+            checkpoint_path=args.checkpoint, rent_db_path=args.rent_db)
+    if args.export_matrix:
+        n_stations, n_pairs = tm.export_matrix(args.depart_hour)
+        print(f"Exported {n_pairs} pairs over {n_stations} stations, indexed by {tm.index_path(args.depart_hour)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Skip live transit fetches whose lower bound exceeds the commute limit, with a tolerance.
+
+Two lower bounds on the transit time origin -> x are combined:
+
+1. Triangle inequality over cached durations: for any station k the cache holds
+   both k -> origin and k -> x for, d(origin, x) >= d(k, x) - d(k, origin).
+2. Straight-line distance: no train covers the great-circle distance faster than
+   MAX_TRANSIT_SPEED_KMH, so d(origin, x) >= distance / speed.
+
+The triangle bound treats scraped durations as directed trip times, which are
+timetable-dependent and don't strictly obey the inequality, so the combined
+bound is an estimate rather than a guarantee. A pair is pruned only when its best lower bound exceeds the limit by
+more than `tolerance` minutes (DEFAULT_TOLERANCE), which trades a small chance
+of skipping a reachable station for fewer fetches.
+"""
+
+import sqlite3
+from collections import defaultdict
+from math import radians, sin, cos, sqrt, atan2
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import transit_cache as tc
+
+# Tohoku Shinkansen top speed; anything lower could under-estimate the fastest trip
+MAX_TRANSIT_SPEED_KMH = 320
+DEFAULT_TOLERANCE = 5
+
+Pair = Tuple[str, str]
+Coordinates = Callable[[str], Optional[Dict[str, float]]]
+
+
+def haversine_km(coord1: Dict[str, float], coord2: Dict[str, float]) -> float:
+    """Great-circle distance in km between two {'latitude', 'longitude'} dicts."""
+    lat1, lon1 = radians(coord1['latitude']), radians(coord1['longitude'])
+    lat2, lon2 = radians(coord2['latitude']), radians(coord2['longitude'])
+    dlat, dlon = lat2 - lat1, lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    return 6371 * 2 * atan2(sqrt(a), sqrt(1-a))
+
+
+def distance_lower_bound(coord1: Dict[str, float], coord2: Dict[str, float],
+                         max_speed_kmh: float = MAX_TRANSIT_SPEED_KMH) -> float:
+    """Minutes needed to cover the straight-line distance at max_speed_kmh."""
+    return haversine_km(coord1, coord2) / max_speed_kmh * 60
+
+
+def cached_lower_bounds(origin: str, depart_time: Optional[int] = None,
+                        db_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Triangle-inequality lower bounds on origin -> x from other cached origins.
+
+    Args:
+        origin (str): Formatted origin station
+        depart_time (Optional[int]): Departure time bucket to read
+        db_path (Optional[str]): Cache database path
+
+    Returns:
+        Dict[str, int]: Best lower bound in minutes per destination
+    """
+    depart_time_str = str(depart_time) if depart_time is not None else None
+    conn = tc.connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT kx.destination, MAX(kx.duration - ko.duration)
+            FROM transit_cache ko
+            JOIN transit_cache kx
+              ON kx.origin = ko.origin
+             AND IFNULL(kx.depart_time, '') = IFNULL(ko.depart_time, '')
+            WHERE ko.destination = ?
+              AND ko.origin != ?
+              AND IFNULL(ko.depart_time, '') = IFNULL(?, '')
+              AND ko.duration IS NOT NULL
+              AND kx.duration IS NOT NULL
+            GROUP BY kx.destination
+        ''', (origin, origin, depart_time_str)).fetchall()
+    except sqlite3.Error:
+        return {}
+    finally:
+        conn.close()
+    return {destination: bound for destination, bound in rows if bound is not None}
+
+
+def prune_pairs(pairs: Iterable[Pair], max_minutes: float,
+                coordinates: Optional[Coordinates] = None,
+                depart_time: Optional[int] = None,
+                max_speed_kmh: float = MAX_TRANSIT_SPEED_KMH,
+                tolerance: float = DEFAULT_TOLERANCE,
+                db_path: Optional[str] = None) -> Tuple[List[Pair], List[Pair]]:
+    """
+    Split (origin, destination) pairs into ones worth fetching and ones that can't make the limit.
+
+    Args:
+        pairs (Iterable[Tuple[str, str]]): Candidate (origin, destination) pairs
+        max_minutes (float): Commute limit in minutes
+        coordinates (Optional[Callable]): Lookup returning cached coordinates for an
+            address, or None when unknown (must not hit the network)
+        depart_time (Optional[int]): Departure time bucket
+        max_speed_kmh (float): Fastest plausible transit speed
+        tolerance (float): Minutes a lower bound may exceed the limit before pruning
+        db_path (Optional[str]): Cache database path
+
+    Returns:
+        Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]: (kept pairs, pruned pairs)
+    """
+    by_origin: Dict[str, List[Pair]] = defaultdict(list)
+    for pair in pairs:
+        by_origin[pair[0]].append(pair)
+
+    kept, pruned = [], []
+    for origin, origin_pairs in by_origin.items():
+        bounds = cached_lower_bounds(origin, depart_time, db_path)
+        origin_coords = coordinates(origin) if coordinates else None
+
+        for pair in origin_pairs:
+            destination = pair[1]
+            bound = bounds.get(destination, 0)
+            if origin_coords:
+                destination_coords = coordinates(destination)
+                if destination_coords:
+                    bound = max(bound, distance_lower_bound(origin_coords, destination_coords, max_speed_kmh))
+
+            if bound > max_minutes + tolerance:
+                pruned.append(pair)
+            else:
+                kept.append(pair)
+
+    return kept, pruned
@@ -0,0 +1,161 @@
+"""
+Vectorized rent aggregation over the properties table.
+
+RentColumns loads station and cost_per_square into NumPy arrays once, sorted by
+(station, cost), so counts, medians and quantiles for any set of stations come
+out of a few array operations instead of a sorted() call per station.
+
+Quantiles interpolate linearly between closest ranks, numpy's default
+('linear', Hyndman & Fan type 7): for n sorted values the q-quantile sits at
+position (n - 1) * q. The median of an even count is the mean of the two
+middle values, and Q1/Q3 follow the same rule.
+
+Timings on the bundled 36k rows and a synthetic 1M rows:
+    python -m benchmarks.rent_analytics
+"""
+
+import json
+import sqlite3
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+RENT_DB_PATH = 'Dataset/tokyo_rent.db'
+
+STATS_COLUMNS = ['count', 'median', 'q1', 'q3', 'iqr', 'min', 'max']
+
+
+def grouped_quantiles(values: np.ndarray, offsets: np.ndarray, groups: np.ndarray,
+                      qs: Sequence[float]) -> np.ndarray:
+    """
+    Quantiles of several groups of a grouped, per-group sorted array.
+
+    Args:
+        values (np.ndarray): Values sorted within each group
+        offsets (np.ndarray): Group g is values[offsets[g]:offsets[g + 1]]; groups must be non-empty
+        groups (np.ndarray): Group ids to evaluate
+        qs (Sequence[float]): Quantiles in [0, 1]
+
+    Returns:
+        np.ndarray: Shape (len(groups), len(qs))
+
+    >>> values = np.array([1., 2., 3., 4., 10., 20.])
+    >>> grouped_quantiles(values, np.array([0, 4, 6]), np.array([0, 1]), [0.25, 0.5])
+    array([[ 1.75,  2.5 ],
+           [12.5 , 15.  ]])
+    """
+    qs = np.asarray(qs, dtype=np.float64)
+    starts = offsets[groups]
+    counts = offsets[groups + 1] - starts
+    positions = (counts - 1)[:, None] * qs[None, :]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    low = values[starts[:, None] + lower]
+    high = values[starts[:, None] + upper]
+    return low + (high - low) * (positions - lower)
+
+
+class RentColumns:
+    """
+    cost_per_square per station as columnar arrays.
+
+    Rows without a station or a cost are dropped. Stations are factorized into
+    group ids and the costs sorted by (group, cost) once at construction. Other
+    listing columns passed as `extra` are kept in the same order in `columns`,
+    so a boolean row mask over them lines up with `values`.
+    """
+
+    def __init__(self, stations: Sequence, costs: Sequence[float],
+                 extra: Optional[Dict[str, Sequence]] = None):
+        stations = pd.Series(stations, dtype=object)
+        costs = np.asarray(costs, dtype=np.float64)
+        keep = stations.notna().to_numpy() & ~np.isnan(costs)
+        codes, names = pd.factorize(stations[keep], sort=True)
+        costs = costs[keep]
+        order = np.lexsort((costs, codes))
+        self.values = costs[order]
+        self.names = np.asarray(names, dtype=object)
+        self.offsets = np.searchsorted(codes[order], np.arange(len(self.names) + 1))
+        self.columns = {name: np.asarray(column)[keep][order] for name, column in (extra or {}).items()}
+        self._group_of = {name: group for group, name in enumerate(self.names)}
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection, stations: Optional[Iterable[str]] = None,
+                        columns: Sequence[str] = ()) -> 'RentColumns':
+        """Load every priced listing, or only those of `stations`, from an open rent DB, with extra `columns`."""
+        query = '''
+            SELECT station, cost_per_square{} FROM properties
+            WHERE station IS NOT NULL AND cost_per_square IS NOT NULL
+        '''.format(''.join(f', {column}' for column in columns))
+        params = ()
+        if stations is not None:
+            query += ' AND station IN (SELECT value FROM json_each(?))'
+            params = (json.dumps(sorted({station for station in stations if station is not None})),)
+        rows = conn.execute(query, params).fetchall()
+        # One pass per column; zip(*rows) unpacks every row as an argument and is far slower
+        extra = {column: [row[i] for row in rows] for i, column in enumerate(columns, start=2)}
+        return cls([row[0] for row in rows], [row[1] for row in rows], extra)
+
+    @classmethod
+    def from_db(cls, db_path: str = RENT_DB_PATH, stations: Optional[Iterable[str]] = None,
+                columns: Sequence[str] = ()) -> 'RentColumns':
+        conn = sqlite3.connect(db_path)
+        try:
+            return cls.from_connection(conn, stations, columns)
+        finally:
+            conn.close()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def groups(self, stations: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Group ids of `stations` (all stations if None); unknown stations are skipped."""
+        if stations is None:
+            return np.arange(len(self.names))
+        group_of = self._group_of
+        return np.array(sorted({group_of[station] for station in stations if station in group_of}), dtype=np.int64)
+
+    def _selection(self, stations: Optional[Iterable[str]],
+                   mask: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(values, offsets, non-empty groups) after keeping only the rows where `mask` is set."""
+        groups = self.groups(stations)
+        if mask is None:
+            return self.values, self.offsets, groups
+        # Masking keeps every group sorted; group g now starts at the number of kept rows before it
+        kept_before = np.concatenate(([0], np.cumsum(mask)))
+        offsets = kept_before[self.offsets]
+        return self.values[mask], offsets, groups[offsets[groups + 1] > offsets[groups]]
+
+    def quantiles(self, qs: Sequence[float], stations: Optional[Iterable[str]] = None,
+                  mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Quantiles `qs` per station, one row per station with data, indexed by station."""
+        values, offsets, groups = self._selection(stations, mask)
+        return pd.DataFrame(grouped_quantiles(values, offsets, groups, qs),
+                            index=pd.Index(self.names[groups], name='station'), columns=list(qs))
+
+    def stats(self, stations: Optional[Iterable[str]] = None, mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        STATS_COLUMNS per station, one row per station with data, indexed by station.
+
+        Args:
+            stations (Optional[Iterable[str]]): Raw station names; None for every station
+            mask (Optional[np.ndarray]): Boolean per row of `values`; only rows where it is
+                set are aggregated (see rent_facets)
+
+        Returns:
+            pd.DataFrame: count, median, q1, q3, iqr, min, max
+        """
+        values, offsets, groups = self._selection(stations, mask)
+        starts, ends = offsets[groups], offsets[groups + 1]
+        q1, median, q3 = grouped_quantiles(values, offsets, groups, (0.25, 0.5, 0.75)).T
+        frame = pd.DataFrame({
+            'count': ends - starts,
+            'median': median,
+            'q1': q1,
+            'q3': q3,
+            'iqr': q3 - q1,
+            'min': values[starts],
+            'max': values[ends - 1],
+        }, index=pd.Index(self.names[groups], name='station'))
+        return frame[STATS_COLUMNS]
@@ -0,0 +1,166 @@
+"""
+Faceted rent filters backed by a bitmap index.
+
+FacetIndex keeps one packed bitmap per facet value over the listings in
+rent_analytics.RentColumns order: one per room type, and for the numeric
+facets one per threshold ("size >= 25", "minute <= 10", ...). A filter such as
+1LDK, >= 25 m², built 2010 or later, <= 10 min walk is the AND of four bitmaps,
+and per-station stats for the matching listings come from RentColumns without
+going back to the listings.
+
+Quantiles don't add up across cells, so instead of a cube of pre-aggregated
+stats per facet combination the index stores which listings match each facet
+value; any combination costs a few bitwise ANDs plus one grouped-quantile pass.
+
+Usage:
+    python rent_facets.py Shinjuku Shibuya --room-type 1LDK --size 25 --year 2010 --minute 10
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import rent_stats
+from db_signature import db_signature
+from rent_analytics import RENT_DB_PATH, RentColumns
+
+# Numeric facets: (comparison, thresholds a filter may use)
+RANGE_FACETS = {
+    'size': ('>=', (15, 20, 25, 30, 40, 50, 70)),
+    'year': ('>=', (1980, 1990, 2000, 2005, 2010, 2015, 2020)),
+    'floor': ('>=', (2, 3, 5, 10)),
+    'minute': ('<=', (3, 5, 7, 10, 15)),
+}
+CATEGORY_FACETS = ('room_type',)
+
+
+class FacetIndex:
+    """
+    Packed bitmaps per facet value over a RentColumns loaded with the facet columns.
+
+    Filters are keyword arguments: room_type takes one value or a list (matching
+    any of them), numeric facets take one of their RANGE_FACETS thresholds. None
+    means no filter on that facet.
+    """
+
+    def __init__(self, columns: RentColumns):
+        self.columns = columns
+        self.rows = len(columns)
+        self.bitmaps: Dict[Tuple[str, object], np.ndarray] = {}
+        self.categories: Dict[str, List[str]] = {}
+        for facet in CATEGORY_FACETS:
+            data = pd.Series(columns.columns[facet], dtype=object)
+            # Most common first, the order the UI offers them in
+            self.categories[facet] = data.value_counts().index.tolist()
+            for value in self.categories[facet]:
+                self.bitmaps[(facet, value)] = np.packbits((data == value).to_numpy())
+        for facet, (comparison, thresholds) in RANGE_FACETS.items():
+            data = columns.columns[facet].astype(np.float64)
+            for threshold in thresholds:
+                # Listings without the value (NaN) match no threshold
+                matches = data >= threshold if comparison == '>=' else data <= threshold
+                self.bitmaps[(facet, threshold)] = np.packbits(matches)
+
+    @classmethod
+    def from_db(cls, db_path: str = RENT_DB_PATH) -> 'FacetIndex':
+        return cls(RentColumns.from_db(db_path, columns=CATEGORY_FACETS + tuple(RANGE_FACETS)))
+
+    def _bitmap(self, facet: str, value) -> np.ndarray:
+        if facet in CATEGORY_FACETS:
+            values = [value] if isinstance(value, str) else list(value)
+            bitmap = np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+            for item in values:
+                if (facet, item) in self.bitmaps:
+                    bitmap |= self.bitmaps[(facet, item)]
+            return bitmap
+        if facet not in RANGE_FACETS:
+            raise ValueError(f"Unknown facet: {facet}")
+        if (facet, value) not in self.bitmaps:
+            raise ValueError(f"{facet} filters support {', '.join(map(str, RANGE_FACETS[facet][1]))}, not {value}")
+        return self.bitmaps[(facet, value)]
+
+    def mask(self, **filters) -> Optional[np.ndarray]:
+        """Boolean row mask for RentColumns.stats, or None when no filter is set."""
+        bitmap = None
+        for facet, value in filters.items():
+            if value is None or (facet in CATEGORY_FACETS and not isinstance(value, str) and not value):
+                continue
+            bitmap = self._bitmap(facet, value) if bitmap is None else bitmap & self._bitmap(facet, value)
+        if bitmap is None:
+            return None
+        return np.unpackbits(bitmap, count=self.rows).astype(bool)
+
+    def count(self, **filters) -> int:
+        """Listings matching `filters`."""
+        mask = self.mask(**filters)
+        return self.rows if mask is None else int(mask.sum())
+
+    def stats(self, stations: Optional[Iterable[str]] = None, **filters) -> pd.DataFrame:
+        """rent_analytics STATS_COLUMNS per station over the listings matching `filters`."""
+        return self.columns.stats(stations, self.mask(**filters))
+
+
+_loaded: Dict[str, Tuple[tuple, FacetIndex]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_facet_index(db_path: str = RENT_DB_PATH) -> FacetIndex:
+    """The facet index of `db_path`, built once per process and rebuilt when the rent DB changes."""
+    signature = db_signature(db_path)
+    with _loaded_lock:
+        cached = _loaded.get(db_path)
+        if cached is None or cached[0] != signature:
+            cached = (signature, FacetIndex.from_db(db_path))
+            _loaded[db_path] = cached
+        return cached[1]
+
+
+def has_filters(filters: Optional[dict]) -> bool:
+    return bool(filters) and any(value not in (None, '', [], ()) for value in filters.values())
+
+
+def filtered_station_stats(stations: Iterable[str], filters: Optional[dict] = None,
+                           db_path: str = RENT_DB_PATH) -> Dict[str, Dict[str, float]]:
+    """
+    Per-station rent stats over the listings matching `filters`.
+
+    Without filters this reads the precomputed station_rent_stats table.
+
+    Args:
+        stations (Iterable[str]): Raw station names
+        filters (Optional[dict]): FacetIndex filters, e.g. {'room_type': ['1LDK'], 'size': 25}
+        db_path (str): Rent database
+
+    Returns:
+        Dict[str, Dict[str, float]]: station -> count, median, q1, q3, iqr, min, max;
+        stations without matching listings are missing
+    """
+    if not has_filters(filters):
+        return rent_stats.load_station_stats(stations, db_path)
+    frame = load_facet_index(db_path).stats(list(stations), **filters)
+    return {station: dict(row, count=int(row['count'])) for station, row in zip(frame.index, frame.to_dict('records'))}
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("stations", nargs="*", help="Raw station names (default: every station)")
+    parser.add_argument("--db", default=RENT_DB_PATH, help="Rent database")
+    parser.add_argument("--room-type", nargs="+", help="Room types, e.g. 1K 1LDK")
+    for facet, (comparison, thresholds) in RANGE_FACETS.items():
+        parser.add_argument(f"--{facet}", type=int, choices=thresholds, help=f"{facet} {comparison} this")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = load_facet_index(args.db)
+    built = time.perf_counter() - start
+    filters = {'room_type': args.room_type, **{facet: getattr(args, facet) for facet in RANGE_FACETS}}
+    start = time.perf_counter()
+    frame = index.stats(args.stations or None, **filters)
+    print(frame.to_string(float_format=lambda value: f"{value:,.1f}"))
+    print(f"{index.count(**filters)} of {index.rows} listings match; index built in {built:.2f} s, "
+          f"query in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,381 @@
+"""
+Mergeable per-station quantile sketches of rent (cost_per_square).
+
+The scraper keeps appending listings to Dataset/tokyo_rent.db. Instead of
+recomputing exact quantiles over every station's full history, each station
+keeps a KLL sketch in Dataset/rent_sketches.db, next to the rent DB. update
+folds in only the listings added since the last watermark (created_at, id);
+median / IQR queries are answered from the sketches with a known rank-error
+bound. Pass exact=True (or --exact) to compute the same numbers from every
+listing instead, e.g. to check the sketches.
+
+Sketches only see appended listings: rows that an ingest updates in place or
+deletes are not reflected until `rebuild`.
+
+Usage:
+    python rent_sketch.py update
+    python rent_sketch.py query Shinjuku Shibuya [--exact]
+    python rent_sketch.py verify
+    python rent_sketch.py rebuild --k 400
+"""
+
+import argparse
+import json
+import math
+import random
+import sqlite3
+import time
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rent_analytics import RentColumns
+
+RENT_DB_PATH = 'Dataset/tokyo_rent.db'
+SKETCH_DB_PATH = 'Dataset/rent_sketches.db'
+
+# Level-0 capacity; normalized rank error shrinks roughly as 1/k
+DEFAULT_K = 200
+# Capacity ratio between a level and the one above it
+CAPACITY_DECAY = 2 / 3
+
+Watermark = Tuple[Optional[str], int]
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty 2016), lazy-compaction variant.
+
+    Items at level h stand for 2**h original values. When the sketch is full, the
+    lowest over-capacity level is sorted and every other item, starting at a
+    random offset, is promoted one level up. Stations with fewer listings than
+    the level-0 capacity are never compacted, so their quantiles are exact.
+
+    count, min and max are tracked exactly. rank_error() is a deterministic bound:
+    one compaction at level h moves any rank by at most 2**h.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: int = 0):
+        self.k = k
+        self.levels: List[List[float]] = [[]]
+        self.compactions: List[int] = [0]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = random.Random(seed)
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self.levels) - height - 1
+        return int(math.ceil(self.k * CAPACITY_DECAY ** depth)) + 1
+
+    def _grow(self) -> None:
+        self.levels.append([])
+        self.compactions.append(0)
+        self._max_size = sum(self._capacity(height) for height in range(len(self.levels)))
+
+    def _compress(self) -> None:
+        for height in range(len(self.levels)):
+            level = self.levels[height]
+            if len(level) < self._capacity(height):
+                continue
+            if height + 1 == len(self.levels):
+                self._grow()
+            level.sort()
+            # An odd item out stays at this level
+            leftover = [level.pop()] if len(level) % 2 else []
+            self.levels[height + 1].extend(level[self._rng.randint(0, 1)::2])
+            self.levels[height] = leftover
+            self.compactions[height] += 1
+            self._size = sum(len(items) for items in self.levels)
+            if self._size < self._max_size:
+                break
+
+    def update(self, value: float) -> None:
+        self.levels[0].append(value)
+        self._size += 1
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if self._size >= self._max_size:
+            self._compress()
+
+    def extend(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.update(value)
+
+    def merge(self, other: 'KLLSketch') -> None:
+        """Fold `other` into this sketch; the result sketches the union of both inputs."""
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for height, items in enumerate(other.levels):
+            self.levels[height].extend(items)
+            self.compactions[height] += other.compactions[height]
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._size = sum(len(items) for items in self.levels)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def rank_error(self) -> int:
+        """Upper bound on how far any rank answered by the sketch is from the exact one."""
+        return sum(count << height for height, count in enumerate(self.compactions))
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        """
+        Estimated quantiles, interpolating linearly between closest ranks like rent_analytics.
+
+        With no compaction yet this is exactly numpy.quantile.
+        """
+        if not self.count:
+            return [math.nan for _ in qs]
+        weighted = sorted((value, 1 << height) for height, items in enumerate(self.levels) for value in items)
+        values = [value for value, _ in weighted]
+        # cumulative[i]: ranks covered by the first i + 1 items
+        cumulative = list(accumulate(weight for _, weight in weighted))
+        total = cumulative[-1]
+
+        def at_rank(rank: int) -> float:
+            return values[min(bisect_right(cumulative, rank), len(values) - 1)]
+
+        estimates = []
+        for q in qs:
+            position = (total - 1) * q
+            lower, upper = math.floor(position), math.ceil(position)
+            low, high = at_rank(lower), at_rank(upper)
+            estimates.append(low + (high - low) * (position - lower))
+        return estimates
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'k': self.k, 'count': self.count, 'min': self.min, 'max': self.max,
+            'levels': self.levels, 'compactions': self.compactions,
+        })
+
+    @classmethod
+    def from_json(cls, text: str) -> 'KLLSketch':
+        state = json.loads(text)
+        sketch = cls(state['k'], seed=state['count'])
+        sketch.count, sketch.min, sketch.max = state['count'], state['min'], state['max']
+        sketch.levels, sketch.compactions = state['levels'], state['compactions']
+        sketch._size = sum(len(items) for items in sketch.levels)
+        sketch._max_size = sum(sketch._capacity(height) for height in range(len(sketch.levels)))
+        return sketch
+
+
+def create_sketch_db(conn: sqlite3.Connection) -> None:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS station_sketches (
+            station TEXT PRIMARY KEY,
+            sketch TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    # One row: the last listing folded in, ordered by (created_at, id)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sketch_watermark (
+            singleton INTEGER PRIMARY KEY CHECK (singleton = 0),
+            created_at TEXT,
+            last_id INTEGER NOT NULL,
+            k INTEGER NOT NULL
+        )
+    ''')
+
+
+def read_watermark(conn: sqlite3.Connection) -> Tuple[Optional[Watermark], Optional[int]]:
+    """(watermark, k) of a sketch DB, (None, None) before the first update."""
+    row = conn.execute('SELECT created_at, last_id, k FROM sketch_watermark').fetchone()
+    if row is None:
+        return None, None
+    return (row[0], row[1]), row[2]
+
+
+def rows_since(rent_conn: sqlite3.Connection, watermark: Optional[Watermark]) -> List[tuple]:
+    """(id, created_at, station, cost_per_square) of listings after `watermark`, in watermark order."""
+    query = '''
+        SELECT id, created_at, station, cost_per_square FROM properties
+        WHERE station IS NOT NULL AND cost_per_square IS NOT NULL
+    '''
+    params = ()
+    if watermark is not None and watermark[0] is not None:
+        # Listings without created_at sort first and are only read by a rebuild
+        query += ' AND (created_at, id) > (?, ?)'
+        params = watermark
+    elif watermark is not None:
+        query += ' AND (created_at IS NOT NULL OR id > ?)'
+        params = (watermark[1],)
+    return rent_conn.execute(query + ' ORDER BY created_at, id', params).fetchall()
+
+
+def update_sketches(rent_db_path: str = RENT_DB_PATH, sketch_db_path: str = SKETCH_DB_PATH,
+                    k: int = DEFAULT_K, rebuild: bool = False) -> Dict[str, object]:
+    """
+    Fold listings added since the last watermark into the per-station sketches.
+
+    Args:
+        rent_db_path (str): Rent database the scraper appends to
+        sketch_db_path (str): Sketch database, created if missing
+        k (int): Sketch size for a new or rebuilt sketch DB (existing sketches keep theirs)
+        rebuild (bool): Drop every sketch and start from the first listing
+
+    Returns:
+        Dict[str, object]: 'rows' folded in, 'stations' touched and the new 'watermark'
+    """
+    conn = sqlite3.connect(sketch_db_path)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            create_sketch_db(conn)
+            if rebuild:
+                conn.execute('DELETE FROM station_sketches')
+                conn.execute('DELETE FROM sketch_watermark')
+            watermark, stored_k = read_watermark(conn)
+            k = stored_k or k
+
+            rent_conn = sqlite3.connect(f'file:{rent_db_path}?mode=ro', uri=True)
+            try:
+                rows = rows_since(rent_conn, watermark)
+            finally:
+                rent_conn.close()
+            if not rows:
+                return {'rows': 0, 'stations': 0, 'watermark': watermark}
+
+            # Sketch the new rows per station, then merge into the stored sketches
+            fresh: Dict[str, KLLSketch] = {}
+            for _, _, station, cost in rows:
+                sketch = fresh.get(station)
+                if sketch is None:
+                    sketch = fresh[station] = KLLSketch(k)
+                sketch.update(cost)
+            stored = load_sketches(fresh, conn=conn)
+            now = time.time()
+            for station, sketch in fresh.items():
+                if station in stored:
+                    stored[station].merge(sketch)
+                    sketch = stored[station]
+                conn.execute('INSERT OR REPLACE INTO station_sketches (station, sketch, updated_at) VALUES (?, ?, ?)',
+                             (station, sketch.to_json(), now))
+
+            watermark = (rows[-1][1], rows[-1][0])
+            conn.execute('INSERT OR REPLACE INTO sketch_watermark (singleton, created_at, last_id, k) VALUES (0, ?, ?, ?)',
+                         (*watermark, k))
+    finally:
+        conn.close()
+    return {'rows': len(rows), 'stations': len(fresh), 'watermark': watermark}
+
+
+def load_sketches(stations: Iterable[str], sketch_db_path: str = SKETCH_DB_PATH,
+                  conn: Optional[sqlite3.Connection] = None) -> Dict[str, KLLSketch]:
+    """Stored sketches of `stations`, in one query; stations without one are missing."""
+    stations = json.dumps(sorted(set(stations)))
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(sketch_db_path)
+    try:
+        rows = conn.execute('SELECT station, sketch FROM station_sketches '
+                            'WHERE station IN (SELECT value FROM json_each(?))', (stations,)).fetchall()
+    finally:
+        if own:
+            conn.close()
+    return {station: KLLSketch.from_json(sketch) for station, sketch in rows}
+
+
+def sketch_stats(stations: Iterable[str], exact: bool = False, rent_db_path: str = RENT_DB_PATH,
+                 sketch_db_path: str = SKETCH_DB_PATH) -> Dict[str, Dict[str, float]]:
+    """
+    count, median, q1, q3, iqr, min, max per station, plus 'rank_error'.
+
+    Args:
+        stations (Iterable[str]): Raw station names
+        exact (bool): Compute from every listing in the rent DB instead of the sketches
+        rent_db_path (str): Rent database, read in exact mode
+        sketch_db_path (str): Sketch database built by update_sketches
+
+    Returns:
+        Dict[str, Dict[str, float]]: Stations without data are missing. 'rank_error'
+        bounds how many ranks the quantiles may be off by (0 in exact mode).
+    """
+    stations = [station for station in stations if station is not None]
+    if exact:
+        frame = RentColumns.from_db(rent_db_path, stations).stats(stations)
+        return {station: dict(row, count=int(row['count']), rank_error=0)
+                for station, row in zip(frame.index, frame.to_dict('records'))}
+
+    stats = {}
+    for station, sketch in load_sketches(stations, sketch_db_path).items():
+        q1, median, q3 = sketch.quantiles((0.25, 0.5, 0.75))
+        stats[station] = {
+            'count': sketch.count, 'median': median, 'q1': q1, 'q3': q3, 'iqr': q3 - q1,
+            'min': sketch.min, 'max': sketch.max, 'rank_error': sketch.rank_error(),
+        }
+    return stats
+
+
+def verify(rent_db_path: str = RENT_DB_PATH, sketch_db_path: str = SKETCH_DB_PATH) -> Dict[str, float]:
+    """
+    Compare every sketch against the exact listings.
+
+    Returns:
+        Dict[str, float]: 'stations' checked, 'count_mismatches', the worst observed
+        normalized rank error of Q1/median/Q3 ('max_rank_error') and the worst bound
+        ('max_rank_error_bound'), both as a fraction of the station's listings
+    """
+    columns = RentColumns.from_db(rent_db_path)
+    sketches = load_sketches(columns.names.tolist(), sketch_db_path)
+    worst, worst_bound, mismatches = 0.0, 0.0, 0
+    for group, station in enumerate(columns.names):
+        values = columns.values[columns.offsets[group]:columns.offsets[group + 1]]
+        sketch = sketches.get(station)
+        if sketch is None or sketch.count != len(values):
+            mismatches += 1
+            continue
+        for q, estimate in zip((0.25, 0.5, 0.75), sketch.quantiles((0.25, 0.5, 0.75))):
+            target = (len(values) - 1) * q
+            # Ranks the estimate could occupy in the exact data
+            low = np.searchsorted(values, estimate, side='left') - 1
+            high = np.searchsorted(values, estimate, side='right')
+            error = max(0.0, float(low - target), float(target - high))
+            worst = max(worst, error / len(values))
+        worst_bound = max(worst_bound, sketch.rank_error() / len(values))
+    return {'stations': len(columns.names), 'count_mismatches': mismatches,
+            'max_rank_error': worst, 'max_rank_error_bound': worst_bound}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rent-db", default=RENT_DB_PATH, help="Rent database")
+    parser.add_argument("--sketch-db", default=SKETCH_DB_PATH, help="Sketch database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("update", help="Fold in listings added since the last watermark")
+    rebuild_parser = subparsers.add_parser("rebuild", help="Recompute every sketch from the first listing")
+    rebuild_parser.add_argument("--k", type=int, default=DEFAULT_K, help="Sketch size")
+    query_parser = subparsers.add_parser("query", help="Median / IQR for stations")
+    query_parser.add_argument("stations", nargs="+", help="Raw station names, e.g. Shinjuku")
+    query_parser.add_argument("--exact", action="store_true", help="Compute from every listing instead")
+    subparsers.add_parser("verify", help="Compare every sketch against the exact listings")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command in ("update", "rebuild"):
+        result = update_sketches(args.rent_db, args.sketch_db, k=getattr(args, "k", DEFAULT_K),
+                                 rebuild=args.command == "rebuild")
+        print(f"Folded {result['rows']} listings into {result['stations']} station sketches "
+              f"(watermark {result['watermark']}) in {time.perf_counter() - start:.2f} s")
+    elif args.command == "query":
+        stats = sketch_stats(args.stations, exact=args.exact, rent_db_path=args.rent_db, sketch_db_path=args.sketch_db)
+        for station in args.stations:
+            if station not in stats:
+                print(f"{station}: no data")
+                continue
+            s = stats[station]
+            print(f"{station}: median ¥{s['median']:.2f}/m², IQR ¥{s['iqr']:.2f} "
+                  f"(Q1 ¥{s['q1']:.2f}, Q3 ¥{s['q3']:.2f}), {s['count']} listings, "
+                  f"rank error ≤ {s['rank_error']}")
+    else:
+        result = verify(args.rent_db, args.sketch_db)
+        print(f"{result['stations']} stations, {result['count_mismatches']} count mismatches, "
+              f"worst rank error {result['max_rank_error']:.2%} (bound {result['max_rank_error_bound']:.2%})")
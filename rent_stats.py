@@ -0,0 +1,138 @@
+"""
+Precomputed rent statistics per station.
+
+station_rent_stats holds the count, median, quartiles, IQR and range of
+cost_per_square for every station in properties, so the apps read the numbers
+for a whole station list in one query instead of pulling every listing and
+sorting in Python. ingest_properties refreshes the rows of the stations it
+touched; rebuild_station_stats recomputes everything.
+
+The numbers come from rent_analytics.RentColumns, so quantiles interpolate
+linearly between closest ranks (numpy's default) and the median of an even
+count is the mean of the two middle values.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from typing import Dict, Iterable
+
+from rent_analytics import STATS_COLUMNS, RentColumns
+
+RENT_DB_PATH = 'Dataset/tokyo_rent.db'
+
+# Station lists are bound as one JSON array, so any number of stations is a
+# single statement regardless of SQLite's bound-parameter limit
+STATIONS_IN_JSON = 'station IN (SELECT value FROM json_each(?))'
+
+
+def create_stats_table(conn: sqlite3.Connection) -> None:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS station_rent_stats (
+            station TEXT PRIMARY KEY,
+            count INTEGER NOT NULL,
+            median REAL NOT NULL,
+            q1 REAL NOT NULL,
+            q3 REAL NOT NULL,
+            iqr REAL NOT NULL,
+            min REAL NOT NULL,
+            max REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+
+
+def stats_table_exists(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'station_rent_stats'"
+    ).fetchone() is not None
+
+
+def _write_stats(conn: sqlite3.Connection, columns: RentColumns) -> int:
+    """Upsert the stats of every station in `columns`; returns how many were written."""
+    frame = columns.stats()
+    now = time.time()
+    rows = [(station, int(count), *values, now)
+            for station, (count, *values) in zip(frame.index.tolist(), frame.to_numpy(dtype=float).tolist())]
+    conn.executemany('''
+        INSERT OR REPLACE INTO station_rent_stats (station, count, median, q1, q3, iqr, min, max, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    return len(rows)
+
+
+def refresh_station_stats(conn: sqlite3.Connection, stations: Iterable[str]) -> int:
+    """
+    Recompute the stats rows of `stations` from properties, inside the caller's transaction.
+
+    Stations without any priced listing left are removed from the table.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the rent database
+        stations (Iterable[str]): Raw station names whose listings changed
+
+    Returns:
+        int: Number of stations that have stats after the refresh
+    """
+    create_stats_table(conn)
+    stations = sorted({station for station in stations if station is not None})
+    conn.execute(f'DELETE FROM station_rent_stats WHERE {STATIONS_IN_JSON}', (json.dumps(stations),))
+    return _write_stats(conn, RentColumns.from_connection(conn, stations))
+
+
+def rebuild_station_stats(conn: sqlite3.Connection) -> int:
+    """Recompute station_rent_stats for every station, inside the caller's transaction."""
+    create_stats_table(conn)
+    conn.execute('DELETE FROM station_rent_stats')
+    return _write_stats(conn, RentColumns.from_connection(conn))
+
+
+def load_station_stats(stations: Iterable[str], db_path: str = RENT_DB_PATH) -> Dict[str, Dict[str, float]]:
+    """
+    Stats for the given raw station names, read in one query.
+
+    Builds the table first if the rent DB predates it.
+
+    Args:
+        stations (Iterable[str]): Raw station names, e.g. "Shinjuku"
+        db_path (str): Rent database
+
+    Returns:
+        Dict[str, Dict[str, float]]: station -> STATS_COLUMNS; stations without
+        priced listings are missing
+    """
+    stations = sorted({station for station in stations if station is not None})
+    stats = {}
+    if not stations:
+        return stats
+    conn = sqlite3.connect(db_path)
+    try:
+        if not stats_table_exists(conn):
+            logging.info(f"Building station_rent_stats in {db_path}")
+            with conn:
+                rebuild_station_stats(conn)
+        rows = conn.execute(f'SELECT station, {", ".join(STATS_COLUMNS)} FROM station_rent_stats '
+                            f'WHERE {STATIONS_IN_JSON}', (json.dumps(stations),))
+        for station, *values in rows:
+            stats[station] = dict(zip(STATS_COLUMNS, values))
+    finally:
+        conn.close()
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild station_rent_stats from properties")
+    parser.add_argument("--db", default=RENT_DB_PATH, help="Rent database")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(args.db)
+    try:
+        with conn:
+            count = rebuild_station_stats(conn)
+    finally:
+        conn.close()
+    print(f"{args.db}: rent stats for {count} stations in {time.perf_counter() - start:.2f} s")
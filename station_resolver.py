@@ -0,0 +1,127 @@
+"""
+In-memory station -> prefecture mapping for formatting station names.
+
+format_station_name used to open a connection and query the rent DB for every
+call, twice per station per query. The resolver loads the whole mapping in one
+query and reloads it when the rent DB file changes, so formatting a station
+list costs dictionary lookups.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from db_signature import db_signature
+
+RENT_DB_PATH = 'Dataset/tokyo_rent.db'
+
+
+class StationResolver:
+    """
+    Formats station names as "<station> Station, <prefecture>".
+
+    Station names that appear in several prefectures resolve to the prefecture
+    of their first listing (lowest id), which is what the per-call lookup
+    returned and what existing transit cache keys were built with.
+
+    The mapping is reloaded when the DB file or its WAL changes (see
+    db_signature.db_signature), checked at most once every `check_interval` seconds.
+    """
+
+    def __init__(self, db_path: str = RENT_DB_PATH, check_interval: float = 1.0):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._prefectures: Dict[str, str] = {}
+        self._error: Optional[str] = None
+        self._signature: Optional[Tuple] = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _load(self) -> None:
+        prefectures: Dict[str, str] = {}
+        try:
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+            try:
+                rows = conn.execute('''
+                    SELECT station, prefecture FROM properties
+                    WHERE station IS NOT NULL
+                    ORDER BY id
+                ''').fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logging.error(f"An error occurred while querying the database: {e}")
+            self._prefectures, self._error = {}, str(e)
+            return
+        for station, prefecture in rows:
+            prefectures.setdefault(station, prefecture)
+        self._prefectures, self._error = prefectures, None
+        self.loads += 1
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            signature = db_signature(self.db_path)
+            if signature != self._signature:
+                self._load()
+                self._signature = signature
+            self._checked_at = now
+
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup, e.g. right after ingesting listings."""
+        with self._lock:
+            self._signature = None
+            self._checked_at = float('-inf')
+
+    def prefecture(self, station: str) -> Optional[str]:
+        """Prefecture of a station, None if it isn't in the rent DB."""
+        self._refresh()
+        return self._prefectures.get(station)
+
+    def format(self, station: str) -> str:
+        """
+        "<station> Station, <prefecture>", or the same error strings format_station_name
+        always returned: "Station not found: <station>" / "Database error: <message>".
+        """
+        self._refresh()
+        if self._error is not None:
+            return f"Database error: {self._error}"
+        prefecture = self._prefectures.get(station)
+        if prefecture is None:
+            logging.debug(f"Station not found in the database: {station}")
+            return f"Station not found: {station}"
+        return f"{station} Station, {prefecture}"
+
+    def format_many(self, stations: Iterable[str]) -> List[str]:
+        """format() for a whole station list, checking the DB for changes once."""
+        self._refresh()
+        prefectures, error = self._prefectures, self._error
+        if error is not None:
+            return [f"Database error: {error}" for _ in stations]
+        return [f"{station} Station, {prefectures[station]}" if station in prefectures
+                else f"Station not found: {station}" for station in stations]
+
+
+_resolvers: Dict[str, StationResolver] = {}
+_resolvers_lock = threading.Lock()
+
+
+def get_resolver(db_path: str = RENT_DB_PATH) -> StationResolver:
+    """Process-wide resolver for a rent DB."""
+    with _resolvers_lock:
+        resolver = _resolvers.get(db_path)
+        if resolver is None:
+            resolver = _resolvers[db_path] = StationResolver(db_path)
+        return resolver
+
+
+def format_station_names(stations: Iterable[str], db_path: str = RENT_DB_PATH) -> List[str]:
+    """Bulk version of direction_API_demo.format_station_name."""
+    return get_resolver(db_path).format_many(stations)
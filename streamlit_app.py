@@ -1,13 +1,14 @@
 # streamlit_app.py for deployment
 import streamlit as st
 import get_transit_time as gt
-from direction_API_demo import format_station_name, get_station_options
-import overlay_plotter as op
+from direction_API_demo import get_station_options
+import travel_matrix as tm
+import metrics
+import rent_facets
 import sqlite3
-import folium
 from streamlit_folium import st_folium
-from collections import defaultdict 
-from webui import process_commute_circles as webui_process_commute_circles
+from webui import stream_commute_circles as webui_stream_commute_circles
+from webui import DEPART_HOUR_CHOICES, MIN_SIZE_CHOICES, BUILT_AFTER_CHOICES, MAX_WALK_CHOICES, parse_rent_filters
 
 
 st.set_page_config(
@@ -24,165 +25,48 @@ if 'db_initialized' not in st.session_state:
     st.session_state.db_initialized = True
 
 
-if 'map' not in st.session_state:
-    st.session_state.map = None
-    
-@st.cache_data
-def get_prefectures():
-    conn = sqlite3.connect('Dataset/tokyo_rent.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT DISTINCT prefecture FROM properties')
-    prefectures = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return prefectures
+@st.cache_resource
+def start_cache_refresher():
+    """One background refresher per server process, shared by every session."""
+    return gt.start_background_refresh()
 
-def get_farthest_station(center_address, stations):
-    """Find the station with maximum transit duration from center"""
-    max_duration = 0
-    farthest_station = center_address
-    cache_conn = sqlite3.connect('transit_cache.db')
-    cache_cursor = cache_conn.cursor()
-    
-    for station in stations:
-        station_name = station[0]
-        cache_cursor.execute('''
-            SELECT duration FROM transit_cache 
-            WHERE origin = ? AND destination = ?
-        ''', (center_address, station_name))
-        result = cache_cursor.fetchone()
-        if result and result[0] is not None:
-            duration = result[0]
-            if duration > max_duration:
-                max_duration = duration
-                farthest_station = station_name
-                
-    cache_conn.close()
-    return farthest_station
+start_cache_refresher()
 
-@st.cache_data
-def process_commute_circles(company_station, hangout_station, company_time, hangout_time, selected_prefectures):
-    plotter1 = op.CirclePlotter()
-    company_formatted = format_station_name(company_station)
-    hangout_formatted = format_station_name(hangout_station)
-
-    # Coordinate validation
-    company_coords = op.CirclePlotter().get_location_coordinates(company_formatted)
-    if not company_coords or isinstance(company_coords, str):
-        st.error(f"Invalid coordinates for {company_formatted}")
-        return None
-
-    hangout_coords = op.CirclePlotter().get_location_coordinates(hangout_formatted)
-    if not hangout_coords or isinstance(hangout_coords, str):
-        st.error(f"Invalid coordinates for {hangout_formatted}")
-        return None
-
-    # Database query for filtered stations
-    conn = sqlite3.connect('Dataset/tokyo_rent.db')
-    cursor = conn.cursor()
-    
-    if selected_prefectures:
-        query = f'SELECT DISTINCT station FROM properties WHERE prefecture IN ({",".join(["?"]*len(selected_prefectures))})'
-        cursor.execute(query, selected_prefectures)
-    else:
-        cursor.execute('SELECT DISTINCT station FROM properties')
-    
-    all_station_list = [row[0] for row in cursor.fetchall()]
-    conn.close()
 
-    # Generate station pairs
-    station_pairs_company = [(company_formatted, format_station_name(station)) for station in all_station_list]
-    station_pairs_hangout = [(hangout_formatted, format_station_name(station)) for station in all_station_list]
+@st.cache_resource
+def start_metrics_export():
+    """Export counters per METRICS_TEXTFILE / METRICS_PORT once per server process."""
+    metrics.configure_from_env()
+    return True
 
-    # Process transit times
-    company_results = gt.parallel_processing(station_pairs_company, gt.get_transit_time, num_workers=10)
-    hangout_results = gt.parallel_processing(station_pairs_hangout, gt.get_transit_time, num_workers=10)
+start_metrics_export()
 
-    # Get edge stations
-    try:
-        cache_conn = sqlite3.connect('transit_cache.db')
-        cache_cursor = cache_conn.cursor()
-        
-        # Get stations within time limits
-        company_stations = cache_cursor.execute('''
-            SELECT DISTINCT destination 
-            FROM transit_cache 
-            WHERE origin = ? AND duration <= ?
-        ''', (company_formatted, company_time)).fetchall()
-        
-        hangout_stations = cache_cursor.execute('''
-            SELECT DISTINCT destination 
-            FROM transit_cache 
-            WHERE origin = ? AND duration <= ?
-        ''', (hangout_formatted, hangout_time)).fetchall()
-        
-        cache_conn.close()
 
-        # Find overlapping stations
-        company_set = set(station[0] for station in company_stations)
-        hangout_set = set(station[0] for station in hangout_stations)
-        overlap_stations = company_set.intersection(hangout_set)
+@st.cache_resource
+def preload_travel_matrix():
+    """Map the exported travel-time matrix once per worker process; pages are shared between processes."""
+    return tm.load_matrix()
 
-        # Query rent data
-        rent_data = defaultdict(list)
-        if overlap_stations:
-            raw_names = [s.split(" Station")[0].strip() for s in overlap_stations]
-            conn = sqlite3.connect('Dataset/tokyo_rent.db')
-            cursor = conn.cursor()
-            query = 'SELECT station, cost_per_square FROM properties WHERE station IN ({})'.format(','.join(['?']*len(raw_names)))
-            cursor.execute(query, raw_names)
-            for station, cost in cursor.fetchall():
-                if cost: rent_data[station].append(float(cost))
-            conn.close()
+preload_travel_matrix()
 
-    except Exception as e:
-        st.error(f"Database error: {str(e)}")
-        return None
 
-    # Create map visualization
-    try:
-        m = folium.Map(location=[company_coords['latitude'], company_coords['longitude']], zoom_start=12)
-        
-        # Get farthest stations for edges
-        company_edge = get_farthest_station(company_formatted, company_stations)
-        hangout_edge = get_farthest_station(hangout_formatted, hangout_stations)
-
-        # Add circles
-        plotter1 = op.CirclePlotter(color="blue", opacity=0.6, center=company_formatted, edge=company_edge)
-        plotter2 = op.CirclePlotter(color="pink", opacity=0.6, center=hangout_formatted, edge=hangout_edge)
-        
-        m = plotter1.plot(m)
-        m = plotter2.plot(m)
-        m = op.calculate_overlap(plotter1, plotter2, m)
-
-        # Add markers for recommended stations
-        for station in overlap_stations:
-            coords = op.CirclePlotter().get_location_coordinates(station)
-            if not coords or isinstance(coords, str): continue
-            
-            raw_name = station.split(" Station")[0].strip()
-            costs = rent_data.get(raw_name, [])
-            tooltip = f"<strong>{station}</strong>"
-            
-            if costs:
-                median = sorted(costs)[len(costs)//2]
-                tooltip += f"<br>Median Rent: ¥{median:.2f}/m²"
-            else:
-                tooltip += "<br>No rent data"
-            
-            folium.CircleMarker(
-                location=[coords['latitude'], coords['longitude']],
-                radius=6,
-                color='orange',
-                fill=True,
-                fill_color='orange',
-                tooltip=tooltip
-            ).add_to(m)
+@st.cache_data
+def get_room_types():
+    """Room types for the rent filter, most common first."""
+    return rent_facets.load_facet_index().categories['room_type']
 
-        return m
 
-    except Exception as e:
-        st.error(f"Error generating map: {str(e)}")
-        return folium.Map(location=[35.6895, 139.6917], zoom_start=10)
+if 'map' not in st.session_state:
+    st.session_state.map = None
+    
+@st.cache_data
+def get_prefectures():
+    conn = sqlite3.connect('Dataset/tokyo_rent.db')
+    cursor = conn.cursor()
+    cursor.execute('SELECT DISTINCT prefecture FROM properties')
+    prefectures = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return prefectures
 
 # Streamlit UI
 st.title("Where SHOULD you live?")
@@ -204,6 +88,21 @@ with st.form("input_form"):
         "(Speed Optimization) Search prefectures",
         prefectures
     )
+    depart_hour = st.selectbox(
+        "Departure time (reuses the nearest cached hour when this one isn't cached yet)",
+        DEPART_HOUR_CHOICES
+    )
+
+    # Rent filters only change which listings the rent stats are computed from
+    col3, col4, col5, col6 = st.columns(4)
+    with col3:
+        room_types = st.multiselect("(Rent filter) Room types", get_room_types())
+    with col4:
+        min_size = st.selectbox("(Rent filter) Size", list(MIN_SIZE_CHOICES))
+    with col5:
+        built_after = st.selectbox("(Rent filter) Building age", list(BUILT_AFTER_CHOICES))
+    with col6:
+        max_walk = st.selectbox("(Rent filter) Walk to station", list(MAX_WALK_CHOICES))
     
     submitted = st.form_submit_button("Find Living Areas")
 
@@ -211,53 +110,44 @@ with st.form("input_form"):
 if submitted:
     try:
         with st.spinner("Calculating commute circles... This may take a while, go to do some chores"):
-            # Get the map and station data from webui.py
-            map_html, recommended_text = webui_process_commute_circles(
+            # Stream the map and station data from webui.py, showing reachable stations as they are found
+            rent_filters = parse_rent_filters(room_types, min_size, built_after, max_walk)
+            status_slot = st.empty()
+            map_slot = st.empty()
+            outcome = {}  # final map, station list and per-station rent stats
+            for map_html, recommended_text in webui_stream_commute_circles(
                 company_station, 
                 hangout_station,
                 company_time,
                 hangout_time,
-                selected_prefectures
-            )
+                selected_prefectures,
+                depart_hour,
+                rent_filters=rent_filters,
+                outcome=outcome
+            ):
+                status_slot.caption(recommended_text)
+                with map_slot.container():
+                    st.components.v1.html(map_html, height=600)
+            status_slot.empty()
+            map_slot.empty()
             
-            # Parse the recommended_text into a list of stations
-            stations_list = recommended_text.split("\n")
-            
-            # Query rent data for the stations
+            # Rent statistics come with the result, already ranked by median rent
             rent_data = []
-            conn = sqlite3.connect('Dataset/tokyo_rent.db')
-            cursor = conn.cursor()
-            for station in stations_list:
-                raw_name = station.split(" Station")[0].strip()
-                cursor.execute('''
-                    SELECT cost_per_square 
-                    FROM properties 
-                    WHERE station = ?
-                ''', (raw_name,))
-                costs = [row[0] for row in cursor.fetchall() if row[0] is not None]
-                
-                if costs:
-                    sorted_costs = sorted(costs)
-                    n = len(sorted_costs)
-                    median = sorted_costs[n//2] if n % 2 == 1 else (sorted_costs[(n//2)-1] + sorted_costs[n//2])/2
-                    q1 = sorted_costs[int(n*0.25)]
-                    q3 = sorted_costs[int(n*0.75)]
-                    iqr = q3 - q1
+            for stats in outcome.get('stations', []):
+                if stats['has_data']:
+                    median = stats['median']
+                    iqr = stats['iqr']
 
                     # Calculate minimum and recommended wages
                     min_wage = 40 * median  #a 20 square room  * median square price * 2 (50% of BHR)
                     rec_wage = 115 * median  #a 23 square meter room * median * 5 (20% of BHR)
                     rent_data.append({
-                        'station': station,
+                        'station': stats['station'],
                         'Rent Median(¥/M²)': median,
                         'IQR(rent diversity)': iqr,
                         'Minimum Wage to live here': min_wage,
                         'Recommended Wage to live here': rec_wage
                     })
-            conn.close()
-            
-            # Sort by median rent in ascending order
-            rent_data.sort(key=lambda x: x['Rent Median(¥/M²)'])
             
             # Display the map
             st.subheader("These places are ideal for your lifestyle")
@@ -0,0 +1,200 @@
+"""
+Local stand-in for Google Maps transit directions, for offline benchmarks and CI.
+
+Serves /maps/dir/<origin>/<destination>/data=... pages that contain the same
+`.Fk3sm.fontHeadlineSmall` duration element get_transit_time waits for. The
+duration is derived from the pair (so repeated fetches agree) and rendered in
+one of several languages; latency and failure rate are configurable.
+
+Usage:
+    python stub_maps_server.py --port 8765 --latency 0.3 --jitter 0.1 --failure-rate 0.05
+    python stub_maps_server.py --languages ja en zh de ko
+
+Point the fetch pipeline at it with TRANSIT_BACKEND=http://127.0.0.1:8765
+(see transit_backends.py).
+"""
+
+import argparse
+import hashlib
+import html
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+# How each language writes "<hours> <minutes>"; mirrors the units duration_parser understands
+DURATION_FORMATS = {
+    'en': ("{m} min", "{h} hr {m} min"),
+    'ja': ("{m} 分", "{h} 時間 {m} 分"),
+    'zh': ("{m} 分钟", "{h} 小时 {m} 分钟"),
+    'zh-TW': ("{m} 分", "{h} 小時 {m} 分"),
+    'de': ("{m} Minuten", "{h} Stunden {m} Minuten"),
+    'ko': ("{m} 분", "{h} 시간 {m} 분"),
+}
+DEFAULT_LANGUAGES = ('en', 'ja')
+
+# Failure modes a page can have: no duration element (no route found, or a
+# layout change) or a server error
+FAILURE_MODES = ('missing_element', 'server_error')
+
+
+def _pair_seed(origin: str, destination: str, depart_time: Optional[int] = None) -> int:
+    key = f"{origin}|{destination}|{'' if depart_time is None else depart_time}"
+    return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'big')
+
+
+def fake_minutes(origin: str, destination: str, depart_time: Optional[int] = None) -> int:
+    """Deterministic transit time in minutes for a pair, between 3 and 150."""
+    return 3 + _pair_seed(origin, destination, depart_time) % 148
+
+
+def fake_transit_text(origin: str, destination: str, depart_time: Optional[int] = None,
+                      languages: Sequence[str] = DEFAULT_LANGUAGES) -> str:
+    """
+    Duration text the stub shows for a pair, e.g. "1 時間 5 分".
+
+    The language is picked per pair from `languages`, so a sweep exercises every
+    format while each pair always renders the same way.
+    """
+    minutes = fake_minutes(origin, destination, depart_time)
+    language = languages[_pair_seed(destination, origin) % len(languages)]
+    short, long = DURATION_FORMATS[language]
+    hours, minutes = divmod(minutes, 60)
+    return long.format(h=hours, m=minutes) if hours else short.format(m=minutes)
+
+
+def parse_directions_path(path: str) -> Optional[Tuple[str, str, Optional[int]]]:
+    """(origin, destination, depart_hour) from a /maps/dir/... path, None if it isn't one."""
+    parts = path.split('?')[0].split('/')
+    # ['', 'maps', 'dir', origin, destination, 'data=...']
+    if len(parts) < 5 or parts[1:3] != ['maps', 'dir']:
+        return None
+    origin, destination = unquote(parts[3]), unquote(parts[4])
+    depart_time = None
+    data = parts[5] if len(parts) > 5 else ''
+    if '!8j' in data:
+        try:
+            timestamp = int(data.split('!8j')[1].split('!')[0])
+            depart_time = time.localtime(timestamp).tm_hour
+        except ValueError:
+            pass
+    return origin, destination, depart_time
+
+
+def render_page(transit_text: Optional[str]) -> str:
+    """HTML shaped like the parts of a Maps directions page get_transit_time reads."""
+    if transit_text is None:
+        body = "<div class='section-directions-error'>No route found</div>"
+    else:
+        body = f"<div class='Fk3sm fontHeadlineSmall'>{html.escape(transit_text)}</div>"
+    return f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Stub Maps</title></head><body>{body}</body></html>"
+
+
+class StubMapsServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering directions requests with fake durations.
+
+    Args:
+        address (Tuple[str, int]): (host, port) to bind; port 0 picks a free one
+        latency (float): Mean seconds to wait before answering
+        jitter (float): Latency is drawn uniformly from latency +/- jitter
+        failure_rate (float): Share of requests that fail (see FAILURE_MODES)
+        languages (Sequence[str]): Keys of DURATION_FORMATS to render durations in
+        seed (Optional[int]): Seed for latency and failure draws
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int] = ('127.0.0.1', 0), latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, languages: Sequence[str] = DEFAULT_LANGUAGES,
+                 seed: Optional[int] = None):
+        unknown = set(languages) - set(DURATION_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown languages: {', '.join(sorted(unknown))}")
+        super().__init__(address, _StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.languages = tuple(languages)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self) -> Tuple[float, Optional[str]]:
+        """(delay in seconds, failure mode or None) for one request."""
+        with self._random_lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failure = None
+            if self._random.random() < self.failure_rate:
+                failure = self._random.choice(FAILURE_MODES)
+                self.failures += 1
+            return delay, failure
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: StubMapsServer
+
+    def do_GET(self):
+        parsed = parse_directions_path(self.path)
+        if parsed is None:
+            self.send_error(404)
+            return
+
+        delay, failure = self.server.draw()
+        time.sleep(delay)
+        if failure == 'server_error':
+            self.send_error(503)
+            return
+
+        origin, destination, depart_time = parsed
+        transit_text = None if failure else fake_transit_text(origin, destination, depart_time, self.server.languages)
+        body = render_page(transit_text).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Thousands of requests per benchmark; keep the console quiet
+        pass
+
+
+def start_stub_server(**kwargs) -> StubMapsServer:
+    """Start a StubMapsServer on a background thread; call shutdown() when done."""
+    server = StubMapsServer(**kwargs)
+    threading.Thread(target=server.serve_forever, name="stub-maps-server", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.3, help="Mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Uniform +/- jitter on the delay")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--languages", nargs="+", default=list(DEFAULT_LANGUAGES),
+                        choices=sorted(DURATION_FORMATS), help="Languages to render durations in")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency and failure draws")
+    args = parser.parse_args()
+
+    server = StubMapsServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                            failure_rate=args.failure_rate, languages=args.languages, seed=args.seed)
+    print(f"Stub maps server on {server.base_url} (latency {args.latency}s ± {args.jitter}s, "
+          f"failure rate {args.failure_rate:.0%}, languages {', '.join(args.languages)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
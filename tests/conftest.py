@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root; make them importable however pytest is started
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transit_cache  # noqa: E402
+
+# get_transit_time creates and migrates the cache on import; keep that away from the shipped transit_cache.db
+transit_cache.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='transit_cache_tests_'), 'transit_cache.db')
@@ -0,0 +1,74 @@
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+import transit_cache as tc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Queues rows from a worker thread, like _fetch_transit_time does, with a writer that
+# would not commit on its own for an hour, then waits to be killed
+CHILD = textwrap.dedent('''
+    import sys
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    import transit_cache as tc
+
+    tc.DB_PATH = sys.argv[1]
+    tc.create_cache_db()
+
+    def fetch(i):
+        with tc._cache_writer_lock:
+            if tc._cache_writer is None:
+                tc._cache_writer = tc.CacheWriter(batch_size=10 ** 6, flush_interval=3600)
+        tc.get_cache_writer().put('A', f'Station {i}', 8, f'{i + 1} min')
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(fetch, range(20)))
+    print('queued', flush=True)
+    time.sleep(60)
+''')
+
+
+def test_sigterm_flushes_queued_rows(tmp_path):
+    db_path = str(tmp_path / 'transit_cache.db')
+    child = subprocess.Popen([sys.executable, '-c', CHILD, db_path], cwd=ROOT,
+                             stdout=subprocess.PIPE, text=True)
+    try:
+        assert child.stdout.readline().strip() == 'queued'
+        child.send_signal(signal.SIGTERM)
+        assert child.wait(10) == 128 + signal.SIGTERM
+    finally:
+        child.kill()
+        child.stdout.close()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM transit_cache').fetchone()[0] == 20
+    finally:
+        conn.close()
+
+
+def test_handler_is_installed_at_import_on_the_main_thread():
+    assert signal.getsignal(signal.SIGTERM) not in (signal.SIG_DFL, None)
+
+
+def test_writer_commits_on_flush(tmp_path):
+    db_path = str(tmp_path / 'transit_cache.db')
+    tc.create_cache_db(db_path)
+    writer = tc.CacheWriter(db_path, batch_size=10 ** 6, flush_interval=3600)
+    try:
+        writer.put('A', 'B', None, '12 min')
+        writer.put('A', 'B', None, '14 min')
+        assert writer.flush(5)
+        conn = sqlite3.connect(db_path)
+        try:
+            assert conn.execute('SELECT transit_time, duration FROM transit_cache').fetchall() == [('14 min', 14)]
+        finally:
+            conn.close()
+    finally:
+        writer.close()
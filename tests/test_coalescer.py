@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from coalescer import RequestCoalescer
+
+WAITERS = 8
+
+
+class CountingFetch:
+    """Fake fetch that blocks until released, counting how often it actually runs."""
+
+    def __init__(self, result='27 分', error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, origin, destination):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5), "fetch was never released"
+        if self.error is not None:
+            raise self.error
+        return f"{origin}->{destination}: {self.result}"
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for condition"
+        time.sleep(0.001)
+
+
+def run_concurrently(coalescer, fetch, key=('A', 'B', None)):
+    """Start a leader, then WAITERS callers while it is in flight; returns (threads, outcomes)."""
+    outcomes = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            outcome = ('ok', coalescer.run(key, fetch, 'A', 'B'))
+        except Exception as e:
+            outcome = ('error', e)
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    assert fetch.started.wait(5)
+    for _ in range(WAITERS):
+        thread = threading.Thread(target=call)
+        thread.start()
+        threads.append(thread)
+    # Every waiter has joined the leader's call before it is allowed to finish
+    wait_until(lambda: coalescer.stats()['coalesced'] == WAITERS)
+    fetch.release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_concurrent_callers_share_one_fetch():
+    coalescer, fetch = RequestCoalescer(), CountingFetch()
+    outcomes = run_concurrently(coalescer, fetch)
+
+    assert fetch.calls == 1
+    assert outcomes == [('ok', 'A->B: 27 分')] * (WAITERS + 1)
+    assert coalescer.stats() == {'calls': 1, 'coalesced': WAITERS, 'inflight': 0}
+
+
+def test_exception_reaches_every_waiter():
+    error = RuntimeError("page timed out")
+    coalescer, fetch = RequestCoalescer(), CountingFetch(error=error)
+    outcomes = run_concurrently(coalescer, fetch)
+
+    assert fetch.calls == 1
+    assert outcomes == [('error', error)] * (WAITERS + 1)
+    assert coalescer.inflight_count() == 0
+
+
+@pytest.mark.parametrize("error", [None, RuntimeError("page timed out")])
+def test_key_is_forgotten_after_the_call_finishes(error):
+    coalescer = RequestCoalescer()
+    first, second = CountingFetch(error=error), CountingFetch()
+    first.release.set()
+    second.release.set()
+    key = ('A', 'B', 8)
+
+    if error is None:
+        coalescer.run(key, first, 'A', 'B')
+    else:
+        with pytest.raises(RuntimeError):
+            coalescer.run(key, first, 'A', 'B')
+    assert coalescer.inflight_count() == 0
+
+    # A later call for the same key fetches again instead of reusing the finished one
+    assert coalescer.run(key, second, 'A', 'B') == 'A->B: 27 分'
+    assert (first.calls, second.calls) == (1, 1)
+    assert coalescer.stats() == {'calls': 2, 'coalesced': 0, 'inflight': 0}
+
+
+def test_different_keys_do_not_coalesce():
+    coalescer, fetch = RequestCoalescer(), CountingFetch()
+    fetch.release.set()
+    coalescer.run(('A', 'B', None), fetch, 'A', 'B')
+    coalescer.run(('A', 'B', 8), fetch, 'A', 'B')
+    assert fetch.calls == 2
@@ -0,0 +1,157 @@
+import threading
+
+import pytest
+
+from concurrency import AdaptiveConcurrency
+
+
+def controller(**kwargs):
+    kwargs.setdefault('memory', lambda: None)
+    return AdaptiveConcurrency(**kwargs)
+
+
+def feed_window(limiter, latency=1.0, timeouts=0, failures=0):
+    """Complete one window (`limit` fetches) with the given latency and outcomes."""
+    for i in range(limiter.limit):
+        limiter.acquire()
+        if i < timeouts:
+            limiter.release(limiter.timeout_seconds, ok=False)
+        elif i < timeouts + failures:
+            limiter.release(0.1, ok=False)
+        else:
+            limiter.release(latency)
+
+
+def test_initial_limit_is_clamped_and_bounds_are_checked():
+    assert controller(floor=2, ceiling=8).limit == 2
+    assert controller(floor=2, ceiling=8, initial=20).limit == 8
+    assert controller(floor=2, ceiling=8, initial=1).limit == 2
+    with pytest.raises(ValueError):
+        controller(floor=0, ceiling=4)
+    with pytest.raises(ValueError):
+        controller(floor=5, ceiling=4)
+
+
+def test_clean_windows_increase_by_one_up_to_the_ceiling():
+    limiter = controller(floor=2, ceiling=5)
+    limits = []
+    for _ in range(5):
+        feed_window(limiter)
+        limits.append(limiter.limit)
+    assert limits == [3, 4, 5, 5, 5]
+    assert (limiter.increases, limiter.decreases) == (3, 0)
+
+
+def test_no_adjustment_before_a_full_window():
+    limiter = controller(floor=2, ceiling=8, initial=4)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(1.0)
+    assert limiter.limit == 4
+    limiter.acquire()
+    limiter.release(1.0)
+    assert limiter.limit == 5
+
+
+def test_timeouts_halve_the_limit_down_to_the_floor():
+    decreased = []
+    limiter = controller(floor=2, ceiling=16, initial=8, on_decrease=decreased.append)
+    limits = []
+    for _ in range(3):
+        feed_window(limiter, timeouts=limiter.limit)
+        limits.append(limiter.limit)
+    assert limits == [4, 2, 2]
+    assert decreased == [4, 2]
+    assert (limiter.increases, limiter.decreases) == (0, 2)
+
+
+def test_timeout_rate_threshold():
+    # 1 of 5 is exactly max_timeout_rate (20%): not a decrease
+    limiter = controller(floor=2, ceiling=16, initial=5)
+    feed_window(limiter, timeouts=1)
+    assert limiter.limit == 6
+    # 2 of 6 is over it
+    feed_window(limiter, timeouts=2)
+    assert limiter.limit == 3
+
+
+def test_fast_failures_are_not_timeouts():
+    limiter = controller(floor=2, ceiling=16, initial=4)
+    feed_window(limiter, failures=4)
+    assert limiter.limit == 5
+
+
+def test_latency_above_tolerance_of_best_window_decreases():
+    limiter = controller(floor=2, ceiling=16, initial=4)
+    feed_window(limiter, latency=1.0)
+    assert (limiter.limit, limiter.stats()['best_latency']) == (5, 1.0)
+    # Within latency_tolerance (2x) of the best window: still increasing
+    feed_window(limiter, latency=1.9)
+    assert limiter.limit == 6
+    feed_window(limiter, latency=2.5)
+    assert limiter.limit == 3
+    # A faster window lowers the baseline
+    feed_window(limiter, latency=0.5)
+    assert (limiter.limit, limiter.stats()['best_latency']) == (4, 0.5)
+    feed_window(limiter, latency=1.2)
+    assert limiter.limit == 2
+
+
+def test_timeout_windows_do_not_set_the_latency_baseline():
+    limiter = controller(floor=2, ceiling=16, initial=4)
+    feed_window(limiter, latency=0.1, timeouts=4)
+    assert limiter.stats()['best_latency'] is None
+    feed_window(limiter, latency=1.0)
+    assert limiter.stats()['best_latency'] == 1.0
+
+
+def test_low_memory_decreases():
+    available = [4096.0]
+    limiter = controller(floor=2, ceiling=16, initial=8, memory=lambda: available[0])
+    feed_window(limiter)
+    assert limiter.limit == 9
+    available[0] = 512.0
+    feed_window(limiter)
+    assert limiter.limit == 4
+
+
+def test_slot_accounts_inflight_and_failures():
+    # With timeout_seconds=0 every failed fetch counts as a timeout
+    limiter = controller(floor=1, ceiling=4, initial=2, timeout_seconds=0.0)
+    with limiter.slot():
+        assert limiter.stats()['inflight'] == 1
+    assert limiter.stats()['inflight'] == 0
+    with limiter.slot() as outcome:
+        outcome['ok'] = False
+    # One of two fetches timed out
+    assert limiter.limit == 1
+
+    # An exception inside the slot frees it and counts as a failure
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            raise RuntimeError("driver crashed")
+    assert limiter.stats()['inflight'] == 0
+    assert (limiter.limit, limiter.decreases) == (1, 1)
+
+    with limiter.slot():
+        pass
+    assert limiter.limit == 2
+
+
+def test_acquire_blocks_at_the_limit():
+    limiter = controller(floor=2, ceiling=2)
+    limiter.acquire()
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def third():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=third)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release(1.0)
+    assert acquired.wait(5)
+    thread.join(5)
+    assert limiter.stats()['inflight'] == 2
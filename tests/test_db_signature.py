@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from db_signature import db_signature
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_signature_tracks_writes_and_ignores_an_empty_wal(tmp_path):
+    db_path = str(tmp_path / 'tokyo_rent.db')
+    assert db_signature(db_path) == (None, None)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE properties (id INTEGER PRIMARY KEY, station TEXT)')
+    conn.commit()
+    conn.close()
+    before = db_signature(db_path)
+    assert before[0] is not None
+
+    # A reader leaves an empty WAL behind while it is open
+    reader = sqlite3.connect(db_path)
+    reader.execute('SELECT COUNT(*) FROM properties').fetchone()
+    open(f'{db_path}-wal', 'ab').close()
+    assert db_signature(db_path) == before
+
+    writer = sqlite3.connect(db_path)
+    with writer:
+        writer.execute("INSERT INTO properties (station) VALUES ('Shinjuku')")
+    assert db_signature(db_path) != before
+    writer.close()
+    reader.close()
+
+
+def test_station_resolver_does_not_import_numpy_or_pandas():
+    output = subprocess.run(
+        [sys.executable, '-c', "import sys, station_resolver; "
+                               "print(*(m for m in ('numpy', 'pandas', 'rent_analytics') if m in sys.modules))"],
+        cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert output.returncode == 0, output.stderr
+    assert output.stdout.split() == []
@@ -0,0 +1,48 @@
+import pytest
+
+from duration_parser import parse_duration
+from stub_maps_server import DURATION_FORMATS
+
+
+@pytest.mark.parametrize("language", sorted(DURATION_FORMATS))
+@pytest.mark.parametrize("hours, minutes", [(0, 7), (0, 59), (1, 0), (1, 5), (2, 30)])
+def test_parses_every_stub_language(language, hours, minutes):
+    short, long = DURATION_FORMATS[language]
+    text = long.format(h=hours, m=minutes) if hours else short.format(m=minutes)
+    assert parse_duration(text) == hours * 60 + minutes
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 hr 5 min", 65),
+    ("2 hrs 10 mins", 130),
+    ("1 hour 1 minute", 61),
+    ("3 h 4 m", 184),
+    ("4 小時 30 分", 270),
+    ("1 ora 15 minuti", 75),
+    ("1 heure 20 min", 80),
+])
+def test_parses_unit_spellings(text, expected):
+    assert parse_duration(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 day", 1440),
+    ("2 days", 2880),
+    ("1 day 2 hr", 1560),
+    ("1 day 3 hr 4 min", 1624),
+    ("1 日 2 時間 5 分", 1565),
+    ("1 天 3 小时", 1620),
+    ("1 일 1 시간", 1500),
+])
+def test_parses_day_units(text, expected):
+    assert parse_duration(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [("45", 45), ("7", 7), (" 12 ", 12), ("1 hr 5", 65)])
+def test_bare_numbers_count_as_minutes(text, expected):
+    assert parse_duration(text) == expected
+
+
+@pytest.mark.parametrize("text", [None, "", "   ", "No route", "min", "時間 分", "0 min", "0"])
+def test_unparsable_text_returns_none(text):
+    assert parse_duration(text) is None
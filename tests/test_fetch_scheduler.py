@@ -0,0 +1,64 @@
+import threading
+
+import get_transit_time as gt
+from fetch_scheduler import distance_rings, ring_exhausted
+
+# Stations due north of O; 0.01 degrees of latitude is ~1.1 km
+PLACES = {name: {'latitude': 35.0 + km / 111.2, 'longitude': 139.0}
+          for name, km in [('O', 0), ('N1', 1), ('N3', 3), ('N7', 7), ('N12', 12), ('N17', 17), ('N22', 22)]}
+
+
+def test_distance_rings_group_by_ring_and_sort_nearest_first():
+    pairs = [('O', 'N12'), ('O', 'N3'), ('O', 'Nowhere'), ('O', 'N1'), ('O', 'N7'), ('Nowhere', 'N1')]
+    rings, unplaced = distance_rings(pairs, PLACES.get, ring_km=5)
+    assert rings == [[('O', 'N1'), ('O', 'N3')], [('O', 'N7')], [('O', 'N12')]]
+    assert unplaced == [('O', 'Nowhere'), ('Nowhere', 'N1')]
+    # Empty rings in between are dropped
+    assert distance_rings([('O', 'N1'), ('O', 'N22')], PLACES.get, ring_km=5)[0] == [[('O', 'N1')], [('O', 'N22')]]
+    assert distance_rings([], PLACES.get) == ([], [])
+
+
+def test_ring_exhausted_needs_a_parsed_duration_and_all_over_the_limit():
+    assert ring_exhausted([40, 50, None], 30)
+    assert not ring_exhausted([40, 30], 30)
+    # A ring where every fetch failed says nothing about reach
+    assert not ring_exhausted([None, None], 30)
+    assert not ring_exhausted([], 30)
+
+
+def sweep(pairs, transit_function, **kwargs):
+    return list(gt.iter_parallel_processing(pairs, transit_function, coordinates=PLACES.get, ring_km=5,
+                                            max_duration=30, **kwargs))
+
+
+def test_next_ring_is_fetched_while_the_current_one_drains():
+    next_ring_started = threading.Event()
+    overlapped = []
+
+    def transit_function(origin, destination, depart_time):
+        if destination == 'N1':
+            # Only returns early if N7, a ring further out, starts while N1 is still fetching
+            overlapped.append(next_ring_started.wait(timeout=5))
+        else:
+            next_ring_started.set()
+        return origin, destination, depart_time, '10 min'
+
+    results = sweep([('O', 'N1'), ('O', 'N7')], transit_function, num_workers=2)
+    assert overlapped == [True]
+    assert sorted(result[1] for result, _ in results) == ['N1', 'N7']
+
+
+def test_rings_past_the_cutoff_are_reported_not_fetched():
+    calls = []
+
+    def transit_function(origin, destination, depart_time):
+        calls.append(destination)
+        return origin, destination, depart_time, '100 min'
+
+    pairs = [('O', 'N1'), ('O', 'N7'), ('O', 'N12'), ('O', 'N17'), ('O', 'N22')]
+    results = sweep(pairs, transit_function, num_workers=1, patience=2)
+    progress = results[-1][1]
+    # The cutoff follows the second completed ring; N12 may already have started by then, N17 and N22 never do
+    assert calls[:2] == ['N1', 'N7'] and 'N17' not in calls and 'N22' not in calls
+    assert progress['skipped'] == len(pairs) - len(calls) >= 2
+    assert progress['done'] == progress['total'] == len(calls) == len(results)
@@ -0,0 +1,23 @@
+import prewarm_cache
+
+
+def run_for(stations):
+    return {'prefectures': ['Tokyo'], 'depart_hour': 8, 'stations': len(stations),
+            'stations_sha1': prewarm_cache.pairs_digest(stations), 'chunk_size': 500}
+
+
+def test_checkpoint_resumes_only_the_same_ordered_station_list(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    stations = ['A Station, Tokyo', 'B Station, Tokyo', 'C Station, Tokyo']
+    checkpoint = {'run': run_for(stations), 'next_chunk': 3, 'pairs_done': 1500,
+                  'cache_hits': 0, 'fetched': 1500, 'failed': 0}
+    prewarm_cache.save_checkpoint(path, checkpoint)
+
+    assert prewarm_cache.load_checkpoint(path, run_for(stations)) == checkpoint
+    # Same count, different order or different stations: chunk indices mean other pairs
+    assert prewarm_cache.load_checkpoint(path, run_for(stations[::-1])) is None
+    assert prewarm_cache.load_checkpoint(path, run_for(stations[:2] + ['D Station, Tokyo'])) is None
+
+
+def test_missing_checkpoint_starts_fresh(tmp_path):
+    assert prewarm_cache.load_checkpoint(str(tmp_path / 'none.json'), run_for(['A Station, Tokyo'])) is None
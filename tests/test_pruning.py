@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+import pruning
+import transit_cache as tc
+
+# Cached directed trips as (origin, destination, minutes); K1 and K2 both reach O, X and Y
+TRIPS = [
+    ('K1', 'O', 10), ('K1', 'X', 50), ('K1', 'Y', 44),
+    ('K2', 'O', 30), ('K2', 'X', 45), ('K2', 'Y', 20),
+    # O's own trips never bound O -> x
+    ('O', 'X', 1),
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    db_path = str(tmp_path / 'transit_cache.db')
+    tc.create_cache_db(db_path)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        for origin, destination, minutes in TRIPS:
+            tc.upsert_transit_time(conn.cursor(), origin, destination, 8, f'{minutes} min')
+        # Another departure time is a separate set of trips
+        tc.upsert_transit_time(conn.cursor(), 'K1', 'O', None, '1 min')
+        tc.upsert_transit_time(conn.cursor(), 'K1', 'X', None, '90 min')
+    conn.close()
+    return db_path
+
+
+def test_distance_lower_bound():
+    tokyo = {'latitude': 35.681, 'longitude': 139.767}
+    one_degree_north = {'latitude': 36.681, 'longitude': 139.767}
+    assert pruning.distance_lower_bound(tokyo, tokyo) == 0
+    # One degree of latitude is ~111.2 km: ~20.8 min at 320 km/h, twice that at 160 km/h
+    assert pruning.distance_lower_bound(tokyo, one_degree_north) == pytest.approx(20.85, abs=0.05)
+    assert pruning.distance_lower_bound(tokyo, one_degree_north, max_speed_kmh=160) == pytest.approx(41.7, abs=0.1)
+
+
+def test_cached_lower_bounds_take_the_best_intermediate_station(cache):
+    # O -> X >= max(50 - 10, 45 - 30); O -> Y >= max(44 - 10, 20 - 30); K1 -> O and K2 -> O bound O -> O at 0
+    assert pruning.cached_lower_bounds('O', 8, cache) == {'X': 40, 'Y': 34, 'O': 0}
+    assert pruning.cached_lower_bounds('O', None, cache) == {'X': 89, 'O': 0}
+    assert pruning.cached_lower_bounds('Z', 8, cache) == {}
+
+
+def test_cached_lower_bounds_use_the_destination_index(cache):
+    conn = sqlite3.connect(cache)
+    try:
+        plan = ' '.join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT origin FROM transit_cache WHERE destination = 'O'"))
+    finally:
+        conn.close()
+    assert 'idx_transit_cache_destination' in plan
+
+
+def test_prune_pairs_applies_the_tolerance_and_the_distance_bound(cache):
+    places = {
+        'O': {'latitude': 35.681, 'longitude': 139.767},
+        'Far': {'latitude': 36.681, 'longitude': 139.767},
+    }
+    pairs = [('O', 'X'), ('O', 'Y'), ('O', 'Far'), ('O', 'Unknown')]
+    kept, pruned = pruning.prune_pairs(pairs, 30, coordinates=places.get, depart_time=8, db_path=cache)
+    # Y's bound of 34 is within 30 + DEFAULT_TOLERANCE, X's 40 is not
+    assert kept == [('O', 'Y'), ('O', 'Far'), ('O', 'Unknown')]
+    assert pruned == [('O', 'X')]
+
+    # Far's ~21 min at 320 km/h is over 10 + DEFAULT_TOLERANCE
+    kept, pruned = pruning.prune_pairs(pairs, 10, coordinates=places.get, depart_time=8, db_path=cache)
+    assert kept == [('O', 'Unknown')]
+    assert pruned == [('O', 'X'), ('O', 'Y'), ('O', 'Far')]
+
+    # Without a tolerance, Y's bound is over the limit too
+    kept, pruned = pruning.prune_pairs(pairs, 30, depart_time=8, tolerance=0, db_path=cache)
+    assert kept == [('O', 'Far'), ('O', 'Unknown')]
+    assert pruned == [('O', 'X'), ('O', 'Y')]
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from rent_analytics import RentColumns, grouped_quantiles
+
+QS = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+
+
+def test_grouped_quantiles_match_numpy_linear():
+    rng = np.random.default_rng(0)
+    # Sizes 1 and 2 exercise the edges of the interpolation
+    groups = [np.sort(rng.uniform(1000, 6000, size)) for size in (1, 2, 3, 4, 7, 50, 333)]
+    values = np.concatenate(groups)
+    offsets = np.concatenate(([0], np.cumsum([len(group) for group in groups])))
+
+    result = grouped_quantiles(values, offsets, np.arange(len(groups)), QS)
+    assert result.shape == (len(groups), len(QS))
+    for row, group in zip(result, groups):
+        assert row == pytest.approx(np.quantile(group, QS, method='linear'))
+
+    # Any subset of groups, in any order
+    subset = grouped_quantiles(values, offsets, np.array([5, 0]), QS)
+    assert subset == pytest.approx(result[[5, 0]])
+
+
+def test_rent_columns_quantiles_and_stats_per_station():
+    rng = np.random.default_rng(1)
+    stations = rng.choice(['Nakano', 'Shibuya', 'Shinjuku'], 500).tolist() + [None]
+    costs = rng.uniform(1000, 6000, 501)
+    costs[::50] = np.nan
+    columns = RentColumns(stations, costs)
+
+    frame = columns.quantiles(QS, ['Shinjuku', 'Nakano', 'Unknown'])
+    assert frame.index.tolist() == ['Nakano', 'Shinjuku']
+    for station in frame.index:
+        priced = [cost for name, cost in zip(stations, costs) if name == station and not np.isnan(cost)]
+        assert frame.loc[station].tolist() == pytest.approx(np.quantile(priced, QS, method='linear'))
+
+        stats = columns.stats([station]).loc[station]
+        q1, median, q3 = np.quantile(priced, (0.25, 0.5, 0.75), method='linear')
+        assert stats['count'] == len(priced)
+        assert [stats['median'], stats['q1'], stats['q3'], stats['iqr']] == pytest.approx([median, q1, q3, q3 - q1])
+        assert (stats['min'], stats['max']) == (min(priced), max(priced))
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from rent_analytics import RentColumns
+from rent_facets import FacetIndex
+
+N = 403  # Not a multiple of 8, so the packed bitmaps have padding bits
+
+
+@pytest.fixture
+def listings():
+    rng = np.random.default_rng(0)
+    extra = {
+        'room_type': rng.choice(['1K', '1LDK', '2LDK', 'Studio'], N).astype(object),
+        'size': rng.uniform(10, 80, N),
+        'year': rng.integers(1975, 2024, N).astype(np.float64),
+        'floor': rng.integers(1, 15, N).astype(np.float64),
+        'minute': rng.integers(1, 20, N).astype(np.float64),
+    }
+    extra['size'][::7] = np.nan
+    extra['minute'][::11] = np.nan
+    columns = RentColumns(rng.choice(['Nakano', 'Shinjuku'], N).tolist(), rng.uniform(1000, 6000, N), extra)
+    return columns, FacetIndex(columns)
+
+
+def test_mask_is_the_and_of_the_filters(listings):
+    columns, index = listings
+    data = columns.columns
+    mask = index.mask(room_type=['1LDK', '2LDK'], size=25, year=2010, minute=10)
+    # NaN comparisons are False, so listings without a value never match a threshold
+    expected = (np.isin(data['room_type'], ['1LDK', '2LDK']) & (data['size'] >= 25)
+                & (data['year'] >= 2010) & (data['minute'] <= 10))
+    assert mask.dtype == bool and len(mask) == N
+    assert np.array_equal(mask, expected)
+    assert index.count(room_type=['1LDK', '2LDK'], size=25, year=2010, minute=10) == expected.sum()
+
+    assert np.array_equal(index.mask(room_type='Studio'), data['room_type'] == 'Studio')
+    assert not index.mask(room_type='Penthouse').any()
+
+
+def test_mask_skips_unset_filters(listings):
+    columns, index = listings
+    assert index.mask() is None
+    assert index.mask(room_type=None, size=None) is None
+    assert index.mask(room_type=[]) is None
+    assert index.count(room_type=[]) == N
+    assert np.array_equal(index.mask(room_type=[], floor=5), columns.columns['floor'] >= 5)
+
+
+def test_mask_rejects_unknown_facets_and_thresholds(listings):
+    _, index = listings
+    with pytest.raises(ValueError):
+        index.mask(balcony=True)
+    with pytest.raises(ValueError):
+        index.mask(size=26)
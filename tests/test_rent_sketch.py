@@ -0,0 +1,145 @@
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+import rent_sketch
+from rent_sketch import KLLSketch
+
+
+def rank_error_of(sketch, n):
+    """Worst distance between the ranks a sketch answers and the exact ranks, over values 0..n-1."""
+    qs = np.linspace(0, 1, 101)
+    # Value v is rank v, so an estimate's distance to the exact quantile is its rank error
+    return max(abs(estimate - (n - 1) * q) for q, estimate in zip(qs, sketch.quantiles(qs)))
+
+
+def shuffled(n, seed=0):
+    values = list(range(n))
+    random.Random(seed).shuffle(values)
+    return [float(value) for value in values]
+
+
+def test_small_sketch_is_exact():
+    values = [random.Random(1).uniform(2000, 5000) for _ in range(150)]
+    sketch = KLLSketch(k=200)
+    sketch.extend(values)
+    assert sketch.rank_error() == 0
+    assert sketch.quantiles((0.25, 0.5, 0.75)) == pytest.approx(np.quantile(values, (0.25, 0.5, 0.75)))
+    assert (sketch.count, sketch.min, sketch.max) == (150, min(values), max(values))
+
+
+@pytest.mark.parametrize("n, k", [(20_000, 200), (100_000, 200), (100_000, 400)])
+def test_rank_error_within_bound_on_uniform_ranks(n, k):
+    sketch = KLLSketch(k=k)
+    sketch.extend(shuffled(n))
+    observed = rank_error_of(sketch, n)
+
+    assert sketch.count == n and (sketch.min, sketch.max) == (0.0, n - 1.0)
+    assert 0 < sketch.rank_error()
+    assert observed <= sketch.rank_error()
+    # Normalized error is about 1/k in practice, far below the deterministic bound
+    assert observed / n < 3 / k
+
+
+def test_merge_sketches_the_union():
+    n = 60_000
+    values = shuffled(n, seed=2)
+    left, right = KLLSketch(k=200, seed=1), KLLSketch(k=200, seed=2)
+    left.extend(values[:n // 3])
+    right.extend(values[n // 3:])
+    bound = left.rank_error() + right.rank_error()
+    left.merge(right)
+
+    assert (left.count, left.min, left.max) == (n, 0.0, n - 1.0)
+    assert left.rank_error() >= bound
+    assert rank_error_of(left, n) <= left.rank_error()
+    assert rank_error_of(left, n) / n < 0.015
+
+
+def test_merge_of_uncompacted_sketches_is_exact():
+    left, right = KLLSketch(k=200), KLLSketch(k=200)
+    left.extend([1.0, 5.0, 9.0])
+    right.extend([2.0, 3.0])
+    left.merge(right)
+    assert left.rank_error() == 0
+    assert left.quantiles((0.25, 0.5, 0.75)) == [2.0, 3.0, 5.0]
+
+
+def test_json_round_trip():
+    sketch = KLLSketch(k=100)
+    sketch.extend(shuffled(10_000, seed=3))
+    restored = KLLSketch.from_json(sketch.to_json())
+
+    assert restored.to_json() == sketch.to_json()
+    assert restored.quantiles((0.1, 0.5, 0.9)) == sketch.quantiles((0.1, 0.5, 0.9))
+    assert restored.rank_error() == sketch.rank_error()
+
+    # A restored sketch keeps absorbing updates within its bound
+    restored.extend(float(value) for value in range(10_000, 20_000))
+    assert restored.count == 20_000
+    assert rank_error_of(restored, 20_000) <= restored.rank_error()
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    rent_db = str(tmp_path / 'tokyo_rent.db')
+    conn = sqlite3.connect(rent_db)
+    conn.execute('CREATE TABLE properties (id INTEGER PRIMARY KEY, created_at TEXT, station TEXT, cost_per_square REAL)')
+    conn.commit()
+    conn.close()
+    return rent_db, str(tmp_path / 'rent_sketches.db')
+
+
+def append(rent_db, rows):
+    conn = sqlite3.connect(rent_db)
+    with conn:
+        conn.executemany('INSERT INTO properties (id, created_at, station, cost_per_square) VALUES (?, ?, ?, ?)', rows)
+    conn.close()
+
+
+def counts(sketch_db):
+    return {station: sketch.count for station, sketch in rent_sketch.load_sketches(['Shinjuku', 'Shibuya'], sketch_db).items()}
+
+
+def test_watermark_picks_up_equal_created_at_and_never_double_counts(dbs):
+    rent_db, sketch_db = dbs
+    batch = '2025-01-01 00:00:00'
+    append(rent_db, [(1, batch, 'Shinjuku', 3000.0), (2, batch, 'Shibuya', 3500.0), (3, batch, 'Shinjuku', 3100.0)])
+
+    result = rent_sketch.update_sketches(rent_db, sketch_db)
+    assert (result['rows'], result['watermark']) == (3, (batch, 3))
+    assert counts(sketch_db) == {'Shinjuku': 2, 'Shibuya': 1}
+
+    # Same created_at as the watermark, higher id: still new
+    append(rent_db, [(4, batch, 'Shinjuku', 3200.0), (5, batch, 'Shibuya', 3600.0)])
+    result = rent_sketch.update_sketches(rent_db, sketch_db)
+    assert (result['rows'], result['watermark']) == (2, (batch, 5))
+    assert counts(sketch_db) == {'Shinjuku': 3, 'Shibuya': 2}
+
+    # Nothing new: a rerun folds in nothing
+    result = rent_sketch.update_sketches(rent_db, sketch_db)
+    assert (result['rows'], result['watermark']) == (0, (batch, 5))
+    assert counts(sketch_db) == {'Shinjuku': 3, 'Shibuya': 2}
+
+    later = '2025-01-02 00:00:00'
+    append(rent_db, [(6, later, 'Shinjuku', 3300.0)])
+    assert rent_sketch.update_sketches(rent_db, sketch_db)['rows'] == 1
+    assert rent_sketch.update_sketches(rent_db, sketch_db)['rows'] == 0
+    assert counts(sketch_db) == {'Shinjuku': 4, 'Shibuya': 2}
+
+    stats = rent_sketch.sketch_stats(['Shinjuku', 'Shibuya'], rent_db_path=rent_db, sketch_db_path=sketch_db)
+    exact = rent_sketch.sketch_stats(['Shinjuku', 'Shibuya'], exact=True, rent_db_path=rent_db, sketch_db_path=sketch_db)
+    assert stats.keys() == exact.keys()
+    for station in exact:
+        assert stats[station] == pytest.approx(exact[station])
+
+
+def test_rebuild_starts_from_the_first_listing(dbs):
+    rent_db, sketch_db = dbs
+    append(rent_db, [(1, '2025-01-01', 'Shinjuku', 3000.0), (2, '2025-01-01', 'Shinjuku', 3100.0)])
+    rent_sketch.update_sketches(rent_db, sketch_db)
+    result = rent_sketch.update_sketches(rent_db, sketch_db, rebuild=True)
+    assert result['rows'] == 2
+    assert counts(sketch_db) == {'Shinjuku': 2}
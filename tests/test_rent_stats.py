@@ -0,0 +1,67 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+import rent_stats
+
+LISTINGS = [
+    ('Shinjuku', 4000.0), ('Shinjuku', 3000.0), ('Shinjuku', 3500.0), ('Shinjuku', 5000.0),
+    ('Nakano', 2500.0), ('Nakano', 2700.0), ('Nakano', 2600.0),
+    ('Ikebukuro', 3100.0),
+    # Listings without a station or a price never count
+    (None, 9999.0), ('Nakano', None),
+]
+
+
+@pytest.fixture
+def rent_db(tmp_path):
+    path = str(tmp_path / 'tokyo_rent.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE properties (id INTEGER PRIMARY KEY, station TEXT, cost_per_square REAL)')
+    conn.executemany('INSERT INTO properties (station, cost_per_square) VALUES (?, ?)', LISTINGS)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def expected_stats(costs):
+    q1, median, q3 = np.quantile(costs, (0.25, 0.5, 0.75))
+    return {'count': len(costs), 'median': median, 'q1': q1, 'q3': q3, 'iqr': q3 - q1,
+            'min': min(costs), 'max': max(costs)}
+
+
+def test_load_builds_the_table_on_first_use(rent_db):
+    stats = rent_stats.load_station_stats(['Shinjuku', 'Nakano', 'Unknown', None], rent_db)
+    assert set(stats) == {'Shinjuku', 'Nakano'}
+    assert stats['Shinjuku'] == pytest.approx(expected_stats([3000, 3500, 4000, 5000]))
+    assert stats['Nakano'] == pytest.approx(expected_stats([2500, 2600, 2700]))
+    # The median of an even count is the mean of the two middle values
+    assert stats['Shinjuku']['median'] == 3750
+    assert rent_stats.load_station_stats([], rent_db) == {}
+
+    conn = sqlite3.connect(rent_db)
+    try:
+        assert rent_stats.stats_table_exists(conn)
+        assert conn.execute('SELECT COUNT(*) FROM station_rent_stats').fetchone() == (3,)
+    finally:
+        conn.close()
+
+
+def test_refresh_only_touches_the_given_stations(rent_db):
+    rent_stats.load_station_stats(['Shinjuku'], rent_db)
+    conn = sqlite3.connect(rent_db)
+    try:
+        with conn:
+            conn.execute("INSERT INTO properties (station, cost_per_square) VALUES ('Nakano', 2000.0)")
+            conn.execute("INSERT INTO properties (station, cost_per_square) VALUES ('Shinjuku', 1000.0)")
+            conn.execute("DELETE FROM properties WHERE station = 'Ikebukuro'")
+            assert rent_stats.refresh_station_stats(conn, ['Nakano', 'Ikebukuro', None]) == 1
+    finally:
+        conn.close()
+
+    stats = rent_stats.load_station_stats(['Shinjuku', 'Nakano', 'Ikebukuro'], rent_db)
+    assert stats['Nakano'] == pytest.approx(expected_stats([2000, 2500, 2600, 2700]))
+    # Stations outside the refresh keep their stored rows; ones left without listings are removed
+    assert stats['Shinjuku'] == pytest.approx(expected_stats([3000, 3500, 4000, 5000]))
+    assert 'Ikebukuro' not in stats
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from transit_backends import ChromeBackend, FakeBackend, TransitBackend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A full sweep through the fake backend, in a fresh interpreter so sys.modules is clean
+SWEEP = textwrap.dedent('''
+    import contextlib
+    import io
+    import sys
+
+    import transit_cache as tc
+
+    tc.DB_PATH = sys.argv[1]
+    import get_transit_time as gt
+    from concurrency import AdaptiveConcurrency
+    from transit_backends import FakeBackend, set_default_backend
+
+    set_default_backend(FakeBackend())
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = gt.parallel_processing([('A', 'B'), ('A', 'C')], gt.get_transit_time,
+                                         concurrency=AdaptiveConcurrency(floor=1, ceiling=4))
+    gt.get_fetch_concurrency().on_decrease(2)  # the backoff hook trims through the backend too
+    print(sum(1 for result in results if result[3]), *(m for m in ('selenium', 'webdriver_manager', 'driver_pool')
+                                                        if m in sys.modules))
+''')
+
+
+def test_non_chrome_sweep_never_loads_selenium(tmp_path):
+    output = subprocess.run([sys.executable, '-c', SWEEP, str(tmp_path / 'transit_cache.db')], cwd=ROOT,
+                            capture_output=True, text=True, timeout=60)
+    assert output.returncode == 0, output.stderr
+    assert output.stdout.split() == ['2']
+
+
+class RecordingPool:
+    def __init__(self):
+        self.calls = []
+
+    def resize(self, size):
+        self.calls.append(('resize', size))
+
+    def trim(self, keep):
+        self.calls.append(('trim', keep))
+
+
+def test_chrome_backend_sizes_and_trims_its_pool():
+    pool = RecordingPool()
+    backend = ChromeBackend(pool)
+    backend.reserve(8)
+    backend.trim(3)
+    assert pool.calls == [('resize', 8), ('trim', 3)]
+
+
+def test_other_backends_ignore_pool_sizing():
+    for backend in (TransitBackend(), FakeBackend()):
+        assert backend.reserve(8) is None
+        assert backend.trim(3) is None
@@ -0,0 +1,203 @@
+import sqlite3
+
+import pytest
+
+import transit_cache as tc
+
+# The layout shipped before schema versions existed (PRAGMA user_version 0)
+V0_TABLE = '''
+    CREATE TABLE transit_cache (
+        uuid INTEGER PRIMARY KEY AUTOINCREMENT,
+        origin TEXT,
+        destination TEXT,
+        depart_time INTEGER,
+        transit_time TEXT
+    , duration INTEGER)
+'''
+
+V0_ROWS = [
+    # uuid, origin, destination, depart_time, transit_time
+    (1, 'A', 'B', 8, '20 min'),
+    (2, 'A', 'B', 8, '25 min'),
+    (3, 'A', 'B', 8, None),
+    (4, 'A', 'B', None, '30 min'),
+    (5, 'A', 'B', None, '35 min'),
+    (6, 'A', 'B', None, None),
+    (7, 'A', 'C', None, None),
+    (8, 'A', 'C', None, None),
+    (9, 'A', 'B', 9, '40 min'),
+    (10, None, 'B', 8, '1 min'),
+]
+
+
+@pytest.fixture
+def v0_db(tmp_path):
+    path = str(tmp_path / 'transit_cache.db')
+    conn = sqlite3.connect(path)
+    conn.execute(V0_TABLE)
+    conn.executemany('INSERT INTO transit_cache (uuid, origin, destination, depart_time, transit_time) '
+                     'VALUES (?, ?, ?, ?, ?)', V0_ROWS)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT uuid, origin, destination, depart_time, transit_time FROM transit_cache '
+                            'ORDER BY uuid').fetchall()
+    finally:
+        conn.close()
+
+
+def test_migration_keeps_newest_row_with_a_transit_time_per_key(v0_db):
+    assert tc.create_cache_db(v0_db) == tc.SCHEMA_VERSION == 4
+
+    assert rows(v0_db) == [
+        # The newest row of a key with a transit time wins over newer failed ones
+        (2, 'A', 'B', '8', '25 min'),
+        # NULL depart_time ("leave now") rows form one key
+        (5, 'A', 'B', None, '35 min'),
+        # Keys without any transit time keep their newest row
+        (8, 'A', 'C', None, None),
+        (9, 'A', 'B', '9', '40 min'),
+    ]
+
+
+def test_migration_sets_user_version_and_is_idempotent(v0_db):
+    tc.create_cache_db(v0_db)
+    conn = sqlite3.connect(v0_db)
+    try:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 4
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(transit_cache)')]
+        assert columns == ['uuid', 'origin', 'destination', 'depart_time', 'transit_time', 'duration',
+                           'fetched_at', 'ttl']
+    finally:
+        conn.close()
+    before = rows(v0_db)
+    assert tc.create_cache_db(v0_db) == 4
+    assert rows(v0_db) == before
+
+
+@pytest.mark.parametrize("depart_time", [None, 8])
+def test_upserting_twice_leaves_one_row(v0_db, depart_time):
+    tc.create_cache_db(v0_db)
+    conn = sqlite3.connect(v0_db)
+    try:
+        for transit_time in ('50 min', '1 hr 5 min'):
+            with conn:
+                tc.upsert_transit_time(conn.cursor(), 'A', 'D', depart_time, transit_time)
+            with conn:
+                tc.upsert_transit_time(conn.cursor(), 'A', 'B', depart_time, transit_time)
+        for destination in ('B', 'D'):
+            matches = conn.execute(
+                "SELECT transit_time, duration FROM transit_cache "
+                "WHERE origin = 'A' AND destination = ? AND depart_time IS ?",
+                (destination, None if depart_time is None else str(depart_time))).fetchall()
+            assert matches == [('1 hr 5 min', 65)]
+    finally:
+        conn.close()
+
+
+def test_unique_key_rejects_a_duplicate_plain_insert(v0_db):
+    tc.create_cache_db(v0_db)
+    conn = sqlite3.connect(v0_db)
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO transit_cache (origin, destination, depart_time) VALUES ('A', 'B', NULL)")
+    finally:
+        conn.close()
+
+
+def test_lookup_pairs_table_is_dropped_after_use_and_on_error(tmp_path):
+    db_path = str(tmp_path / 'transit_cache.db')
+    tc.create_cache_db(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        with tc._with_lookup_pairs(conn, [('A', 'B'), ('A', 'B'), ('A', 'C')]) as cursor:
+            assert cursor.execute('SELECT COUNT(*) FROM lookup_pairs').fetchone() == (2,)
+        with pytest.raises(RuntimeError):
+            with tc._with_lookup_pairs(conn, [('A', 'D')]):
+                raise RuntimeError
+        # Both uses cleaned up, so the same connection can load another batch
+        with tc._with_lookup_pairs(conn, [('B', 'C')]) as cursor:
+            assert cursor.execute('SELECT origin, destination FROM lookup_pairs').fetchall() == [('B', 'C')]
+        assert conn.execute("SELECT name FROM sqlite_temp_master WHERE name = 'lookup_pairs'").fetchall() == []
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    (8, 8, 0), (8, 10, 2), (23, 1, 2), (1, 23, 2), (0, 12, 12), ('8', 9, 1),
+    (8, None, tc.NOW_BUCKET_DISTANCE), (None, 8, tc.NOW_BUCKET_DISTANCE), (None, None, 0),
+])
+def test_bucket_distance(a, b, distance):
+    assert tc.bucket_distance(a, b) == distance
+
+
+def test_bucket_distance_sql_matches_python():
+    hours = [None] + list(range(24))
+    conn = sqlite3.connect(':memory:')
+    try:
+        for a in hours:
+            for b in hours:
+                sql = f"SELECT {tc._bucket_distance_sql(':bucket')}"
+                assert conn.execute(sql, {'bucket': a, 'hour': b}).fetchone()[0] == tc.bucket_distance(a, b)
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def buckets_db(tmp_path):
+    path = str(tmp_path / 'transit_cache.db')
+    tc.create_cache_db(path)
+    conn = sqlite3.connect(path)
+    with conn:
+        for origin, destination, depart_time, transit_time, fetched_at in [
+            ('A', 'B', 8, '20 min', 100),
+            ('A', 'B', 10, '30 min', 300),
+            ('A', 'B', 6, '40 min', 200),
+            ('A', 'B', 23, '50 min', 100),
+            ('A', 'B', None, '60 min', 100),
+            ('A', 'C', 8, '15 min', 100),
+        ]:
+            tc.upsert_transit_time(conn.cursor(), origin, destination, depart_time, transit_time)
+            conn.execute('UPDATE transit_cache SET fetched_at = ? WHERE origin = ? AND destination = ? '
+                         'AND depart_time IS ?', (fetched_at, origin, destination,
+                                                  None if depart_time is None else str(depart_time)))
+    conn.close()
+    return path
+
+
+@pytest.mark.parametrize("depart_time, max_fallback_hours, expected", [
+    # The exact bucket wins over fresher neighbours
+    (8, 2, ('20 min', 8)),
+    # 8 and 10 are both an hour from 9: the later fetch wins
+    (9, 2, ('30 min', 10)),
+    (7, 1, ('40 min', 6)),
+    # Distance wraps around midnight
+    (1, 2, ('50 min', 23)),
+    (15, 2, None),
+    (9, 0, None),
+    # None accepts any bucket, "leave now" included, but a real hour still beats it
+    (None, 0, ('60 min', None)),
+    (15, None, ('30 min', 10)),
+])
+def test_bulk_check_nearest_bucket(buckets_db, depart_time, max_fallback_hours, expected):
+    hits = tc.bulk_check_nearest_bucket([('A', 'B'), ('A', 'D')], depart_time, max_fallback_hours, buckets_db)
+    assert hits == ({('A', 'B'): expected} if expected else {})
+
+
+def test_bulk_check_nearest_bucket_crosses_to_leave_now_only_for_any_bucket(buckets_db):
+    assert tc.bulk_check_nearest_bucket([('A', 'C')], None, 12, buckets_db) == {}
+    assert tc.bulk_check_nearest_bucket([('A', 'C')], None, None, buckets_db) == {('A', 'C'): ('15 min', 8)}
+
+
+def test_nearest_durations(buckets_db):
+    assert tc.nearest_durations('A', 9, 2, buckets_db) == {'B': 30, 'C': 15}
+    assert tc.nearest_durations('A', 9, 0, buckets_db) == {}
+    assert tc.nearest_durations('A', 8, 0, buckets_db) == {'B': 20, 'C': 15}
+    assert tc.nearest_durations('A', None, 0, buckets_db) == {'B': 60}
+    assert tc.nearest_durations('A', None, None, buckets_db) == {'B': 60, 'C': 15}
+    assert tc.nearest_durations('B', 8, None, buckets_db) == {}
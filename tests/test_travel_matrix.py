@@ -0,0 +1,100 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+import transit_cache as tc
+import travel_matrix as tm
+
+
+@pytest.fixture
+def cache(tmp_path):
+    db_path = str(tmp_path / 'transit_cache.db')
+    tc.create_cache_db(db_path)
+    return db_path
+
+
+def cache_pairs(db_path, pairs, depart_time=8):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        for origin, destination, minutes in pairs:
+            tc.upsert_transit_time(conn.cursor(), origin, destination, depart_time, f'{minutes} min')
+    conn.close()
+
+
+def matrix_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.npy'))
+
+
+def test_export_and_load(cache, tmp_path):
+    cache_pairs(cache, [('A', 'B', 10), ('A', 'C', 40), ('B', 'C', 5)])
+    cache_pairs(cache, [('A', 'B', 99)], depart_time=None)
+    assert tm.export_matrix(8, str(tmp_path), cache) == (3, 3)
+
+    matrix = tm.load_matrix(8, str(tmp_path))
+    assert matrix.durations_within('A', 30) == {'B': 10}
+    assert matrix.within('A', 60) == ['B', 'C']
+    assert matrix.reachable_from_both('A', 60, 'B', 10) == ['C']
+    assert matrix.is_current(cache)
+    assert tm.load_matrix(None, str(tmp_path)) is None
+
+
+def test_reexport_swaps_matrix_and_stations_together(cache, tmp_path):
+    directory = str(tmp_path)
+    cache_pairs(cache, [('A', 'B', 10)])
+    tm.export_matrix(8, directory, cache)
+    first = tm.load_matrix(8, directory)
+    first_files = matrix_files(directory)
+
+    cache_pairs(cache, [('A', 'C', 20), ('D', 'A', 7)])
+    assert not first.is_current(cache)
+    tm.export_matrix(8, directory, cache)
+
+    # One matrix file per departure time: the new export replaced the old one
+    assert len(matrix_files(directory)) == 1 and matrix_files(directory) != first_files
+    second = tm.load_matrix(8, directory)
+    assert second is not first
+    assert second.stations.tolist() == ['A', 'B', 'C', 'D']
+    assert second.matrix.shape == (4, 4)
+    assert second.durations_within('A', 30) == {'B': 10, 'C': 20}
+    # A matrix mapped before the swap still answers from its own export
+    assert first.durations_within('A', 30) == {'B': 10}
+
+
+def test_load_retries_when_a_newer_export_removes_the_matrix(cache, tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    cache_pairs(cache, [('A', 'B', 10)])
+    tm.export_matrix(8, directory, cache)
+    cache_pairs(cache, [('A', 'C', 20)])
+
+    real_load = np.load
+    calls = []
+
+    def racing_load(path, *args, **kwargs):
+        # A new export lands between reading the index and opening the matrix it named
+        if not calls:
+            tm.export_matrix(8, directory, cache)
+        calls.append(path)
+        return real_load(path, *args, **kwargs)
+
+    monkeypatch.setattr(tm.np, 'load', racing_load)
+    matrix = tm.TravelMatrix.load(8, directory)
+    assert len(calls) == 2
+    assert matrix.stations.tolist() == ['A', 'B', 'C']
+    assert matrix.durations_within('A', 30) == {'B': 10, 'C': 20}
+
+
+def test_load_rejects_a_matrix_that_does_not_match_the_index(cache, tmp_path):
+    directory = str(tmp_path)
+    cache_pairs(cache, [('A', 'B', 10)])
+    tm.export_matrix(8, directory, cache)
+    path = tm.index_path(8, directory)
+    with open(path, encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['stations'].append('C')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    with pytest.raises(ValueError):
+        tm.TravelMatrix.load(8, directory)
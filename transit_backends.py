@@ -0,0 +1,239 @@
+"""
+Pluggable sources of transit directions for get_transit_time.
+
+A backend turns (origin, destination, depart_time) into the raw duration text
+of the directions page. get_transit_time keeps caching, coalescing and failure
+backoff; the backend only fetches. Three are provided:
+
+- ChromeBackend: headless Chrome against Google Maps (the production path)
+- HTTPBackend: plain HTTP + BeautifulSoup, e.g. against stub_maps_server.py
+- FakeBackend: in-process, no sockets at all
+
+The default backend is chosen by the TRANSIT_BACKEND environment variable
+("chrome", "fake" or a base URL such as http://127.0.0.1:8765) and can be
+replaced with set_default_backend().
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Sequence
+from urllib.parse import quote
+
+GOOGLE_MAPS_URL = "https://www.google.com/maps"
+DURATION_SELECTOR = ".Fk3sm.fontHeadlineSmall"
+DEFAULT_WAIT_SECONDS = 5
+
+
+class FetchTimeout(Exception):
+    """The directions page didn't show a duration in time."""
+
+
+def directions_url(origin: str, destination: str, depart_time: Optional[int] = None,
+                   base_url: str = GOOGLE_MAPS_URL) -> str:
+    """
+    Transit directions URL for a pair.
+
+    Args:
+        origin (str): Starting location
+        destination (str): Ending location
+        depart_time (Optional[int]): Departure hour today, None for "leave now"
+        base_url (str): Maps root, e.g. GOOGLE_MAPS_URL or a stub server
+
+    Returns:
+        str: URL of the directions page
+    """
+    url = f"{base_url}/dir/{quote(origin)}/{quote(destination)}/data=!4m2!4m1!3e3"
+    if depart_time is not None:
+        # Convert departure time to Unix timestamp for today
+        today = datetime.now().replace(hour=depart_time, minute=0, second=0, microsecond=0)
+        timestamp = int(today.timestamp())
+        url = f"{base_url}/dir/{quote(origin)}/{quote(destination)}/data=!4m2!4m1!3e3!5m1!2b1!3b1!6e0!7e2!8j{timestamp}"
+    return url
+
+
+class TransitBackend:
+    """Interface: fetch() the duration text for a pair."""
+
+    name = "backend"
+
+    def fetch(self, origin: str, destination: str, depart_time: Optional[int] = None) -> Optional[str]:
+        """
+        Fetch the raw duration text, e.g. "1 hr 5 min".
+
+        Returns:
+            Optional[str]: The text of the duration element (None or unparsable if there's no route)
+
+        Raises:
+            FetchTimeout: The page didn't show a duration in time
+        """
+        raise NotImplementedError
+
+    def reserve(self, workers: int) -> None:
+        """Make room for `workers` concurrent fetches; only backends holding per-worker resources need it."""
+
+    def trim(self, keep: int) -> None:
+        """Release idle per-worker resources beyond `keep`, e.g. after the fetch concurrency dropped."""
+
+
+class ChromeBackend(TransitBackend):
+    """
+    Headless Chrome via the shared driver pool. Selenium and driver_pool are
+    only imported once a Chrome backend is used, so the other backends work on
+    hosts without Chrome.
+    """
+
+    name = "chrome"
+
+    def __init__(self, pool=None, base_url: str = GOOGLE_MAPS_URL, wait_seconds: float = DEFAULT_WAIT_SECONDS):
+        self.pool = pool
+        self.base_url = base_url
+        self.wait_seconds = wait_seconds
+
+    def fetch(self, origin: str, destination: str, depart_time: Optional[int] = None) -> Optional[str]:
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        from driver_pool import get_shared_pool
+
+        # Borrow a warm driver instead of launching Chrome for every pair
+        pool = self.pool or get_shared_pool()
+        with pool.borrow() as driver:
+            driver.get(directions_url(origin, destination, depart_time, self.base_url))
+            try:
+                # Wait for the transit time element to be present
+                wait = WebDriverWait(driver, self.wait_seconds)
+                transit_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, DURATION_SELECTOR)))
+            except TimeoutException as e:
+                raise FetchTimeout(str(e)) from e
+            return transit_element.text.strip() if transit_element else None
+
+    def reserve(self, workers: int) -> None:
+        """Grow the driver pool so every worker can hold a driver at the same time."""
+        if self.pool is not None:
+            self.pool.resize(workers)
+        else:
+            from driver_pool import get_shared_pool
+
+            get_shared_pool(workers)
+
+    def trim(self, keep: int) -> None:
+        """Quit idle drivers beyond `keep` so the memory is actually given back."""
+        if self.pool is not None:
+            self.pool.trim(keep)
+        else:
+            from driver_pool import trim_shared_pool
+
+            trim_shared_pool(keep)
+
+
+class HTTPBackend(TransitBackend):
+    """
+    Plain HTTP GET and BeautifulSoup. Google Maps renders directions with
+    JavaScript, so this is only useful against stub_maps_server.py or another
+    server that renders the duration element server-side.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str, timeout: float = DEFAULT_WAIT_SECONDS):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        if not self.base_url.endswith('/maps'):
+            self.base_url += '/maps'
+        self.timeout = timeout
+        self._local = threading.local()
+        self._requests = requests
+
+    def _session(self):
+        # requests.Session isn't thread-safe; keep one per worker thread for keep-alive
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        return session
+
+    def fetch(self, origin: str, destination: str, depart_time: Optional[int] = None) -> Optional[str]:
+        from bs4 import BeautifulSoup
+
+        url = directions_url(origin, destination, depart_time, self.base_url)
+        try:
+            response = self._session().get(url, timeout=self.timeout)
+        except self._requests.Timeout as e:
+            raise FetchTimeout(str(e)) from e
+        response.raise_for_status()
+        element = BeautifulSoup(response.text, 'html.parser').select_one(DURATION_SELECTOR)
+        if element is None:
+            # The real page never shows the element either; Chrome would wait it out
+            raise FetchTimeout(f"No duration element on {url}")
+        return element.get_text(strip=True)
+
+
+class FakeBackend(TransitBackend):
+    """
+    In-process backend with the same durations and failure modes as the stub
+    server, for benchmarks that should measure only the pipeline around fetches.
+
+    Args:
+        latency (float): Seconds each fetch sleeps
+        failure_rate (float): Share of fetches that raise FetchTimeout
+        languages (Sequence[str]): Languages to render durations in (see stub_maps_server)
+        seed (Optional[int]): Seed for failure draws
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0,
+                 languages: Sequence[str] = ('en', 'ja'), seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.languages = tuple(languages)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def fetch(self, origin: str, destination: str, depart_time: Optional[int] = None) -> Optional[str]:
+        from stub_maps_server import fake_transit_text
+
+        with self._lock:
+            self.fetches += 1
+            failed = self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise FetchTimeout(f"Fake timeout: {origin} → {destination}")
+        return fake_transit_text(origin, destination, depart_time, self.languages)
+
+
+def backend_from_spec(spec: Optional[str]) -> TransitBackend:
+    """Build a backend from "chrome", "fake" or a base URL; empty means chrome."""
+    if not spec or spec == 'chrome':
+        return ChromeBackend()
+    if spec == 'fake':
+        return FakeBackend()
+    if spec.startswith(('http://', 'https://')):
+        return HTTPBackend(spec)
+    raise ValueError(f"Unknown transit backend: {spec!r}")
+
+
+_default_backend: Optional[TransitBackend] = None
+_default_backend_lock = threading.Lock()
+
+
+def get_default_backend() -> TransitBackend:
+    """The process-wide backend, built from TRANSIT_BACKEND on first use."""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = backend_from_spec(os.environ.get('TRANSIT_BACKEND'))
+        return _default_backend
+
+
+def set_default_backend(backend: TransitBackend) -> None:
+    """Route every fetch without an explicit backend through `backend`."""
+    global _default_backend
+    with _default_backend_lock:
+        _default_backend = backend
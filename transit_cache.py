@@ -0,0 +1,770 @@
+import atexit
+import logging
+import queue
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from duration_parser import parse_duration
+from metrics import CACHE_WRITER_ROWS, DB_QUERY_SECONDS
+
+DB_PATH = 'transit_cache.db'
+
+Pair = Tuple[str, str]
+
+
+def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """Open a connection to the transit cache database."""
+    return sqlite3.connect(db_path or DB_PATH)
+
+
+# Bump SCHEMA_VERSION and append to MIGRATIONS whenever the transit_cache layout changes.
+# The version is stored in the database itself (PRAGMA user_version); 0 is the original
+# un-indexed table created by earlier releases.
+SCHEMA_VERSION = 4
+
+TRANSIT_CACHE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        uuid INTEGER PRIMARY KEY AUTOINCREMENT,
+        origin TEXT NOT NULL,
+        destination TEXT NOT NULL,
+        depart_time TEXT,
+        transit_time TEXT,
+        duration INTEGER
+    )
+''' # use TEXT to handle None values for other applactions
+
+# depart_time is NULL for "leave now" queries; SQLite treats NULLs as distinct in
+# UNIQUE constraints, so the key normalizes it to '' instead.
+PAIR_KEY = "origin, destination, IFNULL(depart_time, '')"
+
+UPSERT_SQL = f'''
+    INSERT INTO transit_cache (origin, destination, depart_time, transit_time, duration, fetched_at, ttl)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT({PAIR_KEY}) DO UPDATE SET
+        transit_time = excluded.transit_time,
+        duration = CASE WHEN excluded.transit_time IS transit_cache.transit_time
+                        THEN COALESCE(excluded.duration, transit_cache.duration)
+                        ELSE excluded.duration END,
+        fetched_at = excluded.fetched_at,
+        ttl = excluded.ttl
+'''
+
+DAY = 24 * 60 * 60
+
+
+def freshness_ttl(depart_time: Optional[int], duration: Optional[int]) -> int:
+    """
+    Default freshness policy: how many seconds a fetched transit time stays fresh.
+
+    Times for a fixed departure hour only change with timetable revisions. "Leave
+    now" times depend on when they were scraped, so they are refreshed sooner.
+    Pairs more than two hours apart never decide a commute query, so they can wait
+    longest.
+
+    Args:
+        depart_time (Optional[int]): Departure hour, None for "leave now"
+        duration (Optional[int]): Parsed duration in minutes, if known
+
+    Returns:
+        int: Time to live in seconds
+    """
+    if duration is not None and duration > 120:
+        return 90 * DAY
+    if depart_time is None:
+        return 14 * DAY
+    return 30 * DAY
+
+
+def _transit_row(origin: str, destination: str, depart_time: Optional[int], transit_time: str,
+                 duration: Optional[int], freshness_policy=freshness_ttl) -> tuple:
+    # Parse once on the way in so readers can filter on duration without rewriting rows
+    if duration is None:
+        duration = parse_duration(transit_time)
+    depart_time_str = str(depart_time) if depart_time is not None else None
+    return (origin, destination, depart_time_str, transit_time, duration,
+            time.time(), freshness_policy(depart_time, duration))
+
+
+# Failed fetches are retried after FAILURE_BACKOFF_BASE seconds, doubling with every
+# further failure up to FAILURE_BACKOFF_MAX. Reasons in PERMANENT_FAILURES (the pair
+# can't be fetched until the station data changes) go straight to the maximum.
+FAILURE_BACKOFF_BASE = 60 * 60
+FAILURE_BACKOFF_MAX = 7 * 24 * 60 * 60
+PERMANENT_FAILURES = {'station_not_found'}
+
+RECORD_FAILURE_SQL = f'''
+    INSERT INTO transit_failures (origin, destination, depart_time, reason, attempts, failed_at, retry_after)
+    VALUES (?, ?, ?, ?, 1, ?, ? + ?)
+    ON CONFLICT({PAIR_KEY}) DO UPDATE SET
+        reason = excluded.reason,
+        attempts = transit_failures.attempts + 1,
+        failed_at = excluded.failed_at,
+        retry_after = excluded.failed_at + MIN({FAILURE_BACKOFF_MAX},
+            CASE WHEN excluded.reason IN ({','.join(repr(r) for r in sorted(PERMANENT_FAILURES))})
+                 THEN {FAILURE_BACKOFF_MAX}
+                 ELSE {FAILURE_BACKOFF_BASE} * (1 << MIN(transit_failures.attempts, 20))
+            END)
+'''
+
+CLEAR_FAILURE_SQL = '''
+    DELETE FROM transit_failures
+    WHERE origin = ? AND destination = ? AND IFNULL(depart_time, '') = IFNULL(?, '')
+'''
+
+
+def _migrate_v1(cursor: sqlite3.Cursor) -> None:
+    """Deduplicate rows per (origin, destination, depart_time) and add the key and reachability indexes."""
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transit_cache'"
+    ).fetchone()
+    if exists:
+        cursor.execute(TRANSIT_CACHE_TABLE.format(name='transit_cache_v1'))
+        # Keep the newest row that actually has a transit time for every key
+        cursor.execute('''
+            INSERT INTO transit_cache_v1 (uuid, origin, destination, depart_time, transit_time, duration)
+            SELECT uuid, origin, destination, depart_time, transit_time, duration
+            FROM (
+                SELECT uuid, origin, destination,
+                       CAST(depart_time AS TEXT) AS depart_time,
+                       transit_time, duration,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY origin, destination, IFNULL(CAST(depart_time AS TEXT), '')
+                           ORDER BY transit_time IS NULL, uuid DESC
+                       ) AS rn
+                FROM transit_cache
+                WHERE origin IS NOT NULL AND destination IS NOT NULL
+            )
+            WHERE rn = 1
+        ''')
+        cursor.execute('DROP TABLE transit_cache')
+        cursor.execute('ALTER TABLE transit_cache_v1 RENAME TO transit_cache')
+    else:
+        cursor.execute(TRANSIT_CACHE_TABLE.format(name='transit_cache'))
+
+    cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_transit_cache_pair ON transit_cache ({PAIR_KEY})')
+    # Covering index for the "origin = ? AND duration <= ?" reachability queries
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transit_cache_reach
+        ON transit_cache (origin, duration, destination)
+    ''')
+
+
+def _migrate_v2(cursor: sqlite3.Cursor) -> None:
+    """Add the negative cache of failed fetches."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transit_failures (
+            origin TEXT NOT NULL,
+            destination TEXT NOT NULL,
+            depart_time TEXT,
+            reason TEXT,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            failed_at REAL,
+            retry_after REAL
+        )
+    ''')
+    cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_transit_failures_pair ON transit_failures ({PAIR_KEY})')
+
+
+def _migrate_v3(cursor: sqlite3.Cursor) -> None:
+    """Track when each entry was fetched and how long it stays fresh. Existing rows count as stale."""
+    cursor.execute('ALTER TABLE transit_cache ADD COLUMN fetched_at REAL')
+    cursor.execute('ALTER TABLE transit_cache ADD COLUMN ttl INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transit_cache_fetched_at ON transit_cache (fetched_at)')
+
+
+def _migrate_v4(cursor: sqlite3.Cursor) -> None:
+    """Index lookups by destination, for the "destination = ?" side of pruning's triangle join."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_transit_cache_destination ON transit_cache (destination, origin)')
+
+
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4]
+
+
+def create_cache_db(db_path: Optional[str] = None) -> int:
+    """
+    Create the transit cache or upgrade an existing one in place.
+
+    Pending migrations run in a single IMMEDIATE transaction, so concurrent
+    processes starting at the same time won't migrate the file twice. The
+    database is switched to WAL mode so reads never wait on the cache writer.
+
+    Args:
+        db_path (Optional[str]): Cache database path, defaults to DB_PATH
+
+    Returns:
+        int: Schema version after migrating
+    """
+    conn = connect(db_path)
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        # WAL is persistent per file; it lets readers run while the cache writer commits
+        cursor.execute('PRAGMA journal_mode=WAL')
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return version
+
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            # Re-read inside the lock in case another process migrated meanwhile
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            for migrate in MIGRATIONS[version:]:
+                migrate(cursor)
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        return SCHEMA_VERSION
+    finally:
+        conn.close()
+
+
+def upsert_transit_time(cursor: sqlite3.Cursor, origin: str, destination: str, depart_time: Optional[int],
+                        transit_time: str, duration: Optional[int] = None) -> None:
+    """Insert a fetched transit time, replacing any existing entry for the same key."""
+    cursor.execute(UPSERT_SQL, _transit_row(origin, destination, depart_time, transit_time, duration))
+
+
+@DB_QUERY_SECONDS.timed(query='backfill_durations')
+def backfill_durations(reparse_all: bool = False, db_path: Optional[str] = None) -> int:
+    """
+    Fill in duration for rows cached before it was parsed at insert time.
+
+    Args:
+        reparse_all (bool): Recompute every row, e.g. after a parser fix
+        db_path (Optional[str]): Cache database path, defaults to DB_PATH
+
+    Returns:
+        int: Number of rows updated
+    """
+    conn = connect(db_path)
+    try:
+        query = 'SELECT uuid, transit_time FROM transit_cache WHERE transit_time IS NOT NULL'
+        if not reparse_all:
+            query += ' AND duration IS NULL'
+        updates = [(parse_duration(transit_time), uuid) for uuid, transit_time in conn.execute(query).fetchall()]
+        with conn:
+            conn.executemany('UPDATE transit_cache SET duration = ? WHERE uuid = ?', updates)
+        return len(updates)
+    finally:
+        conn.close()
+
+
+@DB_QUERY_SECONDS.timed(query='check_transit_cache')
+def check_transit_cache(origin: str, destination: str, depart_time: Optional[int],
+                        db_path: Optional[str] = None) -> Optional[str]:
+    """
+    Check if transit time exists in cache.
+
+    Args:
+        origin (str): Starting location
+        destination (str): Ending location
+        depart_time (Optional[int]): Departure time
+        db_path (Optional[str]): Cache database path, defaults to DB_PATH
+
+    Returns:
+        Optional[str]: Cached transit time if found, None otherwise
+    """
+    conn = connect(db_path)
+    cursor = conn.cursor()
+    try:
+        # Convert depart_time to string to match DB schema
+        depart_time_str = str(depart_time) if depart_time is not None else None
+
+        cursor.execute('''
+            SELECT transit_time FROM transit_cache
+            WHERE origin = ?
+            AND destination = ?
+            AND IFNULL(depart_time, '') = IFNULL(?, '')
+            AND transit_time IS NOT NULL
+        ''', (origin, destination, depart_time_str))
+
+        result = cursor.fetchone()
+        return result[0] if result else None
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _with_lookup_pairs(conn: sqlite3.Connection, pairs: List[Pair]) -> Iterator[sqlite3.Cursor]:
+    """
+    Load `pairs` into the temp table lookup_pairs (origin, destination) for a set-based join.
+
+    Yields a cursor on `conn`; the table is dropped afterwards, also on errors, so
+    the connection can load another batch.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TEMP TABLE lookup_pairs (
+            origin TEXT,
+            destination TEXT,
+            PRIMARY KEY (origin, destination)
+        )
+    ''')
+    try:
+        cursor.executemany('INSERT OR IGNORE INTO lookup_pairs VALUES (?, ?)', pairs)
+        yield cursor
+    finally:
+        cursor.execute('DROP TABLE temp.lookup_pairs')
+
+
+@DB_QUERY_SECONDS.timed(query='bulk_check_transit_cache')
+def bulk_check_transit_cache(pairs: Iterable[Pair], depart_time: Optional[int],
+                             db_path: Optional[str] = None) -> Tuple[Dict[Pair, str], List[Pair]]:
+    """
+    Resolve a whole list of (origin, destination) pairs against the cache at once.
+
+    The pairs are loaded into a temp table and joined against transit_cache, so
+    the lookup costs one connection and one set-based query instead of an
+    open/scan/close cycle per pair.
+
+    Args:
+        pairs (Iterable[Tuple[str, str]]): (origin, destination) pairs to look up
+        depart_time (Optional[int]): Departure time shared by all pairs
+        db_path (Optional[str]): Cache database path, defaults to DB_PATH
+
+    Returns:
+        Tuple[Dict[Tuple[str, str], str], List[Tuple[str, str]]]:
+            Cached transit times keyed by pair, and the pairs that missed (in input order)
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return {}, []
+
+    depart_time_str = str(depart_time) if depart_time is not None else None
+
+    conn = connect(db_path)
+    try:
+        with _with_lookup_pairs(conn, pairs) as cursor:
+            cursor.execute('''
+                SELECT p.origin, p.destination, c.transit_time
+                FROM lookup_pairs p
+                JOIN transit_cache c
+                  ON c.origin = p.origin
+                 AND c.destination = p.destination
+                 AND IFNULL(c.depart_time, '') = IFNULL(?, '')
+                WHERE c.transit_time IS NOT NULL
+            ''', (depart_time_str,))
+            hits = {(origin, destination): transit_time for origin, destination, transit_time in cursor.fetchall()}
+    finally:
+        conn.close()
+
+    misses = [pair for pair in pairs if pair not in hits]
+    return hits, misses
+
+
+# Departure times are cached in hourly buckets (depart_time '0'..'23', NULL for "leave now").
+# When a bucket is cold, lookups can fall back to the nearest warm one: hours are compared
+# on a 24h clock, and "leave now" counts as farther away than any hour.
+NOW_BUCKET_DISTANCE = 13
+
+
+def bucket_distance(a: Optional[int], b: Optional[int]) -> int:
+    """
+    How far apart two departure buckets are, in hours around the clock.
+
+    >>> bucket_distance(23, 1)
+    2
+    >>> bucket_distance(8, None)
+    13
+
+    Args:
+        a (Optional[int]): Departure hour, None for "leave now"
+        b (Optional[int]): Departure hour, None for "leave now"
+
+    Returns:
+        int: 0 for the same bucket, up to 12 between hours, NOW_BUCKET_DISTANCE against "leave now"
+    """
+    if a is None or b is None:
+        return 0 if a is None and b is None else NOW_BUCKET_DISTANCE
+    diff = abs(int(a) - int(b)) % 24
+    return min(diff, 24 - diff)
+
+
+def _bucket_distance_sql(column: str) -> str:
+    # SQL twin of bucket_distance() against the :hour parameter
+    return f'''
+        CASE WHEN {column} IS NULL AND :hour IS NULL THEN 0
+             WHEN {column} IS NULL OR :hour IS NULL THEN {NOW_BUCKET_DISTANCE}
+             ELSE MIN(ABS(CAST({column} AS INTEGER) - :hour), 24 - ABS(CAST({column} AS INTEGER) - :hour))
+        END'''
+
+
+def _bucket_params(depart_time: Optional[int], max_fallback_hours: Optional[int]) -> dict:
+    return {
+        'hour': int(depart_time) if depart_time is not None else None,
+        'max_distance': NOW_BUCKET_DISTANCE if max_fallback_hours is None else max_fallback_hours,
+    }
+
+
+@DB_QUERY_SECONDS.timed(query='bulk_check_nearest_bucket')
+def bulk_check_nearest_bucket(pairs: Iterable[Pair], depart_time: Optional[int],
+                              max_fallback_hours: Optional[int] = None,
+                              db_path: Optional[str] = None) -> Dict[Pair, Tuple[str, Optional[int]]]:
+    """
+    Like bulk_check_transit_cache, but fall back to the nearest cached departure bucket.
+
+    The exact bucket always wins; among fallbacks the closest hour wins, then the
+    most recently fetched entry.
+
+    Args:
+        pairs (Iterable[Tuple[str, str]]): (origin, destination) pairs to look up
+        depart_time (Optional[int]): Requested departure hour, None for "leave now"
+        max_fallback_hours (Optional[int]): Farthest bucket to fall back to (see
+            bucket_distance), 0 for the exact bucket only, None for any bucket
+        db_path (Optional[str]): Cache database path, defaults to DB_PATH
+
+    Returns:
+        Dict[Tuple[str, str], Tuple[str, Optional[int]]]: (transit time, bucket it came from) keyed by pair
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+
+    conn = connect(db_path)
+    try:
+        with _with_lookup_pairs(conn, pairs) as cursor:
+            cursor.execute(f'''
+                SELECT origin, destination, transit_time, depart_time
+                FROM (
+                    SELECT p.origin, p.destination, c.transit_time, c.depart_time,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY p.origin, p.destination
+                               ORDER BY {_bucket_distance_sql('c.depart_time')}, c.fetched_at DESC
+                           ) AS rn
+                    FROM lookup_pairs p
+                    JOIN transit_cache c
+                      ON c.origin = p.origin
+                     AND c.destination = p.destination
+                    WHERE c.transit_time IS NOT NULL
+                      AND {_bucket_distance_sql('c.depart_time')} <= :max_distance
+                )
+                WHERE rn = 1
+            ''', _bucket_params(depart_time, max_fallback_hours))
+            return {(origin, destination): (transit_time, int(bucket) if bucket is not None else None)
+                    for origin, destination, transit_time, bucket in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+@DB_QUERY_SECONDS.timed(query='nearest_durations')
+def nearest_durations(origin: str, depart_time: Optional[int], max_fallback_hours: Optional[int] = 0,
+                      db_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Parsed duration from `origin` to every cached destination, one bucket per destination.
+
+    Args:
+        origin (str): Formatted origin station
+        depart_time (Optional[int]): Requested departure hour, None for "leave now"
+        max_fallback_hours (Optional[int]): Farthest bucket to fall back to, 0 for the
+            exact bucket only, None for any bucket
+        db_path (Optional[str]): Cache database path, defaults to DB_PATH
+
+    Returns:
+        Dict[str, int]: Minutes keyed by destination
+    """
+    params = _bucket_params(depart_time, max_fallback_hours)
+    params['origin'] = origin
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(f'''
+            SELECT destination, duration
+            FROM (
+                SELECT destination, duration,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY destination
+                           ORDER BY {_bucket_distance_sql('depart_time')}, fetched_at DESC
+                       ) AS rn
+                FROM transit_cache
+                WHERE origin = :origin
+                  AND duration IS NOT NULL
+                  AND {_bucket_distance_sql('depart_time')} <= :max_distance
+            )
+            WHERE rn = 1
+        ''', params).fetchall()
+    finally:
+        conn.close()
+    return dict(rows)
+
+
+@DB_QUERY_SECONDS.timed(query='check_transit_failure')
+def check_transit_failure(origin: str, destination: str, depart_time: Optional[int],
+                          db_path: Optional[str] = None) -> Optional[str]:
+    """
+    Check whether a pair recently failed and is still backing off.
+
+    Returns:
+        Optional[str]: The failure reason if the pair shouldn't be retried yet, None otherwise
+    """
+    depart_time_str = str(depart_time) if depart_time is not None else None
+    conn = connect(db_path)
+    try:
+        result = conn.execute('''
+            SELECT reason FROM transit_failures
+            WHERE origin = ?
+            AND destination = ?
+            AND IFNULL(depart_time, '') = IFNULL(?, '')
+            AND retry_after > ?
+        ''', (origin, destination, depart_time_str, time.time())).fetchone()
+        return result[0] if result else None
+    finally:
+        conn.close()
+
+
+@DB_QUERY_SECONDS.timed(query='bulk_check_transit_failures')
+def bulk_check_transit_failures(pairs: Iterable[Pair], depart_time: Optional[int],
+                                db_path: Optional[str] = None) -> Dict[Pair, str]:
+    """
+    Find the pairs that are still backing off after a failed fetch.
+
+    Args:
+        pairs (Iterable[Tuple[str, str]]): (origin, destination) pairs to check
+        depart_time (Optional[int]): Departure time shared by all pairs
+        db_path (Optional[str]): Cache database path, defaults to DB_PATH
+
+    Returns:
+        Dict[Tuple[str, str], str]: Failure reason keyed by pair, for known-bad pairs only
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return {}
+
+    depart_time_str = str(depart_time) if depart_time is not None else None
+
+    conn = connect(db_path)
+    try:
+        with _with_lookup_pairs(conn, pairs) as cursor:
+            cursor.execute('''
+                SELECT p.origin, p.destination, f.reason
+                FROM lookup_pairs p
+                JOIN transit_failures f
+                  ON f.origin = p.origin
+                 AND f.destination = p.destination
+                 AND IFNULL(f.depart_time, '') = IFNULL(?, '')
+                WHERE f.retry_after > ?
+            ''', (depart_time_str, time.time()))
+            return {(origin, destination): reason for origin, destination, reason in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+@DB_QUERY_SECONDS.timed(query='select_stale_entries')
+def select_stale_entries(limit: int = 10, db_path: Optional[str] = None) -> List[Tuple[str, str, Optional[int]]]:
+    """
+    Oldest cache entries past their freshness TTL, skipping pairs that are backing off after a failure.
+
+    Rows without fetched_at (cached before freshness tracking) come first.
+
+    Args:
+        limit (int): Maximum number of entries to return
+        db_path (Optional[str]): Cache database path, defaults to DB_PATH
+
+    Returns:
+        List[Tuple[str, str, Optional[int]]]: (origin, destination, depart_time) to refetch
+    """
+    now = time.time()
+    conn = connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT c.origin, c.destination, c.depart_time
+            FROM transit_cache c
+            WHERE (c.fetched_at IS NULL OR c.fetched_at + c.ttl < ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM transit_failures f
+                  WHERE f.origin = c.origin
+                    AND f.destination = c.destination
+                    AND IFNULL(f.depart_time, '') = IFNULL(c.depart_time, '')
+                    AND f.retry_after > ?
+              )
+            ORDER BY c.fetched_at IS NOT NULL, c.fetched_at
+            LIMIT ?
+        ''', (now, now, limit)).fetchall()
+    finally:
+        conn.close()
+    return [(origin, destination, int(depart_time) if depart_time is not None else None)
+            for origin, destination, depart_time in rows]
+
+
+class CacheWriter:
+    """
+    Single background thread that owns all transit_cache writes.
+
+    Fetch workers put() results (or put_failure() errors) on a queue instead of
+    opening their own connections; the writer upserts them in one transaction per
+    batch, committing when `batch_size` rows are pending or `flush_interval`
+    seconds have passed. A successful fetch clears the pair's failure record.
+    Every row is stamped with fetched_at and a ttl from `freshness_policy`.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_path: Optional[str] = None, batch_size: int = 100, flush_interval: float = 1.0,
+                 freshness_policy=freshness_ttl):
+        self.db_path = db_path
+        self.freshness_policy = freshness_policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="transit-cache-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, origin: str, destination: str, depart_time: Optional[int],
+            transit_time: str, duration: Optional[int] = None) -> None:
+        """Queue a fetched transit time for writing."""
+        if not self._thread.is_alive():
+            raise RuntimeError("CacheWriter is closed")
+        row = _transit_row(origin, destination, depart_time, transit_time, duration, self.freshness_policy)
+        self._queue.put(('transit', row))
+
+    def put_failure(self, origin: str, destination: str, depart_time: Optional[int], reason: str) -> None:
+        """Queue a failed fetch so the pair backs off before being retried."""
+        if not self._thread.is_alive():
+            raise RuntimeError("CacheWriter is closed")
+        depart_time_str = str(depart_time) if depart_time is not None else None
+        now = time.time()
+        ttl = FAILURE_BACKOFF_MAX if reason in PERMANENT_FAILURES else FAILURE_BACKOFF_BASE
+        self._queue.put(('failure', (origin, destination, depart_time_str, reason, now, now, ttl)))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until everything queued so far is committed.
+
+        Returns:
+            bool: False if the writer didn't catch up within `timeout`
+        """
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Commit everything still queued and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def _commit(self, conn: sqlite3.Connection, rows: list) -> None:
+        if not rows:
+            return
+        transit_rows = [row for kind, row in rows if kind == 'transit']
+        failure_rows = [row for kind, row in rows if kind == 'failure']
+        try:
+            with DB_QUERY_SECONDS.time(query='cache_writer_commit'), conn:
+                conn.executemany(UPSERT_SQL, transit_rows)
+                conn.executemany(CLEAR_FAILURE_SQL, [row[:3] for row in transit_rows])
+                conn.executemany(RECORD_FAILURE_SQL, failure_rows)
+            CACHE_WRITER_ROWS.inc(len(transit_rows), kind='transit')
+            CACHE_WRITER_ROWS.inc(len(failure_rows), kind='failure')
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write {len(rows)} transit cache rows: {str(e)}")
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self.db_path or DB_PATH, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL, avoids an fsync per commit
+        rows = []
+        waiters = []
+        deadline = None
+        stopping = False
+        try:
+            while not stopping:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is self._STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not None:
+                    rows.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                due = deadline is not None and time.monotonic() >= deadline
+                if stopping or waiters or due or len(rows) >= self.batch_size:
+                    self._commit(conn, rows)
+                    rows = []
+                    deadline = None
+                    for waiter in waiters:
+                        waiter.set()
+                    waiters = []
+        finally:
+            # Drain anything that raced in behind the stop sentinel
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not None and item is not self._STOP:
+                    rows.append(item)
+            self._commit(conn, rows)
+            for waiter in waiters:
+                waiter.set()
+            conn.close()
+
+
+_cache_writer: Optional[CacheWriter] = None
+_cache_writer_lock = threading.Lock()
+
+
+def get_cache_writer() -> CacheWriter:
+    """Get the process-wide cache writer, starting it on first use."""
+    global _cache_writer
+    with _cache_writer_lock:
+        if _cache_writer is None:
+            _cache_writer = CacheWriter()
+            _install_sigterm_handler()
+        return _cache_writer
+
+
+def close_cache_writer() -> None:
+    """Flush and stop the shared cache writer. Registered with atexit so results survive Ctrl-C."""
+    global _cache_writer
+    with _cache_writer_lock:
+        if _cache_writer is not None:
+            _cache_writer.close()
+            _cache_writer = None
+
+
+def _install_sigterm_handler() -> None:
+    # SIGTERM skips atexit by default; turn it into a normal exit so the writer gets flushed.
+    # Only possible from the main thread and only if nobody else has claimed the signal.
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+
+atexit.register(close_cache_writer)
+# The writer is usually started from a fetch worker thread, where signals can't be
+# claimed, so claim SIGTERM now: modules are normally imported on the main thread
+_install_sigterm_handler()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Transit cache maintenance")
+    parser.add_argument("command", choices=["migrate", "backfill-durations"],
+                        help="migrate: upgrade the cache schema in place; "
+                             "backfill-durations: parse transit_time into duration for old rows")
+    parser.add_argument("--db", default=DB_PATH, help="Cache database path")
+    parser.add_argument("--all", action="store_true", help="backfill-durations: reparse every row")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        print(f"{args.db}: schema version {create_cache_db(args.db)}")
+    elif args.command == "backfill-durations":
+        create_cache_db(args.db)
+        print(f"{args.db}: updated duration for {backfill_durations(args.all, args.db)} rows")
@@ -0,0 +1,216 @@
+"""
+Dense station x station travel-time matrix compiled from transit_cache.
+
+The matrix is a uint16 .npy of minutes (UNKNOWN for pairs never fetched) with a
+JSON index mapping station names to rows/columns. It's opened with mmap_mode='r',
+so every Streamlit worker shares the same pages from the OS page cache instead
+of copying it, and reachability becomes a vectorized comparison on two rows.
+
+Every export writes a new, uniquely named .npy and then swaps in the index that
+names it with a single rename, so a reader always gets a matrix together with
+the station list it was built from.
+
+Usage:
+    python travel_matrix.py export
+    python travel_matrix.py export --depart-time 8
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import transit_cache as tc
+
+MATRIX_DIR = '.'
+UNKNOWN = np.iinfo(np.uint16).max
+
+
+def _suffix(depart_time: Optional[int]) -> str:
+    return 'now' if depart_time is None else f'{int(depart_time):02d}'
+
+
+def index_path(depart_time: Optional[int] = None, directory: str = MATRIX_DIR) -> str:
+    """Path of the JSON index for a departure time; it names the current matrix file."""
+    return os.path.join(directory, f'travel_matrix_{_suffix(depart_time)}.json')
+
+
+def export_matrix(depart_time: Optional[int] = None, directory: str = MATRIX_DIR,
+                  db_path: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Compile the cached durations for one departure time into a matrix on disk.
+
+    The matrix goes to a new file named after the export; replacing the index
+    that points at it is the only step readers can observe, so they never pair
+    a matrix with another export's station list. Matrices of earlier exports
+    are removed afterwards (readers that already mapped one keep their pages).
+
+    Args:
+        depart_time (Optional[int]): Departure time to export, None for "leave now"
+        directory (str): Output directory
+        db_path (Optional[str]): Cache database path
+
+    Returns:
+        Tuple[int, int]: (number of stations, number of known pairs)
+    """
+    depart_time_str = str(depart_time) if depart_time is not None else None
+    conn = tc.connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT origin, destination, duration FROM transit_cache
+            WHERE IFNULL(depart_time, '') = IFNULL(?, '') AND duration IS NOT NULL
+        ''', (depart_time_str,)).fetchall()
+        max_uuid = conn.execute('SELECT MAX(uuid) FROM transit_cache').fetchone()[0] or 0
+    finally:
+        conn.close()
+
+    stations = sorted({origin for origin, _, _ in rows} | {destination for _, destination, _ in rows})
+    index = {station: i for i, station in enumerate(stations)}
+    suffix = _suffix(depart_time)
+    export_id = f'{time.time_ns()}-{os.getpid()}'
+    matrix_name = f'travel_matrix_{suffix}.{export_id}.npy'
+    matrix_path = os.path.join(directory, matrix_name)
+
+    tmp_matrix_path = f'{matrix_path}.tmp.npy'
+    matrix = np.lib.format.open_memmap(tmp_matrix_path, mode='w+', dtype=np.uint16,
+                                       shape=(len(stations), len(stations)))
+    matrix[:] = UNKNOWN
+    if rows:
+        origins = np.fromiter((index[origin] for origin, _, _ in rows), dtype=np.int64, count=len(rows))
+        destinations = np.fromiter((index[destination] for _, destination, _ in rows), dtype=np.int64, count=len(rows))
+        durations = np.fromiter((duration for _, _, duration in rows), dtype=np.int64, count=len(rows))
+        matrix[origins, destinations] = np.clip(durations, 0, UNKNOWN - 1)
+    matrix.flush()
+    del matrix
+    os.replace(tmp_matrix_path, matrix_path)
+
+    path = index_path(depart_time, directory)
+    tmp_index_path = f'{path}.tmp'
+    with open(tmp_index_path, 'w', encoding='utf-8') as f:
+        json.dump({'depart_time': depart_time, 'export_id': export_id, 'matrix': matrix_name,
+                   'max_uuid': max_uuid, 'stations': stations}, f, ensure_ascii=False)
+    os.replace(tmp_index_path, path)
+
+    # Earlier exports, including the unversioned travel_matrix_<suffix>.npy of older releases
+    for old_path in glob.glob(os.path.join(glob.escape(directory), f'travel_matrix_{suffix}.*npy')):
+        if os.path.basename(old_path) != matrix_name and not old_path.endswith('.tmp.npy'):
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    return len(stations), len(rows)
+
+
+class TravelMatrix:
+    """Read-only view of an exported travel-time matrix."""
+
+    def __init__(self, matrix: np.ndarray, stations: List[str], max_uuid: int = 0):
+        self.matrix = matrix
+        self.stations = np.array(stations, dtype=object)
+        self.index: Dict[str, int] = {station: i for i, station in enumerate(stations)}
+        self.max_uuid = max_uuid
+
+    @classmethod
+    def load(cls, depart_time: Optional[int] = None, directory: str = MATRIX_DIR,
+             attempts: int = 3) -> "TravelMatrix":
+        """
+        Memory-map an exported matrix; nothing is read until rows are touched.
+
+        Retries if a newer export removes the matrix between reading the index and
+        opening it.
+        """
+        path = index_path(depart_time, directory)
+        for attempt in range(attempts):
+            with open(path, encoding='utf-8') as f:
+                meta = json.load(f)
+            # Indexes written before exports were versioned name no matrix file
+            matrix_name = meta.get('matrix', f'travel_matrix_{_suffix(depart_time)}.npy')
+            try:
+                matrix = np.load(os.path.join(directory, matrix_name), mmap_mode='r')
+            except FileNotFoundError:
+                if attempt + 1 == attempts:
+                    raise
+                continue
+            if matrix.shape != (len(meta['stations']), len(meta['stations'])):
+                raise ValueError(f"{matrix_name} has shape {matrix.shape} but {path} lists "
+                                 f"{len(meta['stations'])} stations; re-run the export")
+            return cls(matrix, meta['stations'], meta.get('max_uuid', 0))
+
+    def covers(self, station: str) -> bool:
+        return station in self.index
+
+    def is_current(self, db_path: Optional[str] = None) -> bool:
+        """
+        True if no pair has been added to the cache since the export.
+
+        Refreshed rows keep their uuid, so refreshed durations can lag until the
+        next export; that matches the cache's own serve-stale policy.
+        """
+        conn = tc.connect(db_path)
+        try:
+            max_uuid = conn.execute('SELECT MAX(uuid) FROM transit_cache').fetchone()[0] or 0
+        finally:
+            conn.close()
+        return max_uuid <= self.max_uuid
+
+    def within_mask(self, origin: str, max_minutes: float) -> np.ndarray:
+        """Boolean mask over stations reachable from `origin` within `max_minutes`."""
+        return self.matrix[self.index[origin]] <= max_minutes
+
+    def within(self, origin: str, max_minutes: float) -> List[str]:
+        """Stations reachable from `origin` within `max_minutes`."""
+        return self.stations[self.within_mask(origin, max_minutes)].tolist()
+
+    def durations_within(self, origin: str, max_minutes: float) -> Dict[str, int]:
+        """Minutes from `origin` to every station reachable within `max_minutes`."""
+        row = self.matrix[self.index[origin]]
+        mask = row <= max_minutes
+        return dict(zip(self.stations[mask].tolist(), row[mask].tolist()))
+
+    def reachable_from_both(self, origin_a: str, minutes_a: float, origin_b: str, minutes_b: float) -> List[str]:
+        """Stations within `minutes_a` of `origin_a` and within `minutes_b` of `origin_b`."""
+        mask = self.within_mask(origin_a, minutes_a) & self.within_mask(origin_b, minutes_b)
+        return self.stations[mask].tolist()
+
+
+_loaded: Dict[Tuple[Optional[int], str], Tuple[tuple, TravelMatrix]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_matrix(depart_time: Optional[int] = None, directory: str = MATRIX_DIR) -> Optional[TravelMatrix]:
+    """
+    The exported matrix for `depart_time`, memory-mapped once per process and
+    reopened when a new export replaces the index. None if nothing was exported.
+    """
+    try:
+        stat = os.stat(index_path(depart_time, directory))
+    except OSError:
+        return None
+    # Every export renames a new index into place, so the inode changes even within one mtime tick
+    signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    key = (depart_time, directory)
+    with _loaded_lock:
+        cached = _loaded.get(key)
+        if cached is None or cached[0] != signature:
+            cached = (signature, TravelMatrix.load(depart_time, directory))
+            _loaded[key] = cached
+        return cached[1]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export"], help="export: compile transit_cache into a matrix")
+    parser.add_argument("--depart-time", type=int, default=None, help="Departure hour, omit for 'leave now'")
+    parser.add_argument("--dir", default=MATRIX_DIR, help="Output directory")
+    parser.add_argument("--db", default=tc.DB_PATH, help="Cache database path")
+    args = parser.parse_args()
+
+    tc.create_cache_db(args.db)
+    n_stations, n_pairs = export_matrix(args.depart_time, args.dir, args.db)
+    print(f"Exported {n_pairs} pairs over {n_stations} stations, indexed by {index_path(args.depart_time, args.dir)}")
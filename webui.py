@@ -22,10 +22,17 @@ import get_transit_time as gt #   """Helper function to get transit time between
 from direction_API_demo import format_station_name as pretty_name #   """Helper function to format station names as <xxx station, prefecture> to pass to get_transit_time"""
 from direction_API_demo import get_station_options as all_stations #   """Helper function to get unique stations names, unformated """
 import overlay_plotter as op #   """Helper function to get coordinates for a station to drawing overlay on map"""
+import pruning #   """Skip pairs whose lower-bound transit time already exceeds the commute limit"""
+import travel_matrix as tm #   """Memory-mapped travel-time matrix for vectorized reachability"""
+import transit_cache as tc #   """Departure-bucket aware reads of the transit cache"""
+import metrics #   """Counters, histograms and stage timers exported for Prometheus"""
+import station_resolver #   """In-memory station -> prefecture mapping for bulk name formatting"""
+import rent_facets #   """Rent stats per station, optionally filtered by room type / size / age / walk"""
+from duration_parser import parse_duration #   """Convert scraped transit times like '1 hr 5 min' to minutes"""
 import sqlite3
-import re
 import folium
 import html
+import time
 
 def get_prefectures():
     conn = sqlite3.connect('Dataset/tokyo_rent.db')
@@ -35,13 +42,121 @@ def get_prefectures():
     conn.close()
     return prefectures
 
-def process_commute_circles(
+@metrics.MAP_RENDER_SECONDS.timed(kind='progress')
+def render_progress_map(center_coords, company_reached, hangout_reached):
+    """
+    Lightweight map of the stations found reachable so far, drawn while the sweep is still running.
+
+    Only cached coordinates are used so redrawing never waits on the geocoder.
+    """
+    m = folium.Map(location=[center_coords['latitude'], center_coords['longitude']], zoom_start=12)
+    for station in company_reached | hangout_reached:
+        coords = op.CirclePlotter.cached_coordinates(station)
+        if not coords:
+            continue
+        if station in company_reached and station in hangout_reached:
+            color = '#FFA500'
+        elif station in company_reached:
+            color = 'blue'
+        else:
+            color = 'pink'
+        folium.CircleMarker(
+            location=[coords['latitude'], coords['longitude']],
+            radius=5,
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.7,
+            tooltip=html.escape(station)
+        ).add_to(m)
+    return f"<iframe srcdoc='{html.escape(m._repr_html_())}' style='width:100%;height:600px;border:none'></iframe>"
+
+# Departure hour choices for the UIs; the first one means "leave now" (depart_time None)
+LEAVE_NOW = "Leave now"
+DEPART_HOUR_CHOICES = [LEAVE_NOW] + [f"{hour:02d}:00" for hour in range(24)]
+
+def parse_depart_hour(value):
+    """Turn a UI departure choice ('Leave now', '08:00', 8 or None) into a depart_time bucket."""
+    if value is None or value == "" or value == LEAVE_NOW:
+        return None
+    if isinstance(value, str):
+        value = value.split(":")[0]
+    return int(value) % 24
+
+# Rent filter choices for the UIs; ANY means no filter on that facet
+ANY = "Any"
+MIN_SIZE_CHOICES = {ANY: None, **{f"{size} m² or larger": size for size in rent_facets.RANGE_FACETS['size'][1]}}
+BUILT_AFTER_CHOICES = {ANY: None, **{f"Built {year} or later": year for year in rent_facets.RANGE_FACETS['year'][1]}}
+MAX_WALK_CHOICES = {ANY: None, **{f"{minute} min walk or less": minute for minute in rent_facets.RANGE_FACETS['minute'][1]}}
+
+def parse_rent_filters(room_types=None, min_size=None, built_after=None, max_walk=None):
+    """
+    Turn the UI rent filter choices (labels above, plain numbers, 'Any' or None) into
+    rent_facets filters, e.g. {'room_type': ['1LDK'], 'size': 25, 'year': 2010, 'minute': 10}.
+    """
+    def choice(value, choices):
+        if value is None or value == "":
+            return None
+        return choices[value] if isinstance(value, str) else int(value)
+
+    return {
+        'room_type': list(room_types) if room_types else None,
+        'size': choice(min_size, MIN_SIZE_CHOICES),
+        'year': choice(built_after, BUILT_AFTER_CHOICES),
+        'minute': choice(max_walk, MAX_WALK_CHOICES),
+    }
+
+def format_progress(label, progress):
+    """One-line status for a sweep, e.g. 'Company: 120/1500 (95% cached), 40 pairs not checked, about 3 min left'."""
+    status = f"{label}: {progress['done']}/{progress['total']} ({progress['hit_rate']:.0%} cached)"
+    if progress['skipped']:
+        status += f", {progress['skipped']} pairs not checked"
+    if progress['eta']:
+        status += f", about {progress['eta'] / 60:.0f} min left"
+    return status
+
+def stream_commute_circles(
     company_station: str, 
     hangout_station: str, 
     company_time: int, 
     hangout_time: int, 
-    selected_prefectures: list
+    selected_prefectures: list,
+    depart_hour=None,
+    update_interval: float = 2.0,
+    max_fallback_hours=None,
+    timings=None,
+    rent_filters=None,
+    outcome=None
 ):
+    """
+    Generator version of process_commute_circles for progressive UIs.
+
+    Yields (map_html, text) pairs: while transit times are being fetched, a map of
+    the stations reachable so far with a progress line (at most once every
+    `update_interval` seconds); the last item is the finished map and station list.
+
+    Transit times are read and fetched for the `depart_hour` bucket (see
+    parse_depart_hour). Pairs already cached for a nearby hour, up to
+    `max_fallback_hours` away (None for any bucket), are reused instead of refetched.
+
+    Rent stats only count listings matching `rent_filters` (see parse_rent_filters);
+    stations without a matching listing go to the end of the list.
+
+    If `timings` is a dict, seconds spent per stage are added to it (see metrics.StageTimer).
+    The 'transit_sweep' stage includes time the consumer spends between yields.
+
+    If `outcome` is a dict, it receives the final 'map_html' and 'text' plus 'stations':
+    one dict per overlap station in display order, with 'station', 'has_data' and,
+    when it has data, the rent stats (count, median, q1, q3, iqr, min, max).
+    """
+    timer = metrics.StageTimer(timings)
+
+    def finish(map_html, text, stations=()):
+        if outcome is not None:
+            outcome.update(map_html=map_html, text=text, stations=list(stations))
+        return map_html, text
+
+    depart_hour = parse_depart_hour(depart_hour)
     _ = op.CirclePlotter()  # Initialize cache before processing
     # Format station names
     company_formatted = pretty_name(company_station)
@@ -49,11 +164,14 @@ def process_commute_circles(
     
     company_coords = op.CirclePlotter().get_location_coordinates(company_formatted)
     if not company_coords or isinstance(company_coords, str):
-        return f"<div style='color:red'>Error: Invalid coordinates for '{html.escape(company_formatted)}'</div>", ""
+        yield finish(f"<div style='color:red'>Error: Invalid coordinates for '{html.escape(company_formatted)}'</div>", "")
+        return
 
     hangout_coords = op.CirclePlotter().get_location_coordinates(hangout_formatted)
     if not hangout_coords or isinstance(hangout_coords, str):
-        return f"<div style='color:red'>Error: Invalid coordinates for '{html.escape(hangout_formatted)}'</div>", ""
+        yield finish(f"<div style='color:red'>Error: Invalid coordinates for '{html.escape(hangout_formatted)}'</div>", "")
+        return
+    timer.lap('geocoding')
 
     # Fetch filtered stations based on prefectures
     main_conn = sqlite3.connect('Dataset/tokyo_rent.db')
@@ -71,90 +189,70 @@ def process_commute_circles(
     
     all_station_list = [row[0] for row in main_cursor.fetchall()]  # Keep filtered list
     main_conn.close()
+    timer.lap('station_listing')
     
     # Create station pairs using FILTERED stations
-    station_pairs_company = [(company_formatted, pretty_name(station)) for station in all_station_list]
-    station_pairs_hangout = [(hangout_formatted, pretty_name(station)) for station in all_station_list]
+    formatted_stations = station_resolver.format_station_names(all_station_list)
+    station_pairs_company = [(company_formatted, station) for station in formatted_stations]
+    station_pairs_hangout = [(hangout_formatted, station) for station in formatted_stations]
+    timer.lap('name_formatting')
     
-    # Rest of the function remains unchanged...
+    # Drop pairs whose lower bound is over the limit before paying for live fetches
+    station_pairs_company, pruned_company = pruning.prune_pairs(
+        station_pairs_company, company_time, coordinates=op.CirclePlotter.cached_coordinates, depart_time=depart_hour)
+    station_pairs_hangout, pruned_hangout = pruning.prune_pairs(
+        station_pairs_hangout, hangout_time, coordinates=op.CirclePlotter.cached_coordinates, depart_time=depart_hour)
+    print(f"Pruned {len(pruned_company) + len(pruned_hangout)} pairs that exceed the commute limits")
+    timer.lap('pruning')
     
     # Process transit times and store results in cache
-    cache_conn = sqlite3.connect('transit_cache.db')
-    cache_cursor = cache_conn.cursor()
-    
-    print("Calculating transit times from company station...")
-    company_results = gt.parallel_processing(station_pairs_company, gt.get_transit_time, num_workers=10)
+    # Stream both sweeps, redrawing the stations reached so far as results come in
+    company_reached, hangout_reached = set(), set()
+    live_fetches = 0
+    fallback_hits = 0
+    last_update = time.monotonic()
+    sweeps = [
+        ("Company", station_pairs_company, company_time, company_reached),
+        ("Hangout", station_pairs_hangout, hangout_time, hangout_reached),
+    ]
+    for label, pairs, limit, reached in sweeps:
+        print(f"Calculating transit times from {label.lower()} station...")
+        progress = {'done': 0, 'cache_hits': 0, 'fallback_hits': 0}
+        for result, progress in gt.iter_parallel_processing(pairs, gt.get_transit_time,
+                                                            concurrency=gt.get_fetch_concurrency(),
+                                                            depart_time=depart_hour,
+                                                            coordinates=op.CirclePlotter.cached_coordinates,
+                                                            max_duration=limit,
+                                                            max_fallback_hours=max_fallback_hours):
+            duration = parse_duration(result[3])
+            if duration is not None and duration <= limit:
+                reached.add(result[1])
+            if time.monotonic() - last_update >= update_interval:
+                last_update = time.monotonic()
+                yield render_progress_map(company_coords, company_reached, hangout_reached), format_progress(label, progress)
+        # Progress counts are per sweep; a live fetch or fallback in either one rules out the matrix
+        live_fetches += progress['done'] - progress['cache_hits']
+        fallback_hits += progress['fallback_hits']
     
-    print("Calculating transit times from hangout station...")
-    hangout_results = gt.parallel_processing(station_pairs_hangout, gt.get_transit_time, num_workers=10)
-    
-    # Clean up transit times in database    
-    # Update duration using regex patterns for different time formats
-    def parse_duration(transit_time):
-        if not transit_time:
-            return None
-
-        # Define keywords for hours and minutes in various languages
-        hour_keywords = {'hr', 'hour', 'hours', 'h', '時間', '小時', '小时', 'stunden', 'heure', 'ora', '시간'}#
-        minute_keywords = {'min', 'minute', 'minutes', 'm', '分', '分钟', 'minuti', 'minuten', '분'}
-
-        total_minutes = 0
-
-        # Split into components: find all (number, unit) pairs
-        pattern = r'(\d+)\s*([^\d\s]+)'
-        matches = re.findall(pattern, transit_time, re.IGNORECASE)
-
-        for number_str, unit in matches:
-            number = int(number_str)
-            unit_lower = unit.lower()
-
-            # Check for hour keywords
-            if any(keyword in unit_lower for keyword in hour_keywords):
-                total_minutes += number * 60
-            # Check for minute keywords
-            elif any(keyword in unit_lower for keyword in minute_keywords):
-                total_minutes += number
-            else:
-                # Fallback: Assume minutes if unit is unrecognized (e.g., numeric only like "30")
-                total_minutes += number
-
-        # Handle cases with standalone numbers (no units) after checking all matches
-        if not matches:
-            last_number = re.search(r'(\d+)\s*$', transit_time)
-            if last_number:
-                total_minutes += int(last_number.group(1))
-
-        return total_minutes if total_minutes > 0 else None
-
-    # Fetch all transit times
-    cache_cursor.execute('SELECT uuid, transit_time FROM transit_cache WHERE duration IS NULL AND transit_time IS NOT NULL')
-    transit_times = cache_cursor.fetchall()
+    timer.lap('transit_sweep')
 
-    # Process and update durations
-    for uuid, transit_time in transit_times:
-        duration = parse_duration(transit_time)
-        if duration is not None:
-            cache_cursor.execute('UPDATE transit_cache SET duration = ? WHERE uuid = ?', (duration, uuid))
-
-    # Commit changes
-    cache_conn.commit()
+    # Answer reachability from the exported matrix when it already holds everything we need
+    matrix = tm.load_matrix(depart_hour) if live_fetches == 0 and fallback_hits == 0 else None
+    if matrix and matrix.covers(company_formatted) and matrix.covers(hangout_formatted) and matrix.is_current():
+        company_durations = matrix.durations_within(company_formatted, company_time)
+        hangout_durations = matrix.durations_within(hangout_formatted, hangout_time)
+    else:
+        # Durations are parsed when results are cached, so this path only reads.
+        # Each destination is read from the departure bucket the sweep used for it.
+        company_durations = {station: duration for station, duration in tc.nearest_durations(
+            company_formatted, depart_hour, max_fallback_hours).items() if duration <= company_time}
+        hangout_durations = {station: duration for station, duration in tc.nearest_durations(
+            hangout_formatted, depart_hour, max_fallback_hours).items() if duration <= hangout_time}
 
     # Filter stations within commute time limits
-    company_stations = cache_cursor.execute('''
-        SELECT DISTINCT destination 
-        FROM transit_cache 
-        WHERE origin = ? AND duration <= ?
-    ''', (company_formatted, company_time)).fetchall()
-    
-    hangout_stations = cache_cursor.execute('''
-        SELECT DISTINCT destination 
-        FROM transit_cache 
-        WHERE origin = ? AND duration <= ?
-    ''', (hangout_formatted, hangout_time)).fetchall()
-    
-    # Commit changes and close cache connection
-    cache_conn.commit()
-    cache_conn.close()
+    company_stations = [(station,) for station in company_durations]
+    hangout_stations = [(station,) for station in hangout_durations]
+    timer.lap('durations')
     
     # Find overlapping stations
     company_set = set(station[0] for station in company_stations)
@@ -164,56 +262,18 @@ def process_commute_circles(
     # Extract raw station names from pretty_name formatted stations
     raw_station_names = [station.split(" Station")[0].strip() for station in overlap_stations]
     unique_raw_names = list(set(raw_station_names))
+    timer.lap('overlap')
 
-    # Query rent data
-    rent_data = {}
-    if unique_raw_names:
-        main_conn = sqlite3.connect('Dataset/tokyo_rent.db')
-        main_cursor = main_conn.cursor()
-        query = '''
-            SELECT station, cost_per_square 
-            FROM properties 
-            WHERE station IN ({})
-        '''.format(','.join(['?']*len(unique_raw_names)))
-        main_cursor.execute(query, unique_raw_names)
-        rows = main_cursor.fetchall()
-        main_conn.close()
-
-        # Group costs by station
-        from collections import defaultdict
-        rent_data = defaultdict(list)
-        for station, cost in rows:
-            if cost is not None:
-                rent_data[station].append(float(cost))
-
-    # Collect stations with rent data and calculate statistics
+    # Per-station rent statistics: the precomputed table, or the facet index when filtered
+    station_stats = rent_facets.filtered_station_stats(unique_raw_names, rent_filters)
+
+    # Collect stations with rent data
     stations_with_rent = []
     for station in overlap_stations:
         raw_name = station.split(" Station")[0].strip()
-        costs = rent_data.get(raw_name, [])
-
         stats = {'station': station}
-        if costs:
-            sorted_costs = sorted(costs)
-            n = len(sorted_costs)
-
-            # Calculate median
-            if n % 2 == 1:
-                median = sorted_costs[n//2]
-            else:
-                median = (sorted_costs[(n//2)-1] + sorted_costs[n//2])/2
-
-            # Calculate quartiles
-            q1 = sorted_costs[int(n*0.25)]
-            q3 = sorted_costs[int(n*0.75)]
-
-            stats.update({
-                'median': median,
-                'q1': q1,
-                'q3': q3,
-                'iqr': q3 - q1,
-                'has_data': True
-            })
+        if raw_name in station_stats:
+            stats.update(station_stats[raw_name], has_data=True)
         else:
             stats.update({
                 'median': float('inf'),  # Push stations with no data to end
@@ -224,35 +284,24 @@ def process_commute_circles(
 
     # Sort by median ascending, then alphabetically
     stations_with_rent.sort(key=lambda x: (x['median'], x['station']))
+    timer.lap('rent_stats')
 
     # Format output
     recommended_stations = []
 
-    def get_farthest_station(center_address, stations):
+    def get_farthest_station(center_address, durations):
         """Find the station with the maximum transit duration from the center."""
         max_duration = 0
         farthest_station = center_address
-        cache_conn = sqlite3.connect('transit_cache.db')
-        cache_cursor = cache_conn.cursor()
-        for station in stations:
-            station_name = station[0]
-            # Retrieve transit duration from cache
-            cache_cursor.execute('''
-                SELECT duration FROM transit_cache 
-                WHERE origin = ? AND destination = ?
-            ''', (center_address, station_name))
-            result = cache_cursor.fetchone()
-            if result and result[0] is not None:
-                duration = result[0]
-                if duration > max_duration:
-                    max_duration = duration
-                    farthest_station = station_name
-        cache_conn.close()
+        for station_name, duration in durations.items():
+            if duration > max_duration:
+                max_duration = duration
+                farthest_station = station_name
         return farthest_station
 
     # Get farthest stations for edges
-    company_edge = get_farthest_station(company_formatted, company_stations)
-    hangout_edge = get_farthest_station(hangout_formatted, hangout_stations)
+    company_edge = get_farthest_station(company_formatted, company_durations)
+    hangout_edge = get_farthest_station(hangout_formatted, hangout_durations)
 
     # Create CirclePlotters
     plotter1 = op.CirclePlotter(color="blue", opacity=0.6, center=company_formatted, edge=company_edge)
@@ -279,7 +328,7 @@ def process_commute_circles(
                     tooltip_content = f"""
                         <div style='font-size: 14px;'>
                             <strong>{html.escape(station)}</strong><br>
-                            Median Rent: ¥{stats['median']:.2f}/m²<br>
+                            Median Rent: ¥{stats['median']:.2f}/m² ({stats['count']} listings)<br>
                             IQR: ¥{stats['iqr']:.2f} (Q1: ¥{stats['q1']:.2f}, Q3: ¥{stats['q3']:.2f})
                         </div>
                     """
@@ -301,8 +350,9 @@ def process_commute_circles(
         # Convert map to HTML for output
         map_html = f"<iframe srcdoc='{html.escape(m._repr_html_())}' style='width:100%;height:600px;border:none'></iframe>"
         recommended_text = "\n".join([s['station'] for s in stations_with_rent]) if stations_with_rent else "No overlapping stations found."
+        metrics.MAP_RENDER_SECONDS.observe(timer.lap('map_render'), kind='final')
         
-        return map_html, recommended_text
+        yield finish(map_html, recommended_text, stations_with_rent)
         
     except Exception as e:
         print(f"Error generating map: {str(e)}")
@@ -310,14 +360,47 @@ def process_commute_circles(
         map_html = "<div style='color:red'>Error generating map. Showing default location.</div>"
         fallback_map = folium.Map(location=[35.6895, 139.6917], zoom_start=10)._repr_html_()
         map_html += f"<iframe srcdoc='{html.escape(fallback_map)}' style='width:100%;height:600px;border:none'></iframe>"
-        return map_html, "Error: Could not generate station list."
+        yield finish(map_html, "Error: Could not generate station list.", stations_with_rent)
+
+def process_commute_circles(
+    company_station: str, 
+    hangout_station: str, 
+    company_time: int, 
+    hangout_time: int, 
+    selected_prefectures: list,
+    depart_hour=None,
+    timings=None,
+    rent_filters=None
+):
+    """
+    Blocking wrapper around stream_commute_circles.
+
+    Returns:
+        dict: 'map_html', 'text' (the station list) and 'stations' with per-station
+        rent stats, as described for stream_commute_circles' `outcome`
+    """
+    outcome = {}
+    for _ in stream_commute_circles(company_station, hangout_station, company_time,
+                                    hangout_time, selected_prefectures, depart_hour,
+                                    timings=timings, rent_filters=rent_filters, outcome=outcome):
+        pass
+    return outcome
+
+def stream_filtered_commute_circles(company_station, hangout_station, company_time, hangout_time,
+                                    selected_prefectures, depart_hour, room_types, min_size,
+                                    built_after, max_walk):
+    """stream_commute_circles taking the rent filters as separate UI inputs, for Gradio."""
+    yield from stream_commute_circles(
+        company_station, hangout_station, company_time, hangout_time, selected_prefectures, depart_hour,
+        rent_filters=parse_rent_filters(room_types, min_size, built_after, max_walk))
 
 def create_interface():
     stations = all_stations()
     prefectures = get_prefectures()  # Get prefecture options
+    room_types = rent_facets.load_facet_index().categories['room_type']
     
     interface = gr.Interface(
-        fn=process_commute_circles,
+        fn=stream_filtered_commute_circles,  # Generator, so the map fills in while transit times are fetched
         inputs=[
             gr.Dropdown(choices=stations, label="Company/University Station"),
             gr.Dropdown(choices=stations, label="(Optional)Hangout/Part-time Job Station"),
@@ -325,7 +408,13 @@ def create_interface():
             gr.Number(label="Max commute time to 2nd most frequent visited station(minutes)", value=30),
             gr.Dropdown(choices=prefectures, 
                         label="(Speed Optimization) Search only these prefectures",
-                        multiselect=True)  # New dropdown
+                        multiselect=True),  # New dropdown
+            gr.Dropdown(choices=DEPART_HOUR_CHOICES, value=LEAVE_NOW,
+                        label="Departure time (reuses the nearest cached hour when this one isn't cached yet)"),
+            gr.Dropdown(choices=room_types, label="(Rent filter) Room types", multiselect=True),
+            gr.Dropdown(choices=list(MIN_SIZE_CHOICES), value=ANY, label="(Rent filter) Size"),
+            gr.Dropdown(choices=list(BUILT_AFTER_CHOICES), value=ANY, label="(Rent filter) Building age"),
+            gr.Dropdown(choices=list(MAX_WALK_CHOICES), value=ANY, label="(Rent filter) Walk to station")
         ],
         outputs=[
             gr.HTML(label="Map Visualization"),
@@ -334,8 +423,9 @@ def create_interface():
         title="Where SHOULD you live?",
         description="Find the perfect area to live based on your commute patterns. based on commute/happnies index relashion and Housing burden rate. usually, you should aim sub 20% BHR and sub 30min commute time",
         examples=[
-            ["Shibuya", "Akihabara", 30, 30, ["Tokyo"]],  # Updated example
-            ["Shinjuku", "Hachiouji", 40, 35, ["Tokyo", "Chiba"]]
+            ["Shibuya", "Akihabara", 30, 30, ["Tokyo"], LEAVE_NOW, [], ANY, ANY, ANY],  # Updated example
+            ["Shinjuku", "Hachiouji", 40, 35, ["Tokyo", "Chiba"], "08:00",
+             ["1LDK"], "25 m² or larger", "Built 2010 or later", "10 min walk or less"]
         ]
     )
     return interface
@@ -344,5 +434,7 @@ def create_interface():
 
 if __name__ == "__main__":
     gt.create_cache_db()  # Initialize cache database
+    gt.start_background_refresh()  # Keep cached transit times fresh while the UI is idle
+    metrics.configure_from_env()  # METRICS_TEXTFILE / METRICS_PORT
     interface = create_interface()
     interface.launch(share=True)
\ No newline at end of file